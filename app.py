@@ -1,8 +1,11 @@
+import threading
+
 import streamlit as st
 import numpy as np
 from PIL import Image
 
-from utils.mediapipe_utils import mediapipe_detection
+from utils.landmark_utils import extract_landmarks
+from utils.mediapipe_utils import LandmarkerService, mediapipe_detection
 from utils.sign_storage import get_available_signs
 from sign_recorder import SignRecorder
 from webcam_manager import WebcamManager
@@ -10,9 +13,25 @@ from webcam_manager import WebcamManager
 
 @st.cache_resource
 def load_sign_recorder():
+    # Shared by every browser session: only its stateless recognize and
+    # save_reference_sign are used, under load_library_lock
     return SignRecorder(reference_signs=None, mode="recognize")
 
 
+@st.cache_resource
+def load_library_lock():
+    return threading.Lock()
+
+
+@st.cache_resource
+def load_landmarker():
+    # Built once per process and shared by every browser session, so frames
+    # are detected one at a time (the service's lock) and each on its own:
+    # VIDEO mode would track hands across unrelated sessions' frames.
+    # mediapipe is imported on first use only
+    return LandmarkerService(running_mode="image")
+
+
 @st.cache_resource
 def load_webcam_mgr():
     return WebcamManager()
@@ -23,7 +42,9 @@ def main():
     st.markdown("Sign language recognition using MediaPipe and DTW")
 
     sign_recorder = load_sign_recorder()
+    library_lock = load_library_lock()
     webcam_manager = load_webcam_mgr()
+    landmarker = load_landmarker()
 
     # ---------- Session State ----------
     if "is_recording" not in st.session_state:
@@ -34,6 +55,8 @@ def main():
         st.session_state.last_prediction = None
     if "current_sign_name" not in st.session_state:
         st.session_state.current_sign_name = ""
+    if "last_dtw_distance" not in st.session_state:
+        st.session_state.last_dtw_distance = None
 
     # ---------- Sign Name Input ----------
     st.subheader("📝 Record New Sign")
@@ -63,7 +86,7 @@ def main():
             st.session_state.is_recording = False
             st.session_state.recorded_frames = []
             st.session_state.last_prediction = None
-            sign_recorder.recorded_results = []
+            st.session_state.last_dtw_distance = None
             st.rerun()
 
     # ---------- Camera Input ----------
@@ -74,25 +97,30 @@ def main():
         image = np.array(Image.open(camera_image))
         image_rgb = image  # MediaPipe expects RGB
 
-        processed_image, results = mediapipe_detection(image_rgb)
+        processed_image, results = mediapipe_detection(image_rgb, landmarker)
 
         if st.session_state.is_recording:
-            st.session_state.recorded_frames.append(results)
+            # Keep only the extracted landmarks, not the mediapipe results
+            _, left_hand, right_hand = extract_landmarks(results)
+            st.session_state.recorded_frames.append(np.stack([left_hand, right_hand]))
             st.info(f"Frames recorded: {len(st.session_state.recorded_frames)}/50")
 
             if len(st.session_state.recorded_frames) >= 50:
-                sign_recorder.recorded_results = st.session_state.recorded_frames
-                sign_recorder.save_reference_sign(
-                    st.session_state.current_sign_name
-                )
+                with library_lock:
+                    sign_recorder.save_reference_sign(
+                        st.session_state.current_sign_name,
+                        frames=np.stack(st.session_state.recorded_frames)
+                    )
                 st.success(f"Saved sign: {st.session_state.current_sign_name}")
                 st.session_state.is_recording = False
                 st.session_state.recorded_frames = []
 
         else:
-            sign_recorder.recorded_results = [results]
-            prediction = sign_recorder._compute_distances_and_predict()
-            st.session_state.last_prediction = prediction
+            _, left_hand, right_hand = extract_landmarks(results)
+            with library_lock:
+                match = sign_recorder.recognize(np.stack([left_hand, right_hand])[None])
+            st.session_state.last_prediction = match["sign"] if match["accepted"] else "Unknown Sign"
+            st.session_state.last_dtw_distance = match["distance"] if match["candidates"] else None
 
         display_image = webcam_manager.add_text_overlay(
             processed_image.copy(),
@@ -101,7 +129,7 @@ def main():
             sequence_length=len(st.session_state.recorded_frames),
             current_mode="record" if st.session_state.is_recording else "recognize",
             current_sign_name=st.session_state.current_sign_name,
-            dtw_distance=sign_recorder.last_dtw_distance
+            dtw_distance=st.session_state.last_dtw_distance
         )
 
         st.image(display_image, caption="Processed Frame")
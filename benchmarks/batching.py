@@ -0,0 +1,61 @@
+"""
+Throughput of recognizing concurrent gestures one by one versus in batches.
+
+Builds a synthetic sign store in a temporary directory, then scores the
+same queries with TemplateLibrary.search per query and with search_many
+for every batch size.
+
+    python -m benchmarks.batching --templates 1000 --batch 1 4 16 64
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_store  # noqa: E402
+from models.template_library import TemplateLibrary  # noqa: E402
+from utils.features import FeaturePipeline  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=1000)
+    parser.add_argument("--seq-len", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--window", type=int, default=10)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as directory:
+        store = synthetic_store(directory, args.templates, args.seq_len)
+        library = TemplateLibrary.from_store(store, FeaturePipeline())
+        queries = [store.template_frames(store.templates[i]) + rng.normal(scale=0.02, size=(args.seq_len, 2, 63))
+                   for i in rng.integers(len(store.templates), size=args.queries)]
+        masks = [[True, True]] * len(queries)
+        library.search(queries[0], masks[0], args.window, k=args.k)
+
+        start = time.perf_counter()
+        for query, mask in zip(queries, masks):
+            library.search(query, mask, args.window, k=args.k)
+        serial = (time.perf_counter() - start) / len(queries)
+
+        print(f"{args.templates} templates x {args.seq_len} frames, {len(queries)} queries, top-{args.k}")
+        print(f"{'batch':>8} {'queries/s':>10} {'speedup':>8}")
+        print(f"{'single':>8} {1 / serial:>10.1f} {1.0:>8.2f}")
+        for batch in args.batch:
+            start = time.perf_counter()
+            for i in range(0, len(queries), batch):
+                library.search_many(queries[i:i + batch], masks[i:i + batch], args.window, k=args.k)
+            elapsed = (time.perf_counter() - start) / len(queries)
+            print(f"{batch:>8} {1 / elapsed:>10.1f} {serial / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
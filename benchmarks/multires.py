@@ -0,0 +1,68 @@
+"""
+Query cost of the multi-resolution search on large libraries.
+
+Builds a synthetic sign store in a temporary directory, then times the
+search without PAA resolutions, with the exact LB_PAA cascade and with
+the approximate coarse DTW shortlist, and reports how often the shortlist
+finds the exact best template.
+
+    python -m benchmarks.multires --templates 2000 --shortlist 16 64
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_store  # noqa: E402
+from models.template_library import TemplateLibrary  # noqa: E402
+from utils.features import FeaturePipeline  # noqa: E402
+
+
+def run(library, queries, window, k, shortlist=None):
+    """Seconds per query and the best template of each query."""
+    library.search(queries[0], [True, True], window, k=k, shortlist=shortlist)
+    best = []
+    start = time.perf_counter()
+    for query in queries:
+        distances, _ = library.search(query, [True, True], window, k=k, shortlist=shortlist)
+        best.append(int(np.argmin(distances)))
+    return (time.perf_counter() - start) / len(queries), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=2000)
+    parser.add_argument("--seq-len", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--window", type=int, default=10)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--shortlist", type=int, nargs="+", default=[16, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as directory:
+        store = synthetic_store(directory, args.templates, args.seq_len)
+        queries = [store.template_frames(store.templates[i]) + rng.normal(scale=0.02, size=(args.seq_len, 2, 63))
+                   for i in rng.integers(len(store.templates), size=args.queries)]
+        full = TemplateLibrary.from_store(store, FeaturePipeline(), paa_resolutions=())
+        library = TemplateLibrary.from_store(store, FeaturePipeline())
+
+        baseline, exact = run(full, queries, args.window, args.k)
+        print(f"{args.templates} templates x {args.seq_len} frames, {len(queries)} queries, top-{args.k}")
+        print(f"{'search':>16} {'queries/s':>10} {'speedup':>8} {'recall':>7}")
+        print(f"{'LB_Keogh':>16} {1 / baseline:>10.1f} {1.0:>8.2f} {1.0:>7.2f}")
+        elapsed, _ = run(library, queries, args.window, args.k)
+        print(f"{'LB_PAA':>16} {1 / elapsed:>10.1f} {baseline / elapsed:>8.2f} {1.0:>7.2f}")
+        for shortlist in args.shortlist:
+            elapsed, best = run(library, queries, args.window, args.k, shortlist)
+            recall = np.mean(np.array(best) == np.array(exact))
+            print(f"{f'shortlist {shortlist}':>16} {1 / elapsed:>10.1f} {baseline / elapsed:>8.2f} {recall:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
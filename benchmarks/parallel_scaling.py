@@ -0,0 +1,69 @@
+"""
+Scaling of sharded parallel recognition with the number of workers.
+
+Builds a synthetic sign store in a temporary directory, then times
+ParallelSearch for every worker count against the serial search.
+
+    python -m benchmarks.parallel_scaling --templates 2000 --workers 1 2 4 8 16
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_store  # noqa: E402
+from models.parallel_search import ParallelSearch  # noqa: E402
+from models.template_library import TemplateLibrary  # noqa: E402
+from utils.features import FeaturePipeline  # noqa: E402
+
+
+def time_search(searcher, queries, window, threshold):
+    """Median seconds per query."""
+    searcher.search(queries[0], [True, True], window, threshold)
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        searcher.search(query, [True, True], window, threshold)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=1000)
+    parser.add_argument("--seq-len", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--shard-size", type=int, default=None)
+    parser.add_argument("--backend", choices=["process", "thread"], default="process")
+    parser.add_argument("--window", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=float('inf'))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as directory:
+        store = synthetic_store(directory, args.templates, args.seq_len)
+        library = TemplateLibrary.from_store(store, FeaturePipeline())
+        queries = [store.template_frames(store.templates[i]) + rng.normal(scale=0.02, size=(args.seq_len, 2, 63))
+                   for i in rng.integers(len(store.templates), size=args.queries)]
+
+        serial = time_search(library, queries, args.window, args.threshold)
+        print(f"{args.templates} templates x {args.seq_len} frames, {args.backend} backend")
+        print(f"{'workers':>8} {'ms/query':>10} {'speedup':>8}")
+        print(f"{'serial':>8} {serial * 1000:>10.1f} {1.0:>8.2f}")
+        for workers in args.workers:
+            parallel = ParallelSearch(library, store, workers, args.shard_size, args.backend)
+            try:
+                elapsed = time_search(parallel, queries, args.window, args.threshold)
+            finally:
+                parallel.close()
+            print(f"{workers:>8} {elapsed * 1000:>10.1f} {serial / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Cold-start cost of the recognition entry points.
+
+Every measurement runs in a fresh interpreter, so nothing is already
+imported or cached. Reports the import time of each module, which heavy
+dependencies that import pulled in, and the time until the first
+prediction of a SignRecorder on a synthetic sign store.
+
+    python -m benchmarks.startup --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only be imported when actually used
+HEAVY_MODULES = ("pandas", "mediapipe", "cv2", "pyttsx3", "fastdtw", "streamlit")
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+PREDICTION_PROBE = """
+import json, time
+start = time.perf_counter()
+import numpy as np
+from sign_recorder import SignRecorder
+imported = time.perf_counter()
+# The default threshold would prune every synthetic template before DTW
+recorder = SignRecorder(mode="recognize", dtw_threshold=float("inf"))
+loaded = time.perf_counter()
+recorder.frame_buffer[:] = np.load({query_path!r})
+recorder.num_frames = recorder.seq_len
+recorder.is_recording = True
+recorder._compute_distances_and_predict()
+predicted = time.perf_counter()
+assert recorder.last_search_stats["dtw"] > 0, "no template reached DTW"
+print(json.dumps({{"import": imported - start, "load": loaded - imported, "predict": predicted - loaded,
+                  "total": predicted - start}}))
+"""
+
+
+def run_probe(code, cwd=ROOT):
+    """Run code in a fresh interpreter with the repository importable and parse its last output line."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")]))
+    output = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True,
+                            check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=["sign_recorder", "webcam_manager", "utils.mediapipe_utils",
+                                                         "utils.voice_output", "main", "app"])
+    parser.add_argument("--templates", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print one JSON document instead of a table")
+    args = parser.parse_args()
+
+    report = {"imports": {}, "first_prediction": None}
+    for module in args.modules:
+        runs = []
+        for _ in range(args.repeat):
+            try:
+                runs.append(run_probe(IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)))
+            except subprocess.CalledProcessError as e:
+                runs = [{"error": e.stderr.strip().splitlines()[-1]}]
+                break
+        if "error" in runs[0]:
+            report["imports"][module] = runs[0]
+        else:
+            report["imports"][module] = {"ms": float(np.median([r["seconds"] for r in runs]) * 1000),
+                                         "loaded": runs[0]["loaded"]}
+
+    # SignRecorder opens data/signs relative to the working directory
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, ROOT)
+        from benchmarks.synthetic import synthetic_store
+        store = synthetic_store(os.path.join(directory, "data", "signs"), args.templates, 50)
+        query_path = os.path.join(directory, "query.npy")
+        np.save(query_path, store.template_frames(store.templates[0]))
+        runs = [run_probe(PREDICTION_PROBE.format(query_path=query_path), cwd=directory)
+                for _ in range(args.repeat)]
+        report["first_prediction"] = {key: float(np.median([r[key] for r in runs]) * 1000) for key in runs[0]}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'module':<24} {'import ms':>10}  heavy modules loaded")
+    for module, result in report["imports"].items():
+        if "error" in result:
+            print(f"{module:<24} {'-':>10}  {result['error']}")
+        else:
+            print(f"{module:<24} {result['ms']:>10.1f}  {', '.join(result['loaded']) or '-'}")
+    first = report["first_prediction"]
+    print(f"\nFirst prediction with {args.templates} templates: import {first['import']:.1f} ms, "
+          f"load {first['load']:.1f} ms, predict {first['predict']:.1f} ms, total {first['total']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Recognition latency and memory benchmarks on synthetic sign libraries.
+
+Times the hot paths for every library size and template length given,
+reports p50/p95/p99 latency and peak traced memory, and writes the
+results as JSON so two commits can be compared:
+
+    python -m benchmarks.suite --signs 10 100 1000 --seq-len 50 --output before.json
+    python -m benchmarks.suite --signs 10 100 1000 --seq-len 50 --output after.json --compare before.json
+
+Needs no camera and no network.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import fake_results, random_walk_frames, synthetic_store  # noqa: E402
+from sign_recorder import SignRecorder  # noqa: E402
+from utils.dtw import dtw_distances  # noqa: E402
+from utils.landmark_utils import extract_landmarks  # noqa: E402
+from utils.sign_storage import SIGNS_DIR, load_all_sign_sequences  # noqa: E402
+from webcam_manager import WebcamManager  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+
+
+def measure(fn, runs, warmup=1):
+    """
+    Latency percentiles and peak traced memory of a callable.
+
+    Memory is measured in a separate call, so tracing does not slow the timed runs.
+
+    :return: Dictionary of p50_ms, p95_ms, p99_ms, mean_ms, runs and peak_kib
+    """
+    for _ in range(warmup):
+        fn()
+    times = np.empty(runs)
+    for i in range(runs):
+        start = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - start
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {f"p{p}_ms": float(np.percentile(times, p) * 1000) for p in PERCENTILES}
+    result.update(mean_ms=float(times.mean() * 1000), runs=runs, peak_kib=peak / 1024)
+    return result
+
+
+def library_cases(num_signs, seq_len, args, rng):
+    """Cases that depend on the library, run inside a directory holding data/signs."""
+    synthetic_store(SIGNS_DIR, num_signs * args.templates_per_sign, seq_len,
+                    templates_per_sign=args.templates_per_sign)
+    query_len = seq_len if np.isscalar(seq_len) else seq_len[1]
+
+    # Random-walk queries are far from every template in normalized units; an
+    # infinite threshold keeps the default one from pruning them all unscored
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = SignRecorder(seq_len=query_len, mode="recognize", dtw_window=args.window,
+                                dtw_threshold=float("inf"))
+    query = random_walk_frames(rng, query_len)
+
+    def predict():
+        recorder.frame_buffer[:] = query
+        recorder.num_frames = recorder.seq_len
+        recorder.is_recording = True
+        with contextlib.redirect_stdout(io.StringIO()):
+            recorder._compute_distances_and_predict()
+
+    predict()
+    assert recorder.last_search_stats["dtw"] > 0, "no template reached DTW; the case would measure nothing"
+
+    references = [np.stack(pair, axis=1) for pairs in recorder.sign_sequences.values() for pair in pairs]
+    references = references[:args.dtw_references]
+
+    yield "compute_distances_and_predict", predict
+    yield f"dtw_distances[{len(references)}]", lambda: dtw_distances(query, references, args.window)
+    yield "load_all_sign_sequences", load_all_sign_sequences
+
+
+def frame_cases(args, rng):
+    """Cases that do not depend on the library."""
+    results = fake_results(rng)
+    yield "extract_landmarks", lambda: extract_landmarks(results)
+
+    manager = WebcamManager()
+    for height, width in ((720, 1280), (1080, 1920)):
+        image = (rng.random((height, width, 3)) * 255).astype(np.uint8)
+        yield f"add_text_overlay[{height}p]", lambda image=image: manager.add_text_overlay(
+            image, sign_detected="hello", is_recording=True, sequence_length=25,
+            current_mode="recognize", dtw_distance=12.5
+        )
+
+
+def environment():
+    """Commit and platform the results were measured on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+        "machine": platform.machine(), "processor": platform.processor(), "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline):
+    """Print the p50 change of every case also present in the baseline."""
+    old = {(r["case"], r["signs"], r["seq_len"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline['environment'].get('commit') or 'baseline'}:")
+    for r in results:
+        before = old.get((r["case"], r["signs"], r["seq_len"]))
+        if before:
+            ratio = r["p50_ms"] / max(before["p50_ms"], 1e-9)
+            print(f"  {r['case']:<32} {r['signs'] or '-':>6} {r['seq_len'] or '-':>8} "
+                  f"{before['p50_ms']:>9.2f} -> {r['p50_ms']:>9.2f} ms ({ratio:.2f}x)")
+
+
+def parse_seq_len(value):
+    """"50" for a fixed length or "30-80" for a range of template lengths."""
+    if "-" in value:
+        low, high = value.split("-")
+        return int(low), int(high)
+    return int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--signs", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--seq-len", type=parse_seq_len, nargs="+", default=[50],
+                        help="Template length, or a range such as 30-80")
+    parser.add_argument("--templates-per-sign", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--window", type=int, default=None)
+    parser.add_argument("--dtw-references", type=int, default=100,
+                        help="References timed with the pairwise dtw_distances loop")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="Baseline JSON file to compare against")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+
+    def record(case, fn, signs=None, seq_len=None):
+        if seq_len is not None and not np.isscalar(seq_len):
+            seq_len = f"{seq_len[0]}-{seq_len[1]}"
+        result = {"case": case, "signs": signs, "seq_len": seq_len, **measure(fn, args.runs)}
+        results.append(result)
+        print(f"{case:<32} {signs or '-':>6} {seq_len or '-':>8} {result['p50_ms']:>9.2f} "
+              f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['peak_kib']:>10.0f}")
+
+    print(f"{'case':<32} {'signs':>6} {'seq_len':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>10}")
+    for case, fn in frame_cases(args, rng):
+        record(case, fn)
+
+    cwd = os.getcwd()
+    for seq_len in args.seq_len:
+        for signs in args.signs:
+            with tempfile.TemporaryDirectory() as directory:
+                os.chdir(directory)
+                try:
+                    for case, fn in library_cases(signs, seq_len, args, rng):
+                        record(case, fn, signs, seq_len)
+                finally:
+                    os.chdir(cwd)
+
+    report = {"environment": environment(), "arguments": vars(args), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
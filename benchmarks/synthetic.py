@@ -0,0 +1,38 @@
+"""Synthetic hand-landmark data for the benchmarks; no camera needed."""
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils.sign_storage import SignStore
+
+
+def random_walk_frames(rng, seq_len, hands=(True, True)):
+    """A smooth random landmark trajectory of shape (seq_len, 2, 63)."""
+    steps = rng.normal(scale=0.01, size=(seq_len, 2, 63))
+    frames = (rng.random((1, 2, 63)) + np.cumsum(steps, axis=0)).astype(np.float32)
+    frames[:, ~np.asarray(hands)] = 0.0
+    return frames
+
+
+def synthetic_store(directory, num_templates, seq_len, seed=0, templates_per_sign=3):
+    """
+    Sign store of random-walk templates, a few per sign.
+
+    :param seq_len: Template length, or a (min, max) range to draw lengths from
+    """
+    rng = np.random.default_rng(seed)
+    store = SignStore(directory)
+    for i in range(num_templates):
+        length = seq_len if np.isscalar(seq_len) else int(rng.integers(seq_len[0], seq_len[1] + 1))
+        hands = (True, bool(rng.random() < 0.7))
+        store.save_frames(f"sign_{i // templates_per_sign}", random_walk_frames(rng, length, hands))
+    return store
+
+
+def fake_results(rng, num_hands=2):
+    """HandLandmarkerResult stand-in with random landmarks."""
+    names = ["Left", "Right"][:num_hands]
+    return SimpleNamespace(
+        hand_landmarks=[[SimpleNamespace(x=x, y=y, z=z) for x, y, z in rng.random((21, 3))] for _ in names],
+        handedness=[[SimpleNamespace(category_name=name)] for name in names],
+    )
@@ -1,8 +1,13 @@
-import mediapipe as mp
+import os
+import queue
 import sys
+import threading
 
-from utils.dataset_utils import load_dataset, load_reference_signs
-from utils.mediapipe_utils import mediapipe_detection
+import cv2
+
+from utils.frame_pipeline import Capture, DropOldestQueue, LatencyTracker, Stage
+from utils.mediapipe_utils import LandmarkerService, mediapipe_detection
+from utils.metrics import JsonLogger, metrics
 from utils.sign_storage import get_available_signs
 from utils.voice_output import VoiceOutput
 from sign_recorder import SignRecorder
@@ -46,31 +51,47 @@ def get_sign_name_input():
 
 
 def main():
-    """Main application loop."""
+    """
+    Main application loop.
+
+    Capture, landmark inference and recognition run on their own threads,
+    connected by bounded queues that drop the oldest frame when full; the
+    main thread renders the newest frame and handles the keyboard. A slow
+    recognition pass therefore neither stalls the camera nor the display.
+    """
     
     print("\n" + "="*60)
     print("🤟 SIGN LANGUAGE RECOGNITION SYSTEM v2.0")
     print("="*60)
     print("\nInitializing system...")
     
-    # Load data
-    videos = load_dataset()
-    reference_signs = load_reference_signs(videos)
-    
-    # Initialize components
-    sign_recorder = SignRecorder(reference_signs, mode="recognize")
+    # Initialize components (reference signs come from the sign store)
+    sign_recorder = SignRecorder(mode="recognize")
     webcam_manager = WebcamManager()
-    voice_output = VoiceOutput()
+    voice_output = VoiceOutput(policy="interrupt", known_signs=get_available_signs())
     
-    # Current mode and sign name
-    mode = "recognize"  # Start in recognize mode
-    current_sign_name = None
+    # Current mode and sign name, plus the latest recognition output shown by
+    # the render loop. The lock guards only this snapshot: sign_recorder is
+    # owned by the recognition thread, and the keyboard reaches it through
+    # the commands queue, so a slow recognition pass never holds the lock.
+    state = {
+        "mode": "recognize",  # Start in recognize mode
+        "current_sign_name": None,
+        "sign_detected": "",
+        "is_recording": False,
+        "is_saving": False,
+        "sequence_length": 0,
+        "dtw_distance": None,
+    }
+    lock = threading.Lock()
+    commands = queue.SimpleQueue()
     
     print("\n" + "="*60)
     print("KEYBOARD CONTROLS")
     print("="*60)
     print("  'r' = Start/Stop Recording")
     print("  'm' = Toggle Mode (RECORD ↔ RECOGNIZE)")
+    print("  'c' = CONTINUOUS recognition (no record/stop needed)")
     print("  'n' = Record NEW Sign")
     print("  'q' = Quit")
     print("="*60)
@@ -82,294 +103,201 @@ def main():
         print("❌ ERROR: Cannot open webcam!")
         return
     
+    # Optional per-stage metrics: SIGN_METRICS=1 turns them on, then
+    # SIGN_METRICS_PORT serves /metrics and SIGN_METRICS_LOG appends JSON snapshots
+    metrics_server, metrics_log = None, None
+    if metrics.enabled and os.environ.get("SIGN_METRICS_PORT"):
+        metrics_server = metrics.serve(int(os.environ["SIGN_METRICS_PORT"]))
+        print(f"✓ Metrics at http://127.0.0.1:{os.environ['SIGN_METRICS_PORT']}/metrics")
+    if metrics.enabled and os.environ.get("SIGN_METRICS_LOG"):
+        metrics_log = JsonLogger(metrics, os.environ["SIGN_METRICS_LOG"])
+        metrics_log.start()
+
     print("\n✓ Webcam opened")
-    print(f"✓ Starting in '{mode.upper()}' mode\n")
-    
-    # Set up the Mediapipe environment
-    with mp.solutions.holistic.Holistic(
-        min_detection_confidence=0.5, min_tracking_confidence=0.5
-    ) as holistic:
-        
-        try:
-            # ============================================================
-            # MAIN CONTINUOUS LOOP
-            # ============================================================
-            while cap.isOpened():
-                ret, frame = cap.read()
-                
-                if not ret:
-                    print("❌ Failed to read frame from webcam")
-                    break
+    print(f"✓ Starting in '{state['mode'].upper()}' mode\n")
 
-                # Make detections
-                image, results = mediapipe_detection(frame, holistic)
+    landmarker = LandmarkerService(running_mode="video")
 
-                # Process results
-                sign_detected, is_recording = sign_recorder.process_results(results)
-                sequence_length = len(sign_recorder.recorded_results)
+    def detect(packet):
+        """Inference stage: hand landmarks of one frame (MediaPipe expects RGB)."""
+        _, packet.results = mediapipe_detection(cv2.cvtColor(packet.image, cv2.COLOR_BGR2RGB), landmarker)
 
-                # Update the frame (draw landmarks & display result)
-                webcam_manager.update(
-                    frame=image,
-                    results=results,
-                    sign_detected=sign_detected,
-                    is_recording=is_recording,
-                    sequence_length=sequence_length,
-                    current_mode=mode,
-                    current_sign_name=current_sign_name,
-                    dtw_distance=sign_recorder.last_dtw_distance
-                )
+    def recognize(packet):
+        """Recognition stage: apply pending commands, then feed the landmarks to the recorder."""
+        while True:
+            try:
+                commands.get_nowait()(sign_recorder)
+            except queue.Empty:
+                break
+        sign_detected, is_recording = sign_recorder.process_results(packet.results)
+        mode = sign_recorder.mode
 
-                # Handle keyboard input
-                pressedKey = cv2.waitKey(1) & 0xFF
-                
-                if pressedKey == ord("r"):
-                    # Toggle recording
-                    if is_recording or sign_recorder.is_saving:
-                        sign_recorder.stop_recording()
-                        print("⏹ Recording stopped")
-                    else:
-                        if mode == "record":
-                            if current_sign_name:
-                                sign_recorder.record(current_sign_name)
-                                print(f"🎥 Recording '{current_sign_name}'...")
-                            else:
-                                print("⚠ No sign name set. Press 'n' to record a new sign.")
-                        else:
-                            sign_recorder.record()
-                            print("🎥 Recording gesture for recognition...")
-                        
-                elif pressedKey == ord("m"):
-                    # Toggle mode
-                    if mode == "record":
-                        mode = "recognize"
-                        current_sign_name = None
-                    else:
-                        mode = "record"
-                    
-                    sign_recorder.mode = mode
-                    voice_output.reset()
-                    print(f"\n✓ Switched to '{mode.upper()}' mode\n")
-                    
-                elif pressedKey == ord("n"):
-                    # Record new sign
-                    if mode != "record":
-                        print("⚠ Switch to RECORD mode first (press 'm')")
-                    else:
-                        new_sign_name = get_sign_name_input()
-                        if new_sign_name:
-                            current_sign_name = new_sign_name
-                            sign_recorder.record(current_sign_name)
-                            print(f"🎥 Recording '{current_sign_name}'...")
-                    
-                elif pressedKey == ord("q"):
-                    # Quit cleanly
-                    print("\n🛑 Closing application...")
-                    sign_recorder.stop_recording()
-                    break
-                
-                # Speak recognized sign (only in recognize mode and when sign changes)
-                if mode == "recognize" and sign_detected and not is_recording:
-                    if sign_detected != "Unknown Sign" and sign_detected != "No reference signs":
-                        voice_output.speak_sign(sign_detected)
-        
-        except KeyboardInterrupt:
-            print("\n⚠ Interrupted by user")
-        
-        finally:
-            # Cleanup
-            cap.release()
-            cv2.destroyAllWindows()
-            voice_output.cleanup()
-            print("✓ Webcam released")
-            print("✓ Windows closed")
-            print("✓ Voice output cleaned up")
-            print("\n✓ Program closed gracefully\n")
+        with lock:
+            state["sign_detected"], state["is_recording"] = sign_detected, is_recording
+            state["is_saving"] = sign_recorder.is_saving
+            state["sequence_length"] = sign_recorder.num_frames
+            state["dtw_distance"] = sign_recorder.last_dtw_distance
 
+        # Speak recognized sign (only in recognize mode and when sign changes);
+        # this only queues the utterance for the voice thread
+        if mode in ("recognize", "continuous") and sign_detected and not is_recording:
+            if sign_detected != "Unknown Sign" and sign_detected != "No reference signs":
+                voice_output.speak_sign(sign_detected)
 
-if __name__ == "__main__":
-    try:
-        main()
-    except Exception as e:
-        print(f"❌ Fatal error: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
-=======
-import streamlit as st
-import cv2
-import mediapipe as mp
-import numpy as np
-from PIL import Image
-
-from utils.dataset_utils import load_dataset, load_reference_signs
-from utils.mediapipe_utils import mediapipe_detection
-from utils.sign_storage import get_available_signs
-from sign_recorder import SignRecorder
-from webcam_manager import WebcamManager
-
-# Cache the model loading to avoid reloading on every rerun
-@st.cache_resource
-def load_sign_model():
-    """Load the sign recognition model once and cache it."""
-    videos = load_dataset()
-    reference_signs = load_reference_signs(videos)
-    return SignRecorder(reference_signs, mode="recognize")
+    # Frames flow capture -> inference -> (recognition, render)
+    inference_queue = DropOldestQueue(2)
+    recognition_queue = DropOldestQueue(4)
+    render_queue = DropOldestQueue(2)
+    latency = LatencyTracker()
 
-@st.cache_resource
-def load_webcam_manager():
-    """Load the webcam manager once and cache it."""
-    return WebcamManager()
+    capture = Capture(cap.read, inference_queue)
+    stages = [
+        Stage("inference", detect, inference_queue, (recognition_queue, render_queue), latency),
+        Stage("recognition", recognize, recognition_queue, tracker=latency),
+    ]
+    capture.start()
+    for stage in stages:
+        stage.start()
 
+    try:
+        # ============================================================
+        # RENDER LOOP
+        # ============================================================
+        while True:
+            # A failed stage has stopped; stop too instead of running without it
+            if any(stage.error is not None for stage in stages):
+                print("\n❌ A pipeline stage failed; closing application...")
+                break
 
-# ============================================================================
-# TODO: FUTURE ENHANCEMENTS
-# ============================================================================
-# 1. Static Alphabet Recognition
-#    - Add a separate ML classifier for A-Z sign alphabet recognition
-#    - Use with a dedicated model (e.g., CNN on hand landmarks)
-#    - Can be triggered by a special key combination (e.g., 'a' for alphabet mode)
-#
-# 2. Speech-to-Sign
-#    - Add speech recognition input (using speech_recognition library)
-#    - Convert spoken words to corresponding signs
-#    - Display animated sign sequences
-# ============================================================================
+            packet = render_queue.get_latest(timeout=1.0)
+            if packet is None:
+                if render_queue.closed:
+                    break
+                continue
 
+            with lock:
+                mode, current_sign_name = state["mode"], state["current_sign_name"]
+                sign_detected, is_recording = state["sign_detected"], state["is_recording"]
+                is_saving = state["is_saving"]
+                sequence_length, dtw_distance = state["sequence_length"], state["dtw_distance"]
 
-def main():
-    """Main Streamlit application."""
-    
-    st.title("🤟 Sign Language Recognition System")
-    st.markdown("Real-time sign language recognition using MediaPipe and DTW")
-    
-    # Initialize session state
-    if 'mode' not in st.session_state:
-        st.session_state.mode = "recognize"
-    if 'current_sign_name' not in st.session_state:
-        st.session_state.current_sign_name = None
-    if 'sign_recorder' not in st.session_state:
-        # Load data
-        videos = load_dataset()
-        reference_signs = load_reference_signs(videos)
-        st.session_state.sign_recorder = SignRecorder(reference_signs, mode=st.session_state.mode)
-    if 'webcam_manager' not in st.session_state:
-        st.session_state.webcam_manager = WebcamManager()
-    
-    # Sidebar controls
-    st.sidebar.header("Controls")
-    
-    # Mode toggle
-    if st.sidebar.button("Toggle Mode (Record ↔ Recognize)"):
-        if st.session_state.mode == "record":
-            st.session_state.mode = "recognize"
-            st.session_state.current_sign_name = None
-        else:
-            st.session_state.mode = "record"
-        st.session_state.sign_recorder.mode = st.session_state.mode
-        st.rerun()
-    
-    st.sidebar.write(f"Current Mode: **{st.session_state.mode.upper()}**")
-    
-    # Record new sign (only in record mode)
-    if st.session_state.mode == "record":
-        with st.sidebar.form("new_sign_form"):
-            st.write("Record New Sign")
-            sign_name = st.text_input("Sign Name", placeholder="e.g., Hello, Thanks")
-            submit = st.form_submit_button("Start Recording New Sign")
-            if submit and sign_name.strip():
-                st.session_state.current_sign_name = sign_name.strip()
-                st.session_state.sign_recorder.record(st.session_state.current_sign_name)
-                st.success(f"Recording '{st.session_state.current_sign_name}'...")
-                st.rerun()
-    
-    # Camera input
-    st.header("Camera Input")
-    camera_image = st.camera_input("Take a photo for sign recognition/recording")
-    
-    if camera_image is not None:
-        # Convert PIL image to numpy array
-        image = np.array(Image.open(camera_image))
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)  # PIL is RGB, OpenCV is BGR
-        
-        # Set up MediaPipe
-        with mp.solutions.holistic.Holistic(
-            min_detection_confidence=0.5, min_tracking_confidence=0.5
-        ) as holistic:
-            # Process with MediaPipe
-            processed_image, results = mediapipe_detection(image, holistic)
-            
-            # Process results with sign recorder
-            sign_detected, is_recording = st.session_state.sign_recorder.process_results(results)
-            sequence_length = len(st.session_state.sign_recorder.recorded_results)
-            
-            # Draw landmarks on image
-            display_image = st.session_state.webcam_manager.draw_landmarks_on_image(processed_image.copy(), results)
-            
-            # Add text overlay
-            display_image = st.session_state.webcam_manager.add_text_overlay(
-                display_image, 
+            # Draw landmarks & display result
+            image = webcam_manager.draw_landmarks_on_image(packet.image, packet.results)
+            image = webcam_manager.add_text_overlay(
+                image,
                 sign_detected=sign_detected,
                 is_recording=is_recording,
                 sequence_length=sequence_length,
-                current_mode=st.session_state.mode,
-                current_sign_name=st.session_state.current_sign_name,
-                dtw_distance=st.session_state.sign_recorder.last_dtw_distance
+                current_mode=mode,
+                current_sign_name=current_sign_name,
+                dtw_distance=dtw_distance
             )
+            cv2.imshow("Sign Language Recognition", image)
+            packet.stamp("render")
+            latency.record(packet, "render")
+
+            # Handle keyboard input
+            pressedKey = cv2.waitKey(1) & 0xFF
             
-            # Display the image
-            st.image(display_image, channels="BGR", use_column_width=True)
-            
-            # Show results
-            if sign_detected:
-                st.success(f"Detected Sign: **{sign_detected}**")
-            
-            if is_recording:
-                st.info(f"Recording... ({sequence_length}/50 frames)")
-    
-    # Action buttons
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        if st.button("Start/Stop Recording"):
-            if st.session_state.sign_recorder.is_recording or st.session_state.sign_recorder.is_saving:
-                st.session_state.sign_recorder.stop_recording()
-                st.success("Recording stopped")
-            else:
-                if st.session_state.mode == "record":
-                    if st.session_state.current_sign_name:
-                        st.session_state.sign_recorder.record(st.session_state.current_sign_name)
-                        st.info(f"Recording '{st.session_state.current_sign_name}'...")
+            if pressedKey == ord("r"):
+                # Toggle recording
+                if is_recording or is_saving:
+                    commands.put(SignRecorder.stop_recording)
+                    print("⏹ Recording stopped")
+                else:
+                    if mode == "record":
+                        if current_sign_name:
+                            commands.put(lambda recorder, name=current_sign_name: recorder.record(name))
+                            print(f"🎥 Recording '{current_sign_name}'...")
+                        else:
+                            print("⚠ No sign name set. Press 'n' to record a new sign.")
+                    else:
+                        commands.put(SignRecorder.record)
+                        print("🎥 Recording gesture for recognition...")
+                    
+            elif pressedKey == ord("m"):
+                # Toggle mode
+                with lock:
+                    if mode == "record":
+                        state["mode"] = "recognize"
+                        state["current_sign_name"] = None
                     else:
-                        st.error("No sign name set. Record a new sign first.")
+                        state["mode"] = "record"
+                    new_mode = state["mode"]
+                commands.put(lambda recorder, mode=new_mode: setattr(recorder, "mode", mode))
+                voice_output.reset()
+                print(f"\n✓ Switched to '{state['mode'].upper()}' mode\n")
+                
+            elif pressedKey == ord("c"):
+                # Switch to continuous recognition
+                with lock:
+                    state["mode"] = "continuous"
+                    state["current_sign_name"] = None
+
+                def go_continuous(recorder):
+                    recorder.stop_recording()
+                    recorder.mode = "continuous"
+
+                commands.put(go_continuous)
+                voice_output.reset()
+                print(f"\n✓ Switched to '{state['mode'].upper()}' mode\n")
+                
+            elif pressedKey == ord("n"):
+                # Record new sign
+                if mode != "record":
+                    print("⚠ Switch to RECORD mode first (press 'm')")
                 else:
-                    st.session_state.sign_recorder.record()
-                    st.info("Recording gesture for recognition...")
-            st.rerun()
-    
-    with col2:
-        if st.button("Process Current Frame"):
-            if camera_image is not None:
-                st.info("Processing current frame...")
-                # Re-process the current image
-                st.rerun()
-            else:
-                st.warning("Please take a photo first")
+                    # Capture keeps running meanwhile; stale frames are dropped
+                    new_sign_name = get_sign_name_input()
+                    if new_sign_name:
+                        with lock:
+                            state["current_sign_name"] = new_sign_name
+                        commands.put(lambda recorder, name=new_sign_name: recorder.record(name))
+                        print(f"🎥 Recording '{new_sign_name}'...")
+                
+            elif pressedKey == ord("q"):
+                # Quit cleanly
+                print("\n🛑 Closing application...")
+                break
     
-    with col3:
-        if st.button("Clear Results"):
-            st.session_state.sign_recorder.stop_recording()
-            st.session_state.sign_recorder.recorded_results = []
-            st.success("Results cleared")
-            st.rerun()
+    except KeyboardInterrupt:
+        print("\n⚠ Interrupted by user")
     
-    # Available signs
-    available_signs = get_available_signs()
-    if available_signs:
-        st.sidebar.write("Available Signs:")
-        for sign in available_signs:
-            st.sidebar.write(f"- {sign}")
+    finally:
+        # Cleanup: stopping capture closes the queues stage by stage
+        capture.stop()
+        capture.join(timeout=2.0)
+        for stage in stages:
+            stage.join(timeout=2.0)
+            if stage.error is not None:
+                print(f"❌ {stage.name} stage failed: {stage.error}")
+        # The recognition thread has stopped; the recorder is the main thread's now
+        sign_recorder.stop_recording()
+        cap.release()
+        landmarker.close()
+        cv2.destroyAllWindows()
+        voice_output.cleanup()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if metrics_log is not None:
+            metrics_log.stop()
+        print("✓ Webcam released")
+        print("✓ Windows closed")
+        print("✓ Voice output cleaned up")
+
+        print(f"✓ Frames captured: {capture.captured}, dropped before inference: {inference_queue.dropped}, "
+              f"before recognition: {recognition_queue.dropped}, before render: {render_queue.dropped}")
+        for stage, stats in latency.summary().items():
+            print(f"  {stage:<12} latency p50 {stats['p50']:.1f} ms, p95 {stats['p95']:.1f} ms "
+                  f"over {stats['frames']} frames")
+        print("\n✓ Program closed gracefully\n")
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except Exception as e:
+        print(f"❌ Fatal error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,273 @@
+import os
+
+import numpy as np
+
+from utils.dtw import paa
+
+# Stored next to the sign store's index
+ANN_INDEX_FILE = "ann-index.npz"
+
+# Sequences the PCA projection is fitted on, at most
+PCA_SAMPLES = 1024
+
+# Centroids are retrained once the index holds this many times the vectors they were trained on
+RETRAIN_FACTOR = 4
+
+
+class GestureEmbedder:
+    def __init__(self, num_frames=16, dims=None, mean=None, components=None):
+        """
+        Maps variable-length feature sequences to fixed-length unit vectors.
+
+        A sequence is resampled to num_frames by piecewise aggregate
+        approximation, hands absent from it are zeroed, and the flattened
+        frames are centered and scaled to unit length. With dims set, fit
+        learns a PCA projection to that many dimensions.
+
+        :param num_frames: Frames kept per sequence
+        :param dims: PCA dimensions, None to keep the full vector
+        :param mean: PCA mean, set by fit
+        :param components: PCA components of shape (dims, full dims), set by fit
+        """
+        self.num_frames = num_frames
+        self.dims = dims
+        self.mean = mean
+        self.components = components
+
+    def _normalized(self, coarse, hand_mask):
+        """Centered unit vectors of PAA frames of shape (batch, num_frames, hands, dims)."""
+        coarse = coarse * np.asarray(hand_mask, dtype=np.float32)[:, None, :, None]
+        vectors = coarse.reshape(len(coarse), -1)
+        vectors = vectors - vectors.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def fit(self, coarse, hand_mask, seed=0):
+        """
+        Learn the PCA projection, if dims is set, from a sample of PCA_SAMPLES sequences.
+
+        :param coarse: PAA frames of shape (batch, num_frames, hands, dims)
+        :param hand_mask: (batch, hands) hands present per sequence
+        :return: self
+        """
+        if self.dims is None or len(coarse) == 0:
+            return self
+        if len(coarse) > PCA_SAMPLES:
+            sample = np.sort(np.random.default_rng(seed).choice(len(coarse), PCA_SAMPLES, replace=False))
+            coarse, hand_mask = coarse[sample], np.asarray(hand_mask)[sample]
+        vectors = self._normalized(coarse, hand_mask)
+        self.mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - self.mean, full_matrices=False)
+        self.components = vt[:self.dims].astype(np.float32)
+        return self
+
+    def transform(self, coarse, hand_mask):
+        """
+        Embed PAA frames.
+
+        :param coarse: PAA frames of shape (batch, num_frames, hands, dims)
+        :param hand_mask: (batch, hands) hands present per sequence
+        :return: float32 array of shape (batch, embedding dims)
+        """
+        vectors = self._normalized(coarse, hand_mask)
+        if self.components is not None:
+            vectors = (vectors - self.mean) @ self.components.T
+        return vectors.astype(np.float32)
+
+    def library_frames(self, library, start=0):
+        """PAA frames of library templates start.., reusing the library's own resolution when it has it."""
+        if self.num_frames in library.paa_frames:
+            return library.paa_frames[self.num_frames][start:]
+        return paa(library.frames[start:], library.lengths[start:], self.num_frames)
+
+    def query_frames(self, features):
+        """PAA frames of one prepared query of shape (n, hands, dims), with a batch axis."""
+        return paa(features[None], [len(features)], self.num_frames)
+
+
+class IVFIndex:
+    def __init__(self, embedder, nprobe=8, key=None):
+        """
+        Inverted-file index over gesture embeddings, for candidate generation.
+
+        Vectors are clustered by k-means into about sqrt(n) lists. A query is
+        compared with the centroids, and only the members of the nprobe
+        closest lists (more when they hold too few) are compared with it, so
+        candidate generation costs about sqrt(n) instead of n distances.
+        Results are approximate; recognition re-ranks them with DTW.
+
+        Positions in the index are template indices of the library it was
+        built from; ids (the templates' store offsets) check that a saved
+        index still lines up with the store.
+
+        :param embedder: GestureEmbedder
+        :param nprobe: Lists searched per query
+        :param key: Identifies the store and pipeline the index was built for
+        """
+        self.embedder = embedder
+        self.nprobe = nprobe
+        self.key = key
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.assignments = np.zeros(0, dtype=np.int64)
+        self.trained = 0
+        # Members of every list: template indices ordered by list, and each list's start
+        self._lists = None
+
+    @classmethod
+    def build(cls, library, ids, num_frames=16, dims=None, nprobe=8, key=None):
+        """
+        Embed every template of a library and train the index on them.
+
+        :param library: TemplateLibrary
+        :param ids: Store offset of each template
+        :param num_frames: Frames per embedded sequence
+        :param dims: PCA dimensions, None for none
+        :return: IVFIndex
+        """
+        embedder = GestureEmbedder(num_frames, dims)
+        embedder.fit(embedder.library_frames(library), library.hand_mask)
+        index = cls(embedder, nprobe, key)
+        index.add(library, ids)
+        return index
+
+    def add(self, library, ids):
+        """
+        Append the library templates not yet in the index.
+
+        New vectors join the list of their nearest centroid; the centroids
+        are retrained once the index has grown RETRAIN_FACTOR times.
+
+        :param library: TemplateLibrary whose first len(self) templates are indexed
+        :param ids: Store offset of each template of the library
+        """
+        start = len(self)
+        if len(library) == start:
+            return
+        vectors = self.embedder.transform(self.embedder.library_frames(library, start), library.hand_mask[start:])
+        self.vectors = np.concatenate([self.vectors.reshape(start, vectors.shape[1]), vectors])
+        self.ids = np.asarray(ids, dtype=np.int64)[:len(self.vectors)]
+        if len(self.vectors) > RETRAIN_FACTOR * self.trained:
+            self.train()
+        else:
+            self.assignments = np.concatenate([self.assignments, self._nearest_centroid(vectors)])
+            self._lists = None
+
+    def sync(self, library, ids):
+        """
+        Bring a loaded index up to date with the library.
+
+        Templates deleted from the store are dropped and templates appended
+        to it are added, as long as the rest still line up.
+
+        :return: False if the index no longer matches and must be rebuilt
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        keep = np.isin(self.ids, ids)
+        if not np.array_equal(self.ids[keep], ids[:np.count_nonzero(keep)]):
+            return False
+        if not keep.all():
+            self.vectors, self.ids, self.assignments = self.vectors[keep], self.ids[keep], self.assignments[keep]
+            self._lists = None
+        self.add(library, ids)
+        return True
+
+    def train(self, iterations=10, seed=0):
+        """Cluster the vectors into about sqrt(n) lists with k-means."""
+        rng = np.random.default_rng(seed)
+        nlist = max(1, int(np.sqrt(len(self.vectors))))
+        centroids = self.vectors[rng.choice(len(self.vectors), nlist, replace=False)]
+        for _ in range(iterations):
+            self.centroids = centroids
+            assignments = self._nearest_centroid(self.vectors)
+            # One-hot product: much faster than np.add.at for wide vectors
+            members = np.zeros((nlist, len(self.vectors)), dtype=np.float32)
+            members[assignments, np.arange(len(self.vectors))] = 1
+            sums = members @ self.vectors
+            counts = np.bincount(assignments, minlength=nlist)
+            # Empty lists keep their centroid
+            means = sums / np.maximum(counts, 1)[:, None].astype(np.float32)
+            centroids = np.where(counts[:, None] > 0, means, centroids)
+        self.centroids = centroids
+        self.assignments = self._nearest_centroid(self.vectors)
+        self.trained = len(self.vectors)
+        self._lists = None
+
+    def _nearest_centroid(self, vectors):
+        return np.argmin(_sq_distances(vectors, self.centroids), axis=1)
+
+    def search(self, features, query_mask, count):
+        """
+        Approximate nearest templates of a query.
+
+        :param features: Prepared query features of shape (n, hands, dims)
+        :param query_mask: [left, right] hands present in the query
+        :param count: Number of templates to return
+        :return: Template indices, in ascending order
+        """
+        if len(self) <= count:
+            return np.arange(len(self))
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            starts = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = order, starts
+        order, starts = self._lists
+
+        query = self.embedder.transform(self.embedder.query_frames(features), np.asarray(query_mask)[None])
+        probes = np.argsort(_sq_distances(query, self.centroids)[0])
+        sizes = starts[probes + 1] - starts[probes]
+        # Probe further lists until they hold enough members
+        probed = max(self.nprobe, int(np.searchsorted(np.cumsum(sizes), count)) + 1)
+        members = np.concatenate([order[starts[p]:starts[p + 1]] for p in probes[:probed]])
+        if len(members) > count:
+            distances = _sq_distances(query, self.vectors[members])[0]
+            members = members[np.argpartition(distances, count - 1)[:count]]
+        return np.sort(members)
+
+    def save(self, path):
+        """Write the index, atomically since several processes may build it at once."""
+        embedder = self.embedder
+        temp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            temp_path, key=np.array(self.key or ""), nprobe=self.nprobe, num_frames=embedder.num_frames,
+            dims=-1 if embedder.dims is None else embedder.dims,
+            mean=np.zeros(0) if embedder.mean is None else embedder.mean,
+            components=np.zeros((0, 0)) if embedder.components is None else embedder.components,
+            vectors=self.vectors, ids=self.ids, centroids=self.centroids, assignments=self.assignments,
+            trained=self.trained,
+        )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, key=None):
+        """
+        Read an index written by save.
+
+        :param key: Expected key; an index of another store or pipeline is ignored
+        :return: IVFIndex, or None if missing or stale
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if key is not None and str(data["key"]) != key:
+                return None
+            dims = int(data["dims"])
+            embedder = GestureEmbedder(
+                int(data["num_frames"]), None if dims < 0 else dims,
+                data["mean"] if dims >= 0 else None, data["components"] if dims >= 0 else None
+            )
+            index = cls(embedder, int(data["nprobe"]), str(data["key"]) or None)
+            index.vectors, index.ids = data["vectors"], data["ids"]
+            index.centroids, index.assignments = data["centroids"], data["assignments"]
+            index.trained = int(data["trained"])
+        return index
+
+    def __len__(self):
+        return len(self.vectors)
+
+
+def _sq_distances(a, b):
+    """Squared Euclidean distances between the rows of a and b."""
+    return (np.einsum("ij,ij->i", a, a)[:, None] - 2 * a @ b.T + np.einsum("ij,ij->i", b, b)[None]).astype(
+        np.float32)
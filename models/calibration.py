@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from utils.dtw import batch_dtw
+
+# Stored next to the sign store's index
+CALIBRATION_FILE = "calibration.json"
+# Bumped when fit changes, so calibrations of earlier versions are refitted
+CALIBRATION_VERSION = 2
+
+# Genuine distances of a sign are assumed to spread at least this much
+# relative to their mean, since most signs have only a few templates
+MIN_RELATIVE_SPREAD = 0.25
+
+# Without any multi-template sign, the default threshold is this fraction of
+# the median distance from a template to the nearest other sign
+IMPOSTOR_FRACTION = 0.5
+
+# Threshold when nothing can be learned (a single template), in normalized
+# distance units; the default dtw_threshold of SignRecorder
+FALLBACK_THRESHOLD = 1.0
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -500, 500)))
+
+
+class SignCalibration:
+    def __init__(self, thresholds, default_threshold, intercept=4.0, slope=-4.0, key=None):
+        """
+        Per-sign acceptance thresholds and a confidence model on normalized DTW distances.
+
+        The confidence of a match is a logistic function of its distance
+        relative to the sign's threshold, so a distance at the threshold
+        scores about 0.5 with the default coefficients.
+
+        :param thresholds: Dictionary of sign_name -> normalized distance threshold
+        :param default_threshold: Threshold of signs without a learned one
+        :param intercept: Logistic intercept
+        :param slope: Logistic slope on distance / threshold
+        :param key: Identifies the library the calibration was fitted on
+        """
+        self.thresholds = dict(thresholds)
+        self.default_threshold = default_threshold
+        self.intercept = intercept
+        self.slope = slope
+        self.key = key
+
+    @classmethod
+    def fit(cls, library, window=None, z=2.0, max_queries=64, default_threshold=FALLBACK_THRESHOLD, key=None, seed=0):
+        """
+        Learn thresholds and the confidence model from the library's own templates.
+
+        Every template is matched against the other templates of its sign
+        (genuine distances); a sample of templates is also matched against
+        all other signs (the nearest one gives an impostor distance). A sign's
+        threshold is mean + z * std of its genuine distances; the logistic
+        confidence is fitted to separate genuine from impostor distances.
+
+        Signs with a single template get the median learned threshold. When
+        no sign has two templates, as right after recording one take per
+        sign, it is IMPOSTOR_FRACTION of the median impostor distance instead.
+
+        :param library: TemplateLibrary
+        :param window: Sakoe-Chiba band half-width used for recognition
+        :param z: Standard deviations above the mean genuine distance to accept
+        :param max_queries: Templates sampled for impostor distances
+        :param default_threshold: Used for signs with a single template when
+            there are neither learned thresholds nor impostor distances
+        :return: SignCalibration
+        """
+        genuine = cls._genuine_distances(library, window)
+        thresholds = {}
+        for sign, distances in genuine.items():
+            mean = float(np.mean(distances))
+            spread = max(float(np.std(distances)), MIN_RELATIVE_SPREAD * mean)
+            thresholds[sign] = mean + z * spread
+        impostors = cls._impostor_distances(library, window, max_queries, seed)
+        if thresholds:
+            default_threshold = float(np.median(list(thresholds.values())))
+        elif impostors:
+            default_threshold = IMPOSTOR_FRACTION * float(np.median([d.min() for d in impostors]))
+        calibration = cls(thresholds, default_threshold, key=key)
+
+        # Logistic fit of P(genuine | distance / threshold)
+        ratios = [d / calibration.threshold(sign) for sign, ds in genuine.items() for d in ds]
+        sign_thresholds = np.array([calibration.threshold(sign) for sign in library.sign_names])
+        impostors = [float(np.min(d / sign_thresholds[library.sign_ids])) for d in impostors]
+        if ratios and impostors:
+            x = np.concatenate([ratios, impostors])
+            y = np.concatenate([np.ones(len(ratios)), np.zeros(len(impostors))])
+            calibration.intercept, calibration.slope = cls._fit_logistic(x, y)
+        return calibration
+
+    @staticmethod
+    def _genuine_distances(library, window):
+        """Nearest same-sign distance of every template of multi-template signs."""
+        genuine = {}
+        for sign_id, sign in enumerate(library.sign_names):
+            members = np.flatnonzero(library.sign_ids == sign_id)
+            if len(members) < 2:
+                continue
+            for i in members:
+                others = members[members != i]
+                length, mask = library.lengths[i], library.hand_mask[i]
+                hand_weights = library.hand_mask[others] & mask
+                distances = batch_dtw(library.frames[i, :length], library.frames[others], library.lengths[others],
+                                      hand_weights, window, library.sq_norms[others])
+                # Same normalization as TemplateLibrary.normalize, on the subset
+                distances = distances / ((length + library.lengths[others]) * np.maximum(hand_weights.sum(axis=1), 1))
+                if np.isfinite(distances).any():
+                    genuine.setdefault(sign, []).append(float(np.min(distances)))
+        return genuine
+
+    @staticmethod
+    def _impostor_distances(library, window, max_queries, seed):
+        """
+        Normalized distances to every template of the other signs, for a sample of templates.
+
+        :return: List of arrays over the library, inf for the query's own sign
+        """
+        if len(library.sign_names) < 2:
+            return []
+        rng = np.random.default_rng(seed)
+        queries = np.arange(len(library))
+        if len(queries) > max_queries:
+            queries = rng.choice(queries, max_queries, replace=False)
+
+        impostors = []
+        for i in queries:
+            length, mask = library.lengths[i], library.hand_mask[i]
+            distances = library.score(library.frames[i, :length], mask, window, prepared=True)
+            distances = library.normalize(distances, length, mask)
+            distances[library.sign_ids == library.sign_ids[i]] = np.inf
+            if np.isfinite(distances).any():
+                impostors.append(distances)
+        return impostors
+
+    @staticmethod
+    def _fit_logistic(x, y, iterations=25, prior=(4.0, -4.0), l2=1.0):
+        """
+        Intercept and slope of a 1-D logistic regression, by Newton's method.
+
+        Weights are pulled towards the prior so few or separable samples give
+        a finite fit; the prior is kept if distance does not separate the classes.
+        """
+        prior = np.asarray(prior)
+        features = np.stack([np.ones_like(x), x], axis=1)
+        weights = prior.copy()
+        for _ in range(iterations):
+            p = _sigmoid(features @ weights)
+            gradient = features.T @ (p - y) + l2 * (weights - prior)
+            hessian = (features * (p * (1 - p))[:, None]).T @ features + l2 * np.eye(2)
+            step = np.linalg.solve(hessian, gradient)
+            weights -= step
+            if np.abs(step).max() < 1e-6:
+                break
+        if not np.all(np.isfinite(weights)) or weights[1] >= 0:
+            weights = prior
+        return float(weights[0]), float(weights[1])
+
+    def threshold(self, sign):
+        """Normalized distance threshold of a sign."""
+        return self.thresholds.get(sign, self.default_threshold)
+
+    def confidence(self, normalized_distance, sign):
+        """
+        Probability that a match with this normalized distance is the sign.
+
+        :return: float in [0, 1]
+        """
+        threshold = self.threshold(sign)
+        if not np.isfinite(normalized_distance):
+            return 0.0
+        if not np.isfinite(threshold):
+            # An unbounded threshold says nothing about the match
+            threshold = FALLBACK_THRESHOLD
+        return float(_sigmoid(self.intercept + self.slope * normalized_distance / threshold))
+
+    def save(self, path):
+        """Write the calibration as JSON, atomically since several processes or threads may fit it at once."""
+        temp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({
+                "version": CALIBRATION_VERSION, "key": self.key, "thresholds": self.thresholds, "default_threshold": self.default_threshold,
+                "intercept": self.intercept, "slope": self.slope,
+            }, f, indent=2)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, key=None):
+        """
+        Read a calibration written by save.
+
+        :param key: Expected library key; a calibration of another library is ignored
+        :return: SignCalibration, or None if missing or stale
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != CALIBRATION_VERSION or (key is not None and data.get("key") != key):
+            return None
+        return cls(data["thresholds"], data["default_threshold"], data["intercept"], data["slope"], data["key"])
@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from models.template_library import TemplateLibrary
+from utils.sign_storage import SignStore
+
+STATS_KEYS = ("templates", "pruned_index", "pruned_coarse", "pruned_kim", "pruned_paa", "pruned_keogh", "pruned_best_so_far",
+              "dtw", "abandoned")
+
+# Library state of a worker process, set up by _init_worker
+_worker = {}
+
+
+def _init_worker(directory, pipeline, shared_best):
+    """Open the sign store in a worker process; its frames are mapped, not copied."""
+    _worker["store"] = SignStore(directory)
+    _worker["pipeline"] = pipeline
+    _worker["shared_best"] = shared_best
+    _worker["version"] = None
+
+
+def _worker_shard(version, start, stop):
+    """Shard of the worker's library, reloading the store when it has changed."""
+    if _worker["version"] != version:
+        _worker["store"].load()
+        _worker["library"] = TemplateLibrary.from_store(_worker["store"], _worker["pipeline"])
+        _worker["shards"] = {}
+        _worker["version"] = version
+    shards = _worker["shards"]
+    if (start, stop) not in shards:
+        shards[(start, stop)] = _worker["library"].shard(start, stop)
+    return shards[(start, stop)]
+
+
+def _search_process_shard(version, start, stop, query, query_mask, window, threshold, k, shortlist, templates):
+    """Search one shard inside a worker process."""
+    shard = _worker_shard(version, start, stop)
+    return shard.search(query, query_mask, window, threshold, shared_best=_worker["shared_best"], k=k,
+                        shortlist=shortlist, templates=templates)
+
+
+class ParallelSearch:
+    def __init__(self, template_library, store, workers=None, shard_size=None, backend="process"):
+        """
+        Lower-bound search of a template library split into shards on a worker pool.
+
+        The pool is created once and kept. Process workers open the sign store
+        themselves, so template frames are shared through the page cache of
+        the memory-mapped block instead of being pickled per query. All shards
+        prune against one shared best-so-far distance.
+
+        :param template_library: TemplateLibrary searched by the thread backend
+            and used to reduce results per sign
+        :param store: SignStore the library was built from
+        :param workers: Pool size (default: number of CPUs)
+        :param shard_size: Templates per task (default: one shard per worker);
+            smaller shards balance load better at a higher dispatch cost
+        :param backend: "process", or "thread" to run shards in this process,
+            which scales only as far as the NumPy kernels release the GIL
+        """
+        if backend not in ("process", "thread"):
+            raise ValueError(f"Unknown backend: {backend}")
+        self.library = template_library
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.backend = backend
+
+        # Lowered by whichever shard finds a better match; reset per query
+        self.shared_best = multiprocessing.Value("d", float('inf'))
+
+        # Bumped whenever the store changes, so process workers reload it
+        self.version = 0
+        self._shards = {}
+
+        if backend == "process":
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(store.directory, template_library.pipeline, self.shared_best)
+            )
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def shard_ranges(self):
+        """(start, stop) template ranges of the shards."""
+        n = len(self.library)
+        size = self.shard_size or max(-(-n // self.workers), 1)
+        return [(start, min(start + size, n)) for start in range(0, n, size)]
+
+    def refresh(self):
+        """
+        Pick up templates added to the store and library since the last search.
+
+        The store's feature cache is brought up to date here, so workers only
+        ever read it.
+        """
+        if self.library.pipeline is not None:
+            self.store.features(self.library.pipeline)
+        self.version += 1
+        self._shards = {}
+
+    def search(self, query, query_mask, window=None, threshold=float('inf'), k=1, shortlist=None, templates=None):
+        """
+        Same contract as TemplateLibrary.search, with the shards scored in parallel.
+
+        For k > 1 every shard keeps its own k best signs, which is exact for
+        the merged top k but prunes less than one shared cutoff. A shortlist
+        applies per shard.
+
+        :return: Tuple of (distance per template, inf where pruned, summed stats dict)
+        """
+        self.shared_best.value = float('inf')
+        query = np.asarray(query, dtype=np.float32)
+        if templates is not None:
+            templates = np.asarray(templates)
+        futures = []
+        for start, stop in self.shard_ranges():
+            shard_templates = None
+            if templates is not None:
+                # Shards index their templates from 0
+                shard_templates = templates[(templates >= start) & (templates < stop)] - start
+            if self.backend == "process":
+                futures.append(self.executor.submit(
+                    _search_process_shard, self.version, start, stop, query, query_mask, window, threshold, k,
+                    shortlist, shard_templates
+                ))
+            else:
+                if (start, stop) not in self._shards:
+                    self._shards[(start, stop)] = self.library.shard(start, stop)
+                futures.append(self.executor.submit(
+                    self._shards[(start, stop)].search, query, query_mask, window, threshold,
+                    self.shared_best, k, shortlist, shard_templates
+                ))
+
+        distances = np.full(len(self.library), np.inf)
+        stats = dict.fromkeys(STATS_KEYS, 0)
+        for (start, stop), future in zip(self.shard_ranges(), futures):
+            shard_distances, shard_stats = future.result()
+            distances[start:stop] = shard_distances
+            for key in STATS_KEYS:
+                stats[key] += shard_stats[key]
+        return distances, stats
+
+    def close(self):
+        """Shut the worker pool down."""
+        self.executor.shutdown()
@@ -0,0 +1,142 @@
+import numpy as np
+
+from models.template_library import HAND_DIMS, NUM_HANDS
+
+
+class StreamMatcher:
+    def __init__(self, template_library, threshold, history=None):
+        """
+        Subsequence DTW (SPRING) of a live frame stream against every template.
+
+        One matrix row per template is kept and advanced by one frame at a time,
+        so each frame costs O(templates x template_len) regardless of how long
+        the stream has been running. A match is reported once no continuation
+        of the stream can improve it.
+
+        :param template_library: TemplateLibrary to match against
+        :param threshold: Maximum normalized DTW distance of a reported match: distance
+            divided by (matched + template frames) x template hands, as in
+            TemplateLibrary.normalize
+        :param history: Number of recent frames kept in the ring buffer
+            (default: twice the longest template)
+        """
+        self.library = template_library
+        self.threshold = threshold
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        """Forget the stream and all partial matches."""
+        num_templates, width = len(self.library), self.library.frames.shape[1]
+        capacity = self.history or max(2 * width, 1)
+
+        # Ring buffer of the latest frames; frame t lives at slot t % capacity
+        self.frames = np.zeros((capacity, NUM_HANDS, HAND_DIMS), dtype=np.float32)
+        self.frame_index = 0
+
+        # SPRING state: accumulated distance and start frame of every cell
+        self._distance = np.full((num_templates, width), np.inf)
+        self._start = np.zeros((num_templates, width), dtype=np.int64)
+
+        # Best pending match per template, not yet reported
+        self._best = np.full(num_templates, np.inf)
+        self._best_start = np.zeros(num_templates, dtype=np.int64)
+        self._best_end = np.zeros(num_templates, dtype=np.int64)
+
+    def update(self, frame):
+        """
+        Consume one frame and return the matches it closes.
+
+        :param frame: Landmarks of shape (2, 63), zeros for a missing hand
+        :return: List of detections, best first, each a dict with keys
+            sign, distance, start and end (inclusive frame indices)
+        """
+        if self._distance.shape != (len(self.library), self.library.frames.shape[1]):
+            # Templates were added to the library; restart matching with them
+            self.reset()
+
+        t = self.frame_index
+        self.frames[t % len(self.frames)] = frame
+        self.frame_index += 1
+        if len(self.library) == 0:
+            return []
+
+        # Features of the new frame; the previous one is passed along for the
+        # pipeline steps that look at motion
+        context = self.frames[np.arange(max(t - 1, 0), t + 1) % len(self.frames)]
+        present = np.any(context[-1] != 0, axis=1)
+        frame = self.library.prepare(context)[-1]
+
+        lib = self.library
+        columns = np.arange(lib.frames.shape[1])
+        valid = columns < lib.lengths[:, None]
+
+        # Frame cost against every template frame, over the hands present in
+        # both the frame and the template, as in utils.dtw.batch_dtw
+        hand_weights = lib.hand_mask & present
+        sq = np.einsum("hd,hd->h", frame, frame)[None, :, None] + lib.sq_norms
+        sq -= 2.0 * np.einsum("hd,bmhd->bhm", frame, lib.frames)
+        cost = np.einsum("bhm,bh->bm", np.sqrt(np.maximum(sq, 0.0)), hand_weights.astype(np.float32))
+
+        # Best predecessor from the previous frame: D[t-1, j] or D[t-1, j-1].
+        # A match may start at any frame, so column 0 is entered at cost 0.
+        prev, prev_start = self._distance, self._start
+        diag = np.concatenate([np.zeros((len(prev), 1)), prev[:, :-1]], axis=1)
+        diag_start = np.concatenate([np.full((len(prev), 1), t), prev_start[:, :-1]], axis=1)
+        step = np.minimum(prev, diag)
+        step_start = np.where(diag <= prev, diag_start, prev_start)
+
+        # Same row scan as utils.dtw.accumulated_cost, tracking where the
+        # prefix minimum came from to propagate start frames
+        running = np.cumsum(cost, axis=1)
+        offset = step - (running - cost)
+        prefix = np.minimum.accumulate(offset, axis=1)
+        source = np.maximum.accumulate(np.where(offset <= prefix, columns, 0), axis=1)
+        distance = running + prefix
+        start = np.take_along_axis(step_start, source, axis=1)
+        distance[~valid] = np.inf
+        # A frame sharing no hand with a template ends every alignment with it
+        distance[~hand_weights.any(axis=1)] = np.inf
+
+        detections = []
+        rows = np.arange(len(lib))
+        last = lib.lengths - 1
+
+        # Report a pending match once no cell can still improve on it
+        # within an overlapping alignment
+        pending = np.isfinite(self._best)
+        blocked = (distance < self._best[:, None]) & (start <= self._best_end[:, None])
+        report = pending & ~blocked.any(axis=1)
+        for b in np.flatnonzero(report):
+            detections.append({
+                "sign": lib.names[b],
+                "distance": float(self._best[b]),
+                "start": int(self._best_start[b]),
+                "end": int(self._best_end[b]),
+            })
+        overlapping = report[:, None] & (start <= self._best_end[:, None])
+        distance[overlapping] = np.inf
+        self._best[report] = np.inf
+
+        # Candidate matches ending at this frame
+        end_distance = distance[rows, last]
+        end_start = start[rows, last]
+        scale = (t - end_start + 1 + lib.lengths) * np.maximum(np.count_nonzero(lib.hand_mask, axis=1), 1)
+        better = (end_distance <= self.threshold * scale) & (end_distance < self._best)
+        self._best[better] = end_distance[better]
+        self._best_start[better] = end_start[better]
+        self._best_end[better] = t
+
+        self._distance, self._start = distance, start
+        return sorted(detections, key=lambda d: d["distance"])
+
+    def recent_frames(self, start, end):
+        """
+        Frames start..end (inclusive) from the ring buffer.
+
+        :return: float32 array of shape (end - start + 1, 2, 63)
+        :raises ValueError: if the frames have left the buffer
+        """
+        if start < self.frame_index - len(self.frames) or end >= self.frame_index:
+            raise ValueError(f"Frames {start}..{end} are no longer buffered")
+        return self.frames[np.arange(start, end + 1) % len(self.frames)]
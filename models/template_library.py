@@ -0,0 +1,601 @@
+import collections
+
+import numpy as np
+
+from utils.dtw import (batch_dtw, keogh_envelope, lb_keogh, lb_kim, lb_paa, paa, paa_envelope,
+                       paired_dtw)
+
+NUM_HANDS = 2
+HAND_DIMS = 63
+
+# Templates scored per batched DTW call while searching with pruning
+SEARCH_CHUNK = 16
+
+# Coarse resolutions (frames) of the multi-resolution index, coarsest first
+PAA_RESOLUTIONS = (8, 16)
+
+# Query lengths whose envelopes are kept, least recently used dropped first;
+# recorded gestures share one length, archives of files may have any
+ENVELOPE_CACHE_SIZE = 8
+
+
+def search_stats(templates):
+    """Pruning counters of a search over templates, all zero."""
+    return {"templates": templates, "pruned_index": 0, "pruned_coarse": 0, "pruned_kim": 0, "pruned_paa": 0,
+            "pruned_keogh": 0, "pruned_best_so_far": 0, "dtw": 0, "abandoned": 0}
+
+
+def _append_row(buffer, size, row):
+    """
+    Write row at index size of buffer, doubling its capacity when full.
+
+    :return: The buffer, reallocated if it had to grow
+    """
+    if size == len(buffer):
+        grown = np.zeros((max(2 * size, 8),) + buffer.shape[1:], dtype=buffer.dtype)
+        grown[:size] = buffer[:size]
+        buffer = grown
+    buffer[size] = row
+    return buffer
+
+
+class TemplateLibrary:
+    def __init__(self, names, frames, lengths, hand_mask, pipeline=None, paa_resolutions=PAA_RESOLUTIONS):
+        """
+        Reference signs packed into one contiguous tensor for batched scoring.
+
+        Every template is also kept at the coarse paa_resolutions, which give
+        the search cheap lower bounds (LB_PAA) and a coarse DTW shortlist.
+
+        :param names: Sign name of every template (a sign may have several)
+        :param frames: float32 array of shape (n_templates, seq_len, 2, dims), zero
+            padded; the pipeline's features, or raw landmarks (dims = 63) without one
+        :param lengths: Number of valid frames per template
+        :param hand_mask: bool array of shape (n_templates, 2), [left, right] presence
+        :param pipeline: FeaturePipeline applied to queries and added templates
+        :param paa_resolutions: Frames per template at each coarse resolution
+        """
+        self.pipeline = pipeline
+        self.paa_resolutions = tuple(sorted(paa_resolutions))
+        self.names = list(names)
+        self.frames = np.ascontiguousarray(frames, dtype=np.float32)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.hand_mask = np.asarray(hand_mask, dtype=bool)
+
+        # Sign index of every template, for reducing template distances per sign
+        self.sign_names = list(dict.fromkeys(self.names))
+        sign_index = {name: i for i, name in enumerate(self.sign_names)}
+        self.sign_ids = np.array([sign_index[name] for name in self.names], dtype=np.int64)
+
+        # |t|^2 per frame and hand, reused by every query
+        self.sq_norms = np.einsum("nmhd,nmhd->nhm", self.frames, self.frames)
+
+        # Piecewise aggregate approximation of every template per resolution
+        self.paa_frames = {r: paa(self.frames, self.lengths, r) for r in self.paa_resolutions}
+
+        # LB_Keogh envelopes keyed by (query length, window), and their PAA
+        # reductions keyed by (query length, window, segments); at most
+        # ENVELOPE_CACHE_SIZE envelopes, in least recently used order
+        self._envelopes = collections.OrderedDict()
+        self._paa_envelopes = {}
+
+        # Backing buffers; the public arrays are views of their first len(self) rows
+        self._buffers = {
+            "frames": self.frames, "lengths": self.lengths, "hand_mask": self.hand_mask,
+            "sign_ids": self.sign_ids, "sq_norms": self.sq_norms,
+        }
+
+    @classmethod
+    def from_sequences(cls, sign_sequences, pipeline=None, paa_resolutions=PAA_RESOLUTIONS):
+        """
+        Pack the output of load_all_sign_sequences.
+
+        :param sign_sequences: Dictionary of sign_name -> list of (left_hand, right_hand) sequences
+        :param pipeline: Optional FeaturePipeline, applied once per template here
+        :param paa_resolutions: Coarse resolutions to index, see __init__
+        :return: TemplateLibrary
+        """
+        templates = [
+            (name, left, right)
+            for name, sequences in sign_sequences.items()
+            for left, right in sequences
+        ]
+        seq_len = max((max(len(left), len(right)) for _, left, right in templates), default=0)
+
+        frames = np.zeros((len(templates), seq_len, NUM_HANDS, HAND_DIMS), dtype=np.float32)
+        lengths = np.zeros(len(templates), dtype=np.int64)
+        hand_mask = np.zeros((len(templates), NUM_HANDS), dtype=bool)
+        for i, (_, left, right) in enumerate(templates):
+            for hand, sequence in enumerate((left, right)):
+                sequence = np.asarray(sequence, dtype=np.float32).reshape(-1, HAND_DIMS)
+                frames[i, :len(sequence), hand] = sequence
+                hand_mask[i, hand] = np.any(sequence != 0)
+            lengths[i] = max(len(left), len(right), 1)
+
+        if pipeline is not None:
+            raw, frames = frames, np.zeros(frames.shape[:3] + (pipeline.dims,), dtype=np.float32)
+            for i, length in enumerate(lengths):
+                frames[i, :length] = pipeline.transform(raw[i, :length])
+
+        return cls([name for name, _, _ in templates], frames, lengths, hand_mask, pipeline, paa_resolutions)
+
+    @classmethod
+    def from_store(cls, store, pipeline=None, paa_resolutions=PAA_RESOLUTIONS):
+        """
+        Build the library directly on a SignStore's memory-mapped frame block.
+
+        When all templates have the same length and lie back to back in the
+        block (the normal case), the template tensor is a reshaped view of the
+        mapping and no frame data is copied. With a pipeline, the store's
+        cached feature block is mapped the same way.
+
+        :param store: SignStore
+        :param pipeline: Optional FeaturePipeline
+        :param paa_resolutions: Coarse resolutions to index, see __init__
+        :return: TemplateLibrary
+        """
+        block = store.frames if pipeline is None else store.features(pipeline)
+        templates = store.templates
+        names = [t["name"] for t in templates]
+        lengths = np.array([t["length"] for t in templates], dtype=np.int64)
+        hand_mask = np.array([t["hand_mask"] for t in templates], dtype=bool).reshape(-1, NUM_HANDS)
+        offsets = np.array([t["offset"] for t in templates], dtype=np.int64)
+
+        seq_len = int(lengths.max()) if len(templates) else 0
+        packed = len(templates) > 0 and np.all(lengths == seq_len) and np.array_equal(
+            offsets, offsets[0] + seq_len * np.arange(len(templates))
+        )
+        if packed:
+            start = offsets[0]
+            frames = block[start:start + seq_len * len(templates)].reshape(
+                (len(templates), seq_len) + block.shape[1:]
+            )
+        else:
+            frames = np.zeros((len(templates), seq_len) + block.shape[1:], dtype=np.float32)
+            for i, (offset, length) in enumerate(zip(offsets, lengths)):
+                frames[i, :length] = block[offset:offset + length]
+
+        return cls(names, frames, lengths, hand_mask, pipeline, paa_resolutions)
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, frames, hand_mask):
+        """
+        Insert one template without rebuilding the library.
+
+        Buffers grow geometrically, so a sequence of inserts costs amortized
+        O(1) copies per template. Cached envelopes and the coarse resolutions
+        are extended with the new template's only.
+
+        :param name: Sign name
+        :param frames: Template landmarks of shape (length, 2, 63)
+        :param hand_mask: [left, right] hand presence
+        """
+        frames = self.prepare(frames)
+        size = len(self)
+        if len(frames) > self.frames.shape[1]:
+            self._widen(len(frames))
+
+        padded = np.zeros(self.frames.shape[1:], dtype=np.float32)
+        padded[:len(frames)] = frames
+        if name not in self.sign_names:
+            self.sign_names.append(name)
+
+        row = {
+            "frames": padded,
+            "lengths": len(frames),
+            "hand_mask": hand_mask,
+            "sign_ids": self.sign_names.index(name),
+            "sq_norms": np.einsum("mhd,mhd->hm", padded, padded),
+        }
+        for key, value in row.items():
+            self._buffers[key] = _append_row(self._buffers[key], size, value)
+            setattr(self, key, self._buffers[key][:size + 1])
+        self.names.append(name)
+
+        for r in self.paa_resolutions:
+            self._buffers[("paa", r)] = _append_row(self._buffers.get(("paa", r), self.paa_frames[r]), size,
+                                                    paa(padded[None], [len(frames)], r)[0])
+            self.paa_frames[r] = self._buffers[("paa", r)][:size + 1]
+
+        for (n, window), buffers in self._envelopes.items():
+            lower, upper = keogh_envelope(padded[None], n, [len(frames)], window)
+            buffers[0] = _append_row(buffers[0], size, lower[0])
+            buffers[1] = _append_row(buffers[1], size, upper[0])
+            for (paa_n, paa_window, segments), paa_buffers in self._paa_envelopes.items():
+                if (paa_n, paa_window) == (n, window):
+                    paa_lower, paa_upper = paa_envelope(lower, upper, n, segments)
+                    paa_buffers[0] = _append_row(paa_buffers[0], size, paa_lower[0])
+                    paa_buffers[1] = _append_row(paa_buffers[1], size, paa_upper[0])
+
+    def _widen(self, seq_len):
+        """Re-pad frames and norms so templates of seq_len frames fit."""
+        pad = seq_len - self.frames.shape[1]
+        self._buffers["frames"] = np.pad(self.frames, ((0, 0), (0, pad), (0, 0), (0, 0)))
+        self._buffers["sq_norms"] = np.pad(self.sq_norms, ((0, 0), (0, 0), (0, pad)))
+        self.frames, self.sq_norms = self._buffers["frames"], self._buffers["sq_norms"]
+
+    def prepare(self, frames):
+        """
+        Turn raw landmarks into what the library compares: the pipeline's features.
+
+        :param frames: Landmarks of shape (n, 2, 63)
+        :return: float32 array of shape (n, 2, dims)
+        """
+        if self.pipeline is None:
+            return np.asarray(frames, dtype=np.float32)
+        return self.pipeline.transform(frames)
+
+    def score(self, query, query_mask, window=None, prepared=False):
+        """
+        Compute DTW distances between a query and every template in one pass.
+
+        Only hands present in both the query and a template are compared.
+
+        :param query: Query landmarks of shape (n, 2, 63)
+        :param query_mask: bool array [left, right] of hands present in the query
+        :param window: Sakoe-Chiba band half-width, None for no constraint
+        :param prepared: The query already holds the library's features (e.g. a template)
+        :return: Distance per template, inf where no hand is shared
+        """
+        if not prepared:
+            query = self.prepare(query)
+        hand_weights = self.hand_mask & np.asarray(query_mask, dtype=bool)
+        return batch_dtw(query, self.frames, self.lengths, hand_weights, window, self.sq_norms)
+
+    def envelope(self, n, window=None):
+        """
+        LB_Keogh envelopes of every template for queries of n frames, cached.
+
+        :param n: Query length in frames
+        :param window: Sakoe-Chiba band half-width, None for no constraint
+        :return: Tuple of (lower, upper) arrays of shape (n_templates, n, 2, dims)
+        """
+        key = (n, window)
+        if key in self._envelopes:
+            self._envelopes.move_to_end(key)
+        else:
+            if len(self._envelopes) >= ENVELOPE_CACHE_SIZE:
+                evicted, _ = self._envelopes.popitem(last=False)
+                # PAA envelopes are only extended by add while their envelope is cached
+                for paa_key in [k for k in self._paa_envelopes if k[:2] == evicted]:
+                    del self._paa_envelopes[paa_key]
+            self._envelopes[key] = list(keogh_envelope(self.frames, n, self.lengths, window))
+        lower, upper = self._envelopes[key]
+        return lower[:len(self)], upper[:len(self)]
+
+    def paa_envelope(self, n, window, segments):
+        """
+        LB_PAA envelopes of every template for queries of n frames, cached.
+
+        :param segments: Number of PAA segments of the query
+        :return: Tuple of scaled (lower, upper) arrays of shape (n_templates, segments, 2, dims)
+        """
+        key = (n, window, segments)
+        envelope = self.envelope(n, window)
+        if key not in self._paa_envelopes:
+            self._paa_envelopes[key] = list(paa_envelope(*envelope, n, segments))
+        lower, upper = self._paa_envelopes[key]
+        return lower[:len(self)], upper[:len(self)]
+
+    def lower_bound(self, query, hand_weights, window=None, segments=None, templates=None):
+        """
+        LB_PAA (segments set) or LB_Keogh (segments None) of a prepared query.
+
+        :param query: Query features of shape (n, 2, dims)
+        :param hand_weights: (n_templates, 2) hands compared per template
+        :param templates: Indices of the templates to bound (default: all)
+        :return: Lower bound per template
+        """
+        if segments is None:
+            lower, upper = self.envelope(len(query), window)
+        else:
+            lower, upper = self.paa_envelope(len(query), window, segments)
+        if templates is not None and len(templates) < len(self):
+            # Copies; for all templates the envelopes are used in place
+            lower, upper, hand_weights = lower[templates], upper[templates], hand_weights[templates]
+        if segments is None:
+            return lb_keogh(query, lower, upper, hand_weights)
+        return lb_paa(query, lower, upper, hand_weights)
+
+    def shortlist(self, query, hand_weights, templates, window, size):
+        """
+        Narrow templates down with DTW on their PAA approximations.
+
+        At each resolution, coarsest first, the query is reduced the same way
+        and the templates closest to it survive: size at the finest
+        resolution, twice as many at each coarser one. Coarse distances do not
+        bound the full ones, so this can drop the true match; search only uses
+        it when asked for a shortlist.
+
+        :param query: Prepared query features of shape (n, 2, dims)
+        :param hand_weights: (n_templates, 2) hands compared per template
+        :param templates: Indices of the candidate templates
+        :param window: Sakoe-Chiba band half-width at full resolution, None for no constraint
+        :param size: Templates kept at the finest resolution
+        :return: Indices of the surviving templates, in ascending order
+        """
+        resolutions = [r for r in self.paa_resolutions if r < len(query)]
+        for level, r in enumerate(resolutions):
+            keep = size << (len(resolutions) - 1 - level)
+            if len(templates) <= keep:
+                continue
+            coarse_window = None if window is None else int(np.ceil(window * r / len(query)))
+            distances = batch_dtw(paa(query[None], [len(query)], r)[0], self.paa_frames[r][templates],
+                                  hand_weights=hand_weights[templates], window=coarse_window)
+            # Ranked per hand compared, like normalize (coarse path lengths are all equal)
+            distances = distances / np.maximum(np.count_nonzero(hand_weights[templates], axis=1), 1)
+            templates = np.sort(templates[np.argpartition(distances, keep - 1)[:keep]])
+        return templates
+
+    def shard(self, start, stop):
+        """
+        Templates start..stop-1 as a library of views into this one's arrays.
+
+        :return: TemplateLibrary sharing frame memory with this library
+        """
+        return TemplateLibrary(self.names[start:stop], self.frames[start:stop], self.lengths[start:stop],
+                               self.hand_mask[start:stop], self.pipeline, self.paa_resolutions)
+
+    def search(self, query, query_mask, window=None, threshold=float('inf'), shared_best=None, k=1,
+               shortlist=None, templates=None):
+        """
+        Score a query with a lower-bound cascade in front of the full DTW.
+
+        LB_Kim and LB_PAA at the coarsest resolution are computed for every
+        template; templates are then scored in order of increasing bound, and
+        any template whose bound exceeds the best distance so far or the
+        threshold is skipped. Before its DTW, each chunk's bounds are
+        tightened through the finer resolutions up to LB_Keogh. Every bound
+        is at most the DTW distance, so the results equal an unpruned scan.
+        The same cutoff is passed to the DTW kernel, which abandons a template
+        as soon as it can no longer beat it.
+
+        Bounds, cutoffs and the threshold are compared in the ranking metric,
+        the normalized distance (see normalize): each template's cutoff is
+        scaled by its own path length and hand count, so pruning keeps exactly
+        the templates that can still rank among the best.
+
+        With a shortlist, only the templates kept by the coarse DTW of
+        shortlist() are searched: faster on big libraries, but approximate.
+        templates restricts the search the same way, e.g. to the candidates
+        of an IVFIndex.
+
+        With k > 1 the cutoff is the k-th best sign distance so far instead,
+        so the k best signs all get exact distances.
+
+        When several searches cover shards of one library in parallel, they
+        share their best distance through shared_best so each prunes with the
+        best match found by any of them.
+
+        :param query: Query landmarks of shape (n, 2, 63)
+        :param query_mask: bool array [left, right] of hands present in the query
+        :param window: Sakoe-Chiba band half-width, None for no constraint
+        :param threshold: Normalized distance above which a match is rejected anyway
+        :param shared_best: Optional multiprocessing.Value("d") holding the best
+            normalized distance over all shards, read before and lowered after
+            every chunk (k = 1 only)
+        :param k: Number of best signs that must not be pruned
+        :param shortlist: Templates kept by the coarse DTW, None for an exact search
+        :param templates: Indices of the only templates to search (default: all)
+        :return: Tuple of (distance per template, inf where pruned, stats dict)
+        """
+        search = _QuerySearch(self, self.prepare(query), query_mask, window, threshold, k, shared_best, shortlist,
+                              templates)
+        while True:
+            chunk = search.next_chunk()
+            if chunk is None:
+                return search.finish()
+            search.update(chunk, batch_dtw(
+                search.query, self.frames[chunk], self.lengths[chunk], search.hand_weights[chunk],
+                window, self.sq_norms[chunk], max_dist=search.max_dist(chunk)
+            ))
+
+    def search_many(self, queries, query_masks, window=None, threshold=float('inf'), k=1, shortlist=None,
+                    templates=None):
+        """
+        Search several queries together, with the same results as one search each.
+
+        Every query keeps its own bounds and cutoff. In each round all queries
+        that are not done contribute their next chunk of templates, and all
+        (query, template) pairs of the round are scored in one DTW pass, so
+        the per-row overhead of the DTW kernel is paid once per round instead
+        of once per query.
+
+        :param queries: List of query landmarks of shape (n, 2, 63)
+        :param query_masks: bool array [left, right] of hands present, per query
+        :param window: Sakoe-Chiba band half-width, None for no constraint
+        :param threshold: Normalized distance above which a match is rejected anyway
+        :param k: Number of best signs that must not be pruned, per query
+        :param shortlist: Templates kept by the coarse DTW per query, None for exact searches
+        :param templates: Per query, indices of the only templates to search (default: all)
+        :return: List of (distance per template, stats dict), one per query
+        """
+        templates = templates or [None] * len(queries)
+        searches = [_QuerySearch(self, self.prepare(query), mask, window, threshold, k, shortlist=shortlist,
+                                 templates=query_templates)
+                    for query, mask, query_templates in zip(queries, query_masks, templates)]
+        active = searches
+        while active:
+            chunks = [(search, search.next_chunk()) for search in active]
+            chunks = [(search, chunk) for search, chunk in chunks if chunk is not None]
+            active = [search for search, _ in chunks]
+
+            # Pairs are scored together per query length, the rows of the DTW pass
+            by_length = {}
+            for search, chunk in chunks:
+                by_length.setdefault(len(search.query), []).append((search, chunk))
+            for group in by_length.values():
+                pairs = np.concatenate([chunk for _, chunk in group])
+                owner = np.repeat(np.arange(len(group)), [len(chunk) for _, chunk in group])
+                distances = paired_dtw(
+                    np.stack([search.query for search, _ in group])[owner],
+                    self.frames[pairs], self.lengths[pairs],
+                    np.concatenate([search.hand_weights[chunk] for search, chunk in group]),
+                    window, self.sq_norms[pairs],
+                    max_dist=np.concatenate([search.max_dist(chunk) for search, chunk in group])
+                )
+                for i, (search, chunk) in enumerate(group):
+                    search.update(chunk, distances[owner == i])
+        return [search.finish() for search in searches]
+
+    def normalize(self, distances, query_len, query_mask):
+        """
+        Distances per unit of warping path: divided by the path length bound
+        (query + template frames) and by the number of hands compared.
+
+        Makes distances comparable across template lengths and one- or
+        two-handed signs.
+
+        :param distances: Distance per template
+        :param query_len: Query length in frames
+        :param query_mask: bool array [left, right] of hands present in the query
+        :return: Normalized distance per template
+        """
+        return distances / self.path_scale(query_len, self.hand_mask & np.asarray(query_mask, dtype=bool))
+
+    def path_scale(self, query_len, hand_weights):
+        """
+        Divisor of normalize per template: (query + template frames) x hands compared.
+
+        :param hand_weights: (n_templates, 2) hands compared per template
+        """
+        return (query_len + self.lengths) * np.maximum(np.count_nonzero(hand_weights, axis=1), 1)
+
+    def best_per_sign(self, distances):
+        """
+        Reduce template distances to the minimum distance of each sign.
+
+        :param distances: Distance per template
+        :return: Dictionary of sign_name -> distance
+        """
+        per_sign = np.full(len(self.sign_names), np.inf)
+        np.minimum.at(per_sign, self.sign_ids, distances)
+        return dict(zip(self.sign_names, per_sign.tolist()))
+
+
+class _QuerySearch:
+    def __init__(self, library, query, query_mask, window, threshold, k, shared_best=None, shortlist=None,
+                 templates=None):
+        """
+        Pruning state of one query while its templates are scored in chunks.
+
+        LB_Kim and the coarsest lower bound are computed here for every
+        template; next_chunk and update then walk the surviving templates in
+        order of increasing bound, tightening each chunk's bounds through the
+        finer resolutions up to LB_Keogh just before its DTW. Bounds, best
+        and cutoff are normalized distances; distances stays raw.
+
+        :param library: TemplateLibrary searched
+        :param query: Prepared query features of shape (n, 2, dims)
+        :param shortlist: Templates kept by the coarse DTW, None for an exact search
+        :param templates: Indices of the only templates to search, None for all
+        """
+        self.library = library
+        self.query = query
+        self.window = window
+        self.threshold = threshold
+        self.k = k
+        self.shared_best = shared_best
+        self.distances = np.full(len(library), np.inf)
+        self.stats = search_stats(len(library))
+        self.refined_pruned = 0
+        self.best = float('inf')
+        self.sign_best = np.full(len(library.sign_names), np.inf)
+        self.cutoff = threshold
+        self.start, self.chunk_size = 0, 1
+
+        self.hand_weights = library.hand_mask & np.asarray(query_mask, dtype=bool)
+        self.scale = library.path_scale(len(query), self.hand_weights).astype(np.float64)
+        candidates = np.flatnonzero(self.hand_weights.any(axis=1))
+        if templates is not None:
+            kept = np.intersect1d(candidates, templates)
+            self.stats["pruned_index"] = len(candidates) - len(kept)
+            candidates = kept
+        if len(candidates) == 0 or len(query) == 0:
+            self.candidates = self.bound = candidates[:0]
+            return
+
+        if shortlist is not None:
+            kept = library.shortlist(query, self.hand_weights, candidates, window, shortlist)
+            self.stats["pruned_coarse"] = len(candidates) - len(kept)
+            candidates = kept
+
+        # Reads two frames per template, so it is cheaper on all of them than a gathered copy
+        bound = lb_kim(query, library.frames, library.lengths, self.hand_weights)[candidates] / self.scale[candidates]
+        keep = bound <= threshold
+        self.stats["pruned_kim"] = int(np.count_nonzero(~keep))
+        candidates, bound = candidates[keep], bound[keep]
+
+        # LB_PAA at each resolution below the query length, then LB_Keogh (None)
+        self.levels = [s for s in library.paa_resolutions if s < len(query)] + [None]
+        coarsest = self.levels.pop(0)
+        coarse = library.lower_bound(query, self.hand_weights, window, coarsest, candidates)
+        bound = np.maximum(bound, coarse / self.scale[candidates])
+        keep = bound <= threshold
+        self.stats["pruned_keogh" if coarsest is None else "pruned_paa"] = int(np.count_nonzero(~keep))
+        candidates, bound = candidates[keep], bound[keep]
+
+        order = np.argsort(bound, kind="stable")
+        self.candidates, self.bound = candidates[order], bound[order]
+
+    def next_chunk(self):
+        """
+        Templates to score next, sets cutoff.
+
+        :return: Template indices, or None once the remaining bounds exceed the cutoff
+        """
+        while self.start < len(self.candidates):
+            if self.shared_best is not None and self.k == 1:
+                self.best = min(self.best, self.shared_best.value)
+            self.cutoff = min(self.best, self.threshold)
+            # Bounds are sorted, so everything from here on is pruned at once
+            if self.bound[self.start] > self.cutoff:
+                return None
+            chunk = slice(self.start, self.start + self.chunk_size)
+            # The lowest bound alone usually gives a tight cutoff for the rest
+            self.start += self.chunk_size
+            self.chunk_size = SEARCH_CHUNK
+            chunk = self.candidates[chunk][self.bound[chunk] <= self.cutoff]
+            for segments in self.levels:
+                if len(chunk) == 0:
+                    break
+                bound = self.library.lower_bound(self.query, self.hand_weights, self.window, segments, chunk)
+                keep = bound / self.scale[chunk] <= self.cutoff
+                self.stats["pruned_keogh" if segments is None else "pruned_paa"] += int(np.count_nonzero(~keep))
+                self.refined_pruned += len(chunk) - int(np.count_nonzero(keep))
+                chunk = chunk[keep]
+            if len(chunk):
+                return chunk
+        return None
+
+    def max_dist(self, chunk):
+        """Raw DTW distance per template of a chunk above which it is abandoned: the cutoff, unnormalized."""
+        return self.cutoff * self.scale[chunk]
+
+    def update(self, chunk, distances):
+        """Record the DTW distances of a chunk and tighten the cutoff."""
+        self.distances[chunk] = distances
+        self.stats["dtw"] += len(chunk)
+        self.stats["abandoned"] += int(np.count_nonzero(np.isinf(distances)))
+        distances = distances / self.scale[chunk]
+        if self.k == 1:
+            self.best = min(self.best, float(distances.min()))
+        else:
+            np.minimum.at(self.sign_best, self.library.sign_ids[chunk], distances)
+            if self.k <= len(self.sign_best):
+                self.best = float(np.partition(self.sign_best, self.k - 1)[self.k - 1])
+        shared_best = self.shared_best
+        if shared_best is not None and self.k == 1 and self.best < shared_best.value:
+            with shared_best.get_lock():
+                shared_best.value = min(shared_best.value, self.best)
+
+    def finish(self):
+        """
+        Close the search.
+
+        :return: Tuple of (distance per template, inf where pruned, stats dict)
+        """
+        self.stats["pruned_best_so_far"] = len(self.candidates) - self.stats["dtw"] - self.refined_pruned
+        return self.distances, self.stats
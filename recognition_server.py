@@ -0,0 +1,352 @@
+"""
+Recognition server for many camera clients sharing one template library.
+
+Clients run MediaPipe themselves and stream the extracted hand landmarks
+over a local TCP connection, one JSON message per line. Every connection
+is a session with its own recording buffer; the template library, its
+calibration and the sign store are loaded once and shared.
+
+    python recognition_server.py --port 8765
+
+Client messages:
+    {"op": "recognize"}                 start recording a gesture to recognize
+    {"op": "record", "sign": "hello"}   start recording a reference sign
+    {"op": "frame", "hands": [...]}     landmarks of one frame, 2 x 63 values
+    {"op": "stop"}                      discard the frames recorded so far
+
+Server events:
+    {"event": "session", "id": 1, "seq_len": 50}
+    {"event": "recording", "mode": "recognize", "sign": null}
+    {"event": "prediction", "sign": ..., "distance": ..., "confidence": ..., "margin": ..., "candidates": [...]}
+    {"event": "saved", "sign": "hello"}
+    {"event": "error", "message": ...}
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.batch_scheduler import MicroBatchScheduler
+from utils.metrics import metrics
+from utils.sign_storage import SIGNS_DIR
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def _finite(value):
+    """JSON-safe number: None instead of inf or nan."""
+    return float(value) if value is not None and math.isfinite(value) else None
+
+
+class RecognitionSession:
+    def __init__(self, session_id, seq_len=50):
+        """
+        Recording state of one client; the library itself is shared.
+
+        :param session_id: Identifier sent to the client
+        :param seq_len: Number of frames per gesture
+        """
+        self.id = session_id
+        self.seq_len = seq_len
+        self.frame_buffer = np.zeros((seq_len, 2, 63), dtype=np.float32)
+        self.num_frames = 0
+
+        # None while idle, "recognize" or "record" while collecting frames
+        self.mode = None
+        self.sign_name = None
+
+        self.last_prediction = None
+        self.last_dtw_distance = None
+        self.last_candidates = []
+
+    def start(self, sign_name=None):
+        """
+        Start collecting a gesture.
+
+        :param sign_name: Save the gesture as this sign instead of recognizing it
+        """
+        self.mode = "record" if sign_name else "recognize"
+        self.sign_name = sign_name
+        self.num_frames = 0
+
+    def stop(self):
+        """Discard the frames collected so far."""
+        self.mode = None
+        self.sign_name = None
+        self.num_frames = 0
+
+    def add_frame(self, hands):
+        """
+        Append the landmarks of one frame.
+
+        :param hands: 126 values, left hand then right hand (zeros when absent)
+        :return: True once the gesture is complete
+        """
+        if self.mode is None or self.num_frames == self.seq_len:
+            return False
+        self.frame_buffer[self.num_frames] = np.asarray(hands, dtype=np.float32).reshape(2, 63)
+        self.num_frames += 1
+        return self.num_frames == self.seq_len
+
+    @property
+    def recorded_frames(self):
+        """Landmarks recorded so far, shape (num_frames, 2, 63)."""
+        return self.frame_buffer[:self.num_frames]
+
+
+class RecognitionServer:
+    def __init__(self, recorder, host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=16, max_wait=0.005):
+        """
+        Asyncio server multiplexing client sessions onto one SignRecorder.
+
+        The recorder is only used through recognize_many and
+        save_reference_sign, which leave its own recording state alone. Both
+        run off the event loop, so it keeps serving frames while gestures are
+        scored, and under one lock, so no recognition sees a half-added
+        template. Gestures completed by different sessions within max_wait of
+        each other are recognized as one batch.
+
+        :param recorder: SignRecorder holding the shared template library
+        :param host: Interface to listen on
+        :param port: TCP port, 0 to pick a free one
+        :param max_batch: Most gestures recognized in one batch
+        :param max_wait: Seconds a gesture may wait for others to batch with
+        """
+        self.recorder = recorder
+        self.host = host
+        self.port = port
+        self.sessions = {}
+        self.server = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recorder")
+        self.scheduler = MicroBatchScheduler(self._recognize_batch, max_batch, max_wait)
+        self._library_lock = threading.Lock()
+        self._session_ids = itertools.count(1)
+
+    async def start(self):
+        """Start listening; port is updated to the bound port."""
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Start listening and serve until cancelled."""
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """Stop listening and release the worker threads."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.scheduler.close()
+        self.executor.shutdown()
+
+    async def recognize(self, frames):
+        """
+        Score one completed gesture against the shared library.
+
+        :param frames: Landmarks of shape (n, 2, 63)
+        :return: Result of SignRecorder.recognize
+        """
+        return await asyncio.wrap_future(self.scheduler.submit(frames))
+
+    async def save(self, sign_name, frames):
+        """Add a recorded gesture to the store and the shared library."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._save, sign_name, frames)
+
+    def _recognize_batch(self, frames_list):
+        """Scheduler callback, on the scheduler's thread."""
+        with self._library_lock:
+            return self.recorder.recognize_many(frames_list)
+
+    def _save(self, sign_name, frames):
+        with self._library_lock:
+            self.recorder.save_reference_sign(sign_name, frames)
+
+    async def _handle(self, reader, writer):
+        """Serve one client connection as one session."""
+        session = RecognitionSession(next(self._session_ids), self.recorder.seq_len)
+        self.sessions[session.id] = session
+        metrics.count("sessions_opened")
+        try:
+            await self._send(writer, {"event": "session", "id": session.id, "seq_len": session.seq_len})
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self._dispatch(session, json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"event": "error", "message": f"{type(e).__name__}: {e}"}
+                if reply is not None:
+                    await self._send(writer, reply)
+        except ConnectionError:
+            pass
+        finally:
+            del self.sessions[session.id]
+            writer.close()
+
+    async def _dispatch(self, session, message):
+        """
+        Apply one client message to its session.
+
+        :return: Event to send back, or None
+        """
+        op = message["op"]
+        if op == "frame":
+            if session.add_frame(message["hands"]):
+                return await self._finish(session)
+            return None
+        if op == "recognize":
+            session.start()
+        elif op == "record":
+            if not message.get("sign"):
+                raise ValueError("record needs a sign name")
+            session.start(message["sign"])
+        elif op == "stop":
+            session.stop()
+        else:
+            raise ValueError(f"Unknown op: {op}")
+        return {"event": "recording", "mode": session.mode, "sign": session.sign_name}
+
+    async def _finish(self, session):
+        """Recognize or save a completed gesture and reset the session."""
+        frames = session.recorded_frames
+        mode, sign_name = session.mode, session.sign_name
+        session.stop()
+
+        if mode == "record":
+            await self.save(sign_name, frames)
+            return {"event": "saved", "sign": sign_name}
+
+        match = await self.recognize(frames)
+        candidates = match["candidates"]
+        session.last_prediction = match["sign"] if match["accepted"] else "Unknown Sign"
+        session.last_dtw_distance = _finite(match["distance"])
+        session.last_candidates = candidates
+        return {
+            "event": "prediction",
+            "sign": session.last_prediction,
+            "distance": session.last_dtw_distance,
+            "confidence": match["confidence"],
+            "margin": _finite(match["margin"]),
+            "candidates": [{key: _finite(value) if key != "sign" else value for key, value in candidate.items()}
+                           for candidate in candidates],
+        }
+
+    @staticmethod
+    async def _send(writer, event):
+        writer.write(json.dumps(event).encode() + b"\n")
+        await writer.drain()
+
+
+class RecognitionClient:
+    def __init__(self, reader, writer, session_id, seq_len):
+        """Connection of one camera client; create it with connect."""
+        self.reader = reader
+        self.writer = writer
+        self.session_id = session_id
+        self.seq_len = seq_len
+
+    @classmethod
+    async def connect(cls, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Open a session on a recognition server.
+
+        :return: RecognitionClient
+        """
+        reader, writer = await asyncio.open_connection(host, port)
+        hello = json.loads(await reader.readline())
+        return cls(reader, writer, hello["id"], hello["seq_len"])
+
+    async def send(self, op, **fields):
+        """Send one message to the server."""
+        self.writer.write(json.dumps({"op": op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+
+    async def receive(self):
+        """
+        Wait for the next server event.
+
+        :return: Event dict, None once the server has closed the connection
+        """
+        line = await self.reader.readline()
+        return json.loads(line) if line else None
+
+    async def send_frame(self, hands):
+        """Send the landmarks of one frame, shape (2, 63) or 126 values."""
+        await self.send("frame", hands=np.asarray(hands, dtype=float).ravel().tolist())
+
+    async def recognize_gesture(self, frames):
+        """
+        Record and recognize one gesture.
+
+        :param frames: seq_len frames of landmarks
+        :return: prediction event
+        """
+        await self.send("recognize")
+        await self.receive()
+        for hands in frames:
+            await self.send_frame(hands)
+        return await self.receive()
+
+    async def close(self):
+        """End the session."""
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--signs-dir", default=SIGNS_DIR)
+    parser.add_argument("--threshold", type=float, default=1.0, help="Normalized DTW distance of a valid match")
+    parser.add_argument("--window", type=int, default=None, help="Sakoe-Chiba band half-width in frames")
+    parser.add_argument("--workers", type=int, default=None, help="Score template shards on a process pool")
+    parser.add_argument("--max-batch", type=int, default=16, help="Most gestures recognized together")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="Longest a gesture waits to be batched")
+    parser.add_argument("--cache-size", type=int, default=256, help="Cached results of repeated gestures (0 = off)")
+    parser.add_argument("--cache-ttl", type=float, default=60, help="Seconds a cached result stays valid")
+    parser.add_argument("--coarse-shortlist", type=int, default=None,
+                        help="Only search templates shortlisted by coarse DTW (approximate)")
+    parser.add_argument("--ann-candidates", type=int, default=None,
+                        help="Only re-rank templates proposed by the embedding index (approximate)")
+    args = parser.parse_args()
+
+    from sign_recorder import SignRecorder
+
+    recorder = SignRecorder(mode="recognize", dtw_threshold=args.threshold, dtw_window=args.window,
+                            workers=args.workers, signs_dir=args.signs_dir, cache_size=args.cache_size,
+                            cache_ttl=args.cache_ttl, coarse_shortlist=args.coarse_shortlist,
+                            ann_candidates=args.ann_candidates)
+    server = RecognitionServer(recorder, args.host, args.port, args.max_batch, args.max_wait_ms / 1000)
+
+    async def run():
+        await server.start()
+        print(f"✓ Serving recognition on {server.host}:{server.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,55 @@
-import pandas as pd
+import os
+import threading
+
 import numpy as np
 from collections import Counter
 
-from utils.dtw import dtw_distances
-from models.sign_model import SignModel
-from utils.landmark_utils import extract_landmarks
-from utils.sign_storage import save_sign_sequence, load_all_sign_sequences
+from models.ann_index import ANN_INDEX_FILE, IVFIndex
+from models.calibration import CALIBRATION_FILE, SignCalibration
+from models.template_library import TemplateLibrary, search_stats
+from models.stream_matcher import StreamMatcher
+from utils.features import FeaturePipeline
+from utils.landmark_utils import extract_hands
+from utils.metrics import metrics
+from utils.result_cache import ResultCache
+from utils.sign_storage import SIGNS_DIR, SignStore
 
 
 class SignRecorder(object):
-    def __init__(self, reference_signs: pd.DataFrame | None = None, seq_len=50, mode="recognize", dtw_threshold=2000):
+    def __init__(self, reference_signs=None, seq_len=50, mode="recognize", dtw_threshold=1.0,
+                 dtw_window=None, feature_pipeline=None, workers=None, shard_size=None,
+                 parallel_backend="process", signs_dir=SIGNS_DIR, top_k=3, cache_size=0, cache_ttl=60.0,
+                 coarse_shortlist=None, ann_candidates=None, ann_dims=None):
         """
         Initialize SignRecorder.
         
-        :param reference_signs: DataFrame with reference signs (for recognize mode)
+        :param reference_signs: Optional DataFrame with reference signs, kept as given;
+            recognition uses the sign store, so pandas is never needed here
         :param seq_len: Number of frames to record per gesture
-        :param mode: "record" to create reference signs, "recognize" to match against saved signs
-        :param dtw_threshold: Maximum DTW distance to consider a valid match (default 2000)
+        :param mode: "record" to create reference signs, "recognize" to match against saved signs,
+            "continuous" to match every incoming frame without record/stop cycles
+        :param dtw_threshold: Maximum normalized DTW distance of a valid match: distance per
+            frame of warping path and per hand, in the pipeline's palm-scaled units. Repeats
+            of a sign score about 0.1-0.5, unrelated gestures above 1 (default 1.0)
+        :param dtw_window: Sakoe-Chiba band half-width in frames (None = unconstrained)
+        :param feature_pipeline: FeaturePipeline applied to landmarks before matching
+            (default: wrist-relative, palm-scaled coordinates)
+        :param workers: Score template shards on a pool of this many workers (None = serial)
+        :param shard_size: Templates per parallel task (default: one shard per worker)
+        :param parallel_backend: "process" or "thread" worker pool
+        :param signs_dir: Directory of the sign store
+        :param top_k: Number of candidate signs returned by recognize
+        :param cache_size: Keep this many recognition results keyed by a fingerprint of
+            the query, so repeated gestures skip the library scan (0 = no cache); a
+            hit needs an equal fingerprint but may still be a different gesture's result
+        :param cache_ttl: Seconds a cached result stays valid
+        :param coarse_shortlist: Only search the templates closest to the query under
+            DTW at the coarse PAA resolutions, this many at the finest; faster on
+            big libraries but approximate (None = exact search)
+        :param ann_candidates: Only re-rank with DTW this many templates proposed by an
+            IVF index over fixed-length gesture embeddings, kept next to the store;
+            approximate (None = no index)
+        :param ann_dims: PCA dimensions of the embeddings (None = no reduction)
         """
         # Variables for recording
         self.is_recording = False
@@ -24,9 +57,16 @@ class SignRecorder(object):
         self.seq_len = seq_len
         self.mode = mode
         self.dtw_threshold = dtw_threshold
+        self.dtw_window = dtw_window
+        self.top_k = top_k
+        self.coarse_shortlist = coarse_shortlist
+        self.ann_candidates = ann_candidates
+        self.ann_dims = ann_dims
+        self.feature_pipeline = feature_pipeline if feature_pipeline is not None else FeaturePipeline()
 
-        # List of results stored each frame
-        self.recorded_results = []
+        # Landmarks of the frames recorded so far, extracted as each frame arrives
+        self.frame_buffer = np.zeros((seq_len, 2, 63), dtype=np.float32)
+        self.num_frames = 0
         
         # For saving: store the sign name during recording
         self.current_sign_name = None
@@ -35,11 +75,44 @@ class SignRecorder(object):
         self.last_dtw_distance = None
 
         # DataFrame storing the distances between the recorded sign & all the reference signs from the dataset
-        self.reference_signs = reference_signs if reference_signs is not None else pd.DataFrame()
+        self.reference_signs = reference_signs
         
-        # Load reference sign sequences from disk
-        self.sign_sequences = load_all_sign_sequences()
+        # Load reference sign sequences from the memory-mapped store
+        self.sign_store = SignStore(signs_dir)
+        self.sign_sequences = self.sign_store.sequences()
         self.num_loaded_signs = len(self.sign_sequences)
+
+        # All templates packed into one tensor for batched DTW scoring
+        self._load_template_library()
+
+        # Optional worker pool scoring shards of the library in parallel
+        self.parallel_search = None
+        if workers:
+            # Imported here: the pool machinery is only needed when asked for
+            from models.parallel_search import ParallelSearch
+            self.parallel_search = ParallelSearch(self.template_library, self.sign_store, workers, shard_size,
+                                                  parallel_backend)
+
+        # Pruning statistics and ranked candidates of the last recognition
+        self.last_search_stats = None
+        self.last_candidates = []
+
+        # Results of recent queries; cleared whenever a template is saved or
+        # the calibration changes
+        self.result_cache = ResultCache(cache_size, cache_ttl) if cache_size else None
+
+        # Per-sign thresholds and confidence model: loaded from the store when
+        # it was fitted on these templates, otherwise fitted in the background,
+        # and refitted there after a sign is saved
+        self._calibration = SignCalibration.load(self._calibration_path(), self._calibration_key(self.template_library))
+        self._calibration_stale = False
+        self._calibration_thread = None
+        self._calibration_lock = threading.Lock()
+        if self._calibration is None and len(self.template_library):
+            self._refit_calibration()
+
+        # Last match found in continuous mode (sign, distance, start, end)
+        self.last_detection = None
         
         print(f"✓ SignRecorder initialized in '{mode}' mode")
         print(f"✓ DTW threshold set to {dtw_threshold}")
@@ -62,6 +135,7 @@ class SignRecorder(object):
             self.is_recording = True
             print(f"\n📹 Recording gesture for recognition... ({0}/{self.seq_len} frames)")
 
+    @metrics.timed("process_results")
     def process_results(self, results) -> (str, bool):
         """
         Process mediapipe results and manage recording/recognition.
@@ -69,39 +143,124 @@ class SignRecorder(object):
         :param results: mediapipe output
         :return: Tuple of (predicted_text, is_recording, recording_mode)
         """
+        # Handle continuous mode (every frame is matched as it arrives)
+        if self.mode == "continuous" and not self.is_saving:
+            return self._process_continuous(results), False
+
         # Handle recording mode (saving reference signs)
         if self.is_saving:
-            if len(self.recorded_results) < self.seq_len:
-                self.recorded_results.append(results)
+            if self.num_frames < self.seq_len:
+                self.add_frame(results)
             else:
                 self._save_sign()
                 return f"Saved: {self.current_sign_name}", self.is_saving
 
         # Handle recognize mode (matching against reference signs)
         if self.is_recording:
-            if len(self.recorded_results) < self.seq_len:
-                self.recorded_results.append(results)
+            if self.num_frames < self.seq_len:
+                self.add_frame(results)
             else:
                 predicted_text = self._compute_distances_and_predict()
                 return predicted_text, self.is_recording
 
         return "", self.is_recording
-    def save_reference_sign(self, sign_name):
+
+    @metrics.timed("extract_landmarks")
+    def add_frame(self, results):
+        """
+        Extract the landmarks of one frame into the recording buffer.
+
+        The mediapipe results are not kept, so nothing per-frame outlives
+        this call.
+
+        :param results: mediapipe output
+        """
+        if self.num_frames == self.seq_len:
+            return
+        extract_hands(results, out=self.frame_buffer[self.num_frames].reshape(2, 21, 3))
+        self.num_frames += 1
+
+    def clear_frames(self):
+        """Discard the recorded frames."""
+        self.num_frames = 0
+
+    @property
+    def recorded_frames(self):
+        """Landmarks recorded so far, shape (num_frames, 2, 63)."""
+        return self.frame_buffer[:self.num_frames]
+
+    def _process_continuous(self, results) -> str:
+        """
+        Feed one frame to the streaming matcher.
+
+        :param results: mediapipe output
+        :return: Name of the best sign whose match closed on this frame, or ""
+        """
+        hands, _ = extract_hands(results)
+        detections = self.stream_matcher.update(hands.reshape(2, 63))
+        if not detections:
+            return ""
+
+        best = detections[0]
+        self.last_detection = best
+        self.last_dtw_distance = best["distance"]
+        print(f"Detected '{best['sign']}' in frames {best['start']}-{best['end']} "
+              f"(distance: {best['distance']:.2f})")
+        return best["sign"]
+
+    def save_reference_sign(self, sign_name, frames=None):
         """
         Save the currently recorded frames as a reference sign.
         Called from Streamlit app after recording is complete.
+
+        :param frames: Landmarks of shape (n, 2, 63) to save instead of the buffer
         """
-        if not self.recorded_results:
+        if frames is not None:
+            self.clear_frames()
+            frames = frames[:self.seq_len]
+            self.frame_buffer[:len(frames)] = frames
+            self.num_frames = len(frames)
+
+        if self.num_frames == 0:
             print("No frames to save")
             return
     
         self.current_sign_name = sign_name
         self.is_saving = True
         self._save_sign()
-    
-        # Reload stored signs so recognition can use the new sign
-        self.sign_sequences = load_all_sign_sequences()
-        self.num_loaded_signs = len(self.sign_sequences)
+
+    def _load_template_library(self):
+        """Pack the loaded templates' cached features and precompute their LB_Keogh envelopes."""
+        self.template_library = TemplateLibrary.from_store(self.sign_store, self.feature_pipeline)
+        self.template_library.envelope(self.seq_len, self.dtw_window)
+        self.stream_matcher = StreamMatcher(self.template_library, self.dtw_threshold)
+        self.ann_index = self._load_ann_index() if self.ann_candidates else None
+
+    def _load_ann_index(self):
+        """
+        Embedding index of the current templates.
+
+        Loaded from the sign store and brought up to date when it was built
+        for the same store generation and pipeline, otherwise built and saved.
+
+        :return: IVFIndex
+        """
+        library = self.template_library
+        key = f"{self.sign_store.generation}-{self.feature_pipeline.key}-{self.ann_dims}"
+        path = os.path.join(self.sign_store.directory, ANN_INDEX_FILE)
+        ids = self._template_ids()
+        index = IVFIndex.load(path, key)
+        saved_ids = None if index is None else index.ids
+        if index is None or not index.sync(library, ids):
+            with metrics.timer("ann_index_build"):
+                index = IVFIndex.build(library, ids, dims=self.ann_dims, key=key)
+        if len(library) and not np.array_equal(index.ids, saved_ids):
+            index.save(path)
+        return index
+
+    def _template_ids(self):
+        """Store offset of every template, in library order."""
+        return [template["offset"] for template in self.sign_store.templates]
 
     def _save_sign(self):
         """Save the recorded gesture sequence to disk."""
@@ -109,20 +268,245 @@ class SignRecorder(object):
             print("Error: No sign name set")
             return
 
-        left_hand_list, right_hand_list = [], []
-        for results in self.recorded_results:
-            _, left_hand, right_hand = extract_landmarks(results)
-            left_hand_list.append(left_hand)
-            right_hand_list.append(right_hand)
+        # Append to disk as an additional template of this sign
+        entry = self.sign_store.save_frames(self.current_sign_name, self.recorded_frames)
+        print(f"Saved sign '{self.current_sign_name}' to {self.sign_store.frames_path}")
 
-        # Save to disk
-        save_sign_sequence(self.current_sign_name, left_hand_list, right_hand_list)
+        # Insert into the in-memory index so recognition can use it right away
+        frames = self.sign_store.template_frames(entry)
+        self.sign_sequences.setdefault(entry["name"], []).append((frames[:, 0], frames[:, 1]))
+        self.num_loaded_signs = len(self.sign_sequences)
+        self.template_library.add(entry["name"], frames, entry["hand_mask"])
+        if self.parallel_search is not None:
+            self.parallel_search.refresh()
+        if self.ann_index is not None:
+            self.ann_index.add(self.template_library, self._template_ids())
+            self.ann_index.save(os.path.join(self.sign_store.directory, ANN_INDEX_FILE))
+        self._refit_calibration()
+        if self.result_cache is not None:
+            self.result_cache.clear()
 
         # Reset recording state
-        self.recorded_results = []
+        self.clear_frames()
         self.is_saving = False
         self.current_sign_name = None
 
+    @property
+    def calibration(self):
+        """
+        Per-sign thresholds and confidence model of the current templates.
+
+        Never fits inline. Until the first background fit is done, every sign
+        is accepted within dtw_threshold; after a sign is saved, the previous
+        calibration is returned until the background refit is done.
+
+        :return: SignCalibration
+        """
+        calibration = self._calibration
+        if calibration is None:
+            return SignCalibration({}, self.dtw_threshold)
+        return calibration
+
+    def wait_for_calibration(self, timeout=None):
+        """
+        Block until no calibration fit is running, e.g. before handing the store to workers.
+
+        :return: The current SignCalibration
+        """
+        while True:
+            with self._calibration_lock:
+                thread = self._calibration_thread
+            if thread is None:
+                break
+            thread.join(timeout)
+            if thread.is_alive():
+                break
+        return self.calibration
+
+    def _calibration_key(self, library):
+        """Identifies the templates, pipeline and window a calibration was fitted for."""
+        return (f"{self.sign_store.generation}-{len(library)}-{int(library.lengths.sum())}-"
+                f"{self.feature_pipeline.key}-{self.dtw_window}")
+
+    def _calibration_path(self):
+        return os.path.join(self.sign_store.directory, CALIBRATION_FILE)
+
+    def _load_or_fit_calibration(self, library):
+        """Calibration of a library, from the sign store when it matches, else fitted and saved."""
+        key = self._calibration_key(library)
+        path = self._calibration_path()
+        calibration = SignCalibration.load(path, key)
+        if calibration is None:
+            with metrics.timer("calibration"):
+                calibration = SignCalibration.fit(library, self.dtw_window, key=key)
+            if len(library):
+                calibration.save(path)
+        return calibration
+
+    def _refit_calibration(self):
+        """Refit the calibration on a background thread, unless one is already running."""
+        with self._calibration_lock:
+            self._calibration_stale = True
+            if self._calibration_thread is None:
+                self._calibration_thread = threading.Thread(target=self._calibration_worker, name="calibration",
+                                                            daemon=True)
+                self._calibration_thread.start()
+
+    def _calibration_worker(self):
+        """Fit snapshots of the library until no sign was saved during the last fit."""
+        while True:
+            with self._calibration_lock:
+                if not self._calibration_stale:
+                    self._calibration_thread = None
+                    return
+                self._calibration_stale = False
+                library = self.template_library
+                # Views of the current rows; later adds do not change them
+                snapshot = library.shard(0, len(library))
+            self._calibration = self._load_or_fit_calibration(snapshot)
+            if self.result_cache is not None:
+                # Cached results were accepted under the previous calibration
+                self.result_cache.clear()
+
+    @metrics.timed("recognition")
+    def recognize(self, frames, k=None):
+        """
+        Match one landmark sequence against every reference template.
+
+        Does not touch the recording state, so it also serves batch scoring.
+
+        :param frames: Landmarks of shape (n, 2, 63)
+        :param k: Number of candidates to rank (default: top_k)
+        :return: Dictionary with the best "sign" (None without templates) and its
+            raw DTW "distance", the best "distances" per sign, the search "stats",
+            the ranked "candidates" (dicts with sign, distance, normalized,
+            threshold and confidence), the "margin" of the best normalized
+            distance to the second best, the best match's "confidence" and
+            whether it is "accepted" within its sign's threshold
+        """
+        k = k or self.top_k
+        if len(frames) == 0:
+            # Nothing to fingerprint or match: no template is a candidate
+            library = self.template_library
+            return self._rank(np.zeros((0, 2, 63), dtype=np.float32), np.zeros(2, dtype=bool),
+                              np.full(len(library), np.inf), search_stats(len(library)), k)
+        query_mask = np.any(frames != 0, axis=(0, 2))
+        key = self._cache_key(frames, query_mask, k)
+        if key is not None:
+            match = self.result_cache.get(key)
+            if match is not None:
+                return match
+
+        # Compute DTW distances against the reference templates, skipping those
+        # whose lower bound already rules them out of the k best
+        searcher = self.parallel_search or self.template_library
+        templates = self._ann_candidates(frames, query_mask)
+        with metrics.timer("template_search"):
+            template_distances, stats = searcher.search(
+                frames, query_mask,
+                window=self.dtw_window, threshold=self.dtw_threshold, k=k, shortlist=self.coarse_shortlist,
+                templates=templates
+            )
+        match = self._rank(frames, query_mask, template_distances, stats, k)
+        if key is not None:
+            self.result_cache.put(key, match)
+        return match
+
+    @metrics.timed("batch_recognition")
+    def recognize_many(self, frames_list, k=None):
+        """
+        Match several landmark sequences at once, e.g. gestures of concurrent sessions.
+
+        The queries are searched together (TemplateLibrary.search_many), which
+        gives the same results as calling recognize on each.
+
+        :param frames_list: List of landmarks of shape (n, 2, 63)
+        :param k: Number of candidates to rank (default: top_k)
+        :return: List of recognize results, in order
+        """
+        if self.parallel_search is not None or any(len(frames) == 0 for frames in frames_list):
+            # Shards are already spread over the worker pool per query, and
+            # empty queries take recognize's shortcut
+            return [self.recognize(frames, k) for frames in frames_list]
+
+        k = k or self.top_k
+        query_masks = [np.any(frames != 0, axis=(0, 2)) for frames in frames_list]
+        keys = [self._cache_key(frames, query_mask, k) for frames, query_mask in zip(frames_list, query_masks)]
+        matches = [self.result_cache.get(key) if key is not None else None for key in keys]
+        misses = [i for i, match in enumerate(matches) if match is None]
+        if not misses:
+            return matches
+
+        templates = [self._ann_candidates(frames_list[i], query_masks[i]) for i in misses]
+        with metrics.timer("template_search"):
+            results = self.template_library.search_many(
+                [frames_list[i] for i in misses], [query_masks[i] for i in misses],
+                window=self.dtw_window, threshold=self.dtw_threshold, k=k, shortlist=self.coarse_shortlist,
+                templates=templates
+            )
+        for i, (template_distances, stats) in zip(misses, results):
+            matches[i] = self._rank(frames_list[i], query_masks[i], template_distances, stats, k)
+            if keys[i] is not None:
+                self.result_cache.put(keys[i], matches[i])
+        return matches
+
+    def _ann_candidates(self, frames, query_mask):
+        """Templates the embedding index proposes for DTW re-ranking, None to search all."""
+        if self.ann_index is None or len(self.template_library) <= self.ann_candidates:
+            return None
+        with metrics.timer("ann_candidates"):
+            return self.ann_index.search(self.template_library.prepare(frames), query_mask, self.ann_candidates)
+
+    def _cache_key(self, frames, query_mask, k):
+        """Result cache key of a query, None without a cache or frames."""
+        if self.result_cache is None or len(frames) == 0:
+            return None
+        return self.result_cache.key(self.template_library.prepare(frames), query_mask, len(frames), k)
+
+    def _rank(self, frames, query_mask, template_distances, stats, k):
+        """Turn the template distances of one query into a recognize result."""
+        distances = self.template_library.best_per_sign(template_distances)
+        metrics.count("recognitions")
+        metrics.count("templates_searched", stats["templates"])
+        metrics.count("templates_dtw", stats["dtw"])
+        metrics.count("templates_pruned", stats["templates"] - stats["dtw"])
+        metrics.count("templates_abandoned", stats["abandoned"])
+
+        # Rank signs by distance per unit of warping path; only the k best are sorted
+        library = self.template_library
+        normalized = library.normalize(template_distances, len(frames), query_mask)
+        sign_normalized = np.full(len(library.sign_names), np.inf)
+        sign_raw = np.full(len(library.sign_names), np.inf)
+        np.minimum.at(sign_normalized, library.sign_ids, normalized)
+        np.minimum.at(sign_raw, library.sign_ids, template_distances)
+        top = np.flatnonzero(np.isfinite(sign_normalized))
+        if len(top) > k:
+            top = top[np.argpartition(sign_normalized[top], k - 1)[:k]]
+        top = top[np.argsort(sign_normalized[top], kind="stable")]
+
+        calibration = self.calibration
+        candidates = []
+        for sign_id in top:
+            sign = library.sign_names[sign_id]
+            candidates.append({
+                "sign": sign,
+                "distance": float(sign_raw[sign_id]),
+                "normalized": float(sign_normalized[sign_id]),
+                "threshold": calibration.threshold(sign),
+                "confidence": calibration.confidence(sign_normalized[sign_id], sign),
+            })
+
+        if candidates:
+            best_sign, best_distance = candidates[0]["sign"], candidates[0]["distance"]
+        else:
+            best_sign = min(distances, key=distances.get) if distances else None
+            best_distance = distances[best_sign] if distances else float('inf')
+        margin = candidates[1]["normalized"] - candidates[0]["normalized"] if len(candidates) > 1 else float('inf')
+        accepted = bool(candidates) and candidates[0]["normalized"] <= candidates[0]["threshold"]
+        return {"sign": best_sign, "distance": best_distance, "distances": distances, "stats": stats,
+                "candidates": candidates, "margin": margin,
+                "confidence": candidates[0]["confidence"] if candidates else 0.0, "accepted": accepted}
+
     def _compute_distances_and_predict(self) -> str:
         """
         Compute DTW distances and predict the sign.
@@ -133,91 +517,71 @@ class SignRecorder(object):
         # Check if we have reference signs
         if self.num_loaded_signs == 0:
             print("⚠ No reference signs found. Record some signs first using 'record' mode.")
-            self.recorded_results = []
+            self.clear_frames()
             self.is_recording = False
             self.last_dtw_distance = None
             return "No reference signs"
 
-        print(f"\n=== Processing sequence of {len(self.recorded_results)} frames ===")
-
-        left_hand_list, right_hand_list = [], []
-        for results in self.recorded_results:
-            _, left_hand, right_hand = extract_landmarks(results)
-            left_hand_list.append(left_hand)
-            right_hand_list.append(right_hand)
-
-        # Create a SignModel object with the landmarks gathered during recording
-        recorded_sign = SignModel(left_hand_list, right_hand_list)
-
-        # Compute DTW distances against all reference signs
-        distances = {}
-        for sign_name, sequences in self.sign_sequences.items():
-            min_distance = float('inf')
-            for ref_left, ref_right in sequences:
-                # ref_left and ref_right are full sequences (arrays of shape (seq_len, 63))
-                # Convert them to list format for SignModel
-                ref_sign = SignModel(ref_left.tolist(), ref_right.tolist())
-                # Compute DTW distance
-                dist = self._compute_dtw_distance(recorded_sign, ref_sign)
-                min_distance = min(min_distance, dist)
-            distances[sign_name] = min_distance
+        print(f"\n=== Processing sequence of {self.num_frames} frames ===")
+
+        # Landmarks were extracted as the frames arrived
+        match = self.recognize(self.recorded_frames)
+        distances, stats = match["distances"], match["stats"]
+        self.last_search_stats = stats
+
+        pruned = stats["templates"] - stats["dtw"]
+        print(f"Pruned {pruned}/{stats['templates']} templates "
+              f"(index: {stats['pruned_index']}, coarse DTW: {stats['pruned_coarse']}, LB_Kim: {stats['pruned_kim']}, "
+              f"LB_PAA: {stats['pruned_paa']}, LB_Keogh: {stats['pruned_keogh']}, "
+              f"best-so-far: {stats['pruned_best_so_far']}), full DTW on {stats['dtw']} "
+              f"({stats['abandoned']} abandoned early)")
 
         # Find the best match
-        if distances:
-            best_sign = min(distances, key=distances.get)
-            best_distance = distances[best_sign]
-            
-            print(f"DTW Distances: {distances}")
-            print(f"Best match: '{best_sign}' (distance: {best_distance:.2f})")
-            
+        candidates = match["candidates"]
+        self.last_candidates = candidates
+        if candidates:
+            best = candidates[0]
+            best_sign, best_distance = best["sign"], best["distance"]
+
+            for rank, candidate in enumerate(candidates, 1):
+                print(f"{rank}. '{candidate['sign']}' distance {candidate['distance']:.2f} "
+                      f"(normalized {candidate['normalized']:.3f} / threshold {candidate['threshold']:.3f}, "
+                      f"confidence {candidate['confidence']:.0%})")
+            print(f"Best match: '{best_sign}' (distance: {best_distance:.2f}, margin: {match['margin']:.3f})")
+
             # Store distance for display
             self.last_dtw_distance = best_distance
-            
-            # Check if distance is below threshold
-            if best_distance > self.dtw_threshold:
-                print(f"⚠ Distance {best_distance:.2f} exceeds threshold {self.dtw_threshold}")
+
+            # Accept only within the sign's learned threshold; the global DTW
+            # threshold already bounded the search
+            if not match["accepted"]:
+                print(f"⚠ Normalized distance {best['normalized']:.3f} exceeds "
+                      f"'{best_sign}' threshold {best['threshold']:.3f}")
                 print("→ Classified as 'Unknown Sign'")
                 best_sign = "Unknown Sign"
         else:
+            # Every template was pruned by the global DTW threshold
+            print(f"⚠ No template within DTW threshold {self.dtw_threshold}")
+            print("→ Classified as 'Unknown Sign'")
             best_sign = "Unknown Sign"
             self.last_dtw_distance = None
 
         # Reset recording state
-        self.recorded_results = []
+        self.clear_frames()
         self.is_recording = False
 
         return best_sign
 
-    def _compute_dtw_distance(self, sign1: SignModel, sign2: SignModel) -> float:
-        """
-        Compute DTW distance between two sign models using FastDTW.
-        """
-        from fastdtw import fastdtw
-        
-        # Get embeddings
-        emb1_left = sign1.lh_embedding if sign1.has_left_hand else []
-        emb1_right = sign1.rh_embedding if sign1.has_right_hand else []
-        emb2_left = sign2.lh_embedding if sign2.has_left_hand else []
-        emb2_right = sign2.rh_embedding if sign2.has_right_hand else []
-        
-        total_distance = 0
-        
-        # Compute DTW for left hand if both have it
-        if sign1.has_left_hand and sign2.has_left_hand and len(emb1_left) > 0 and len(emb2_left) > 0:
-            dist, _ = fastdtw(emb1_left, emb2_left)
-            total_distance += dist
-        
-        # Compute DTW for right hand if both have it
-        if sign1.has_right_hand and sign2.has_right_hand and len(emb1_right) > 0 and len(emb2_right) > 0:
-            dist, _ = fastdtw(emb1_right, emb2_right)
-            total_distance += dist
-        
-        return total_distance if total_distance > 0 else float('inf')
+    def close(self):
+        """Release the parallel search workers, if any."""
+        if self.parallel_search is not None:
+            self.parallel_search.close()
+            self.parallel_search = None
 
     def stop_recording(self):
         """Stop recording without saving."""
         self.is_recording = False
         self.is_saving = False
-        self.recorded_results = []
+        self.clear_frames()
         print("Stopped recording")
 
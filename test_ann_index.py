@@ -0,0 +1,63 @@
+import contextlib
+import io
+import os
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_store
+from models.ann_index import ANN_INDEX_FILE, IVFIndex
+from models.template_library import TemplateLibrary
+from sign_recorder import SignRecorder
+from utils.features import FeaturePipeline
+
+
+def test_index_proposes_the_queried_template_and_survives_reload(tmp_path):
+    store = synthetic_store(str(tmp_path), 120, (20, 30), seed=11)
+    library = TemplateLibrary.from_store(store, FeaturePipeline())
+    ids = [template["offset"] for template in store.templates]
+    rng = np.random.default_rng(12)
+
+    for dims in (None, 16):
+        index = IVFIndex.build(library, ids, dims=dims, key="test")
+        for i in rng.integers(len(library), size=5):
+            frames = store.template_frames(store.templates[i])
+            query = frames + rng.normal(scale=0.002, size=frames.shape) * library.hand_mask[i][:, None]
+            candidates = index.search(library.prepare(query), library.hand_mask[i], 10)
+            assert len(candidates) == 10 and i in candidates
+
+        path = os.path.join(str(tmp_path), ANN_INDEX_FILE)
+        index.save(path)
+        assert IVFIndex.load(path, key="other") is None
+        loaded = IVFIndex.load(path, key="test")
+        np.testing.assert_array_equal(loaded.vectors, index.vectors)
+        assert loaded.embedder.dims == dims
+
+        # Deleted templates are dropped; a shuffled store needs a rebuild
+        store.delete("sign_0")
+        library = TemplateLibrary.from_store(store, FeaturePipeline())
+        ids = [template["offset"] for template in store.templates]
+        assert loaded.sync(library, ids) and len(loaded) == len(library)
+        assert not loaded.sync(library, ids[::-1])
+
+
+def test_recorder_reranks_index_candidates_and_extends_the_index(tmp_path):
+    store = synthetic_store(str(tmp_path), 60, 20, seed=13)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = SignRecorder(signs_dir=str(tmp_path), seq_len=20, dtw_threshold=float('inf'), ann_candidates=8)
+        exact = SignRecorder(signs_dir=str(tmp_path), seq_len=20, dtw_threshold=float('inf'))
+    assert os.path.exists(os.path.join(str(tmp_path), ANN_INDEX_FILE))
+    gesture = store.template_frames(store.templates[7]) + 0.001
+
+    match = recorder.recognize(gesture)
+    assert match["sign"] == exact.recognize(gesture)["sign"]
+    assert match["stats"]["pruned_index"] >= len(recorder.template_library) - 8
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder.save_reference_sign("new_sign", frames=gesture * 2)
+    assert len(recorder.ann_index) == 61
+    assert recorder.recognize(gesture * 2)["sign"] == "new_sign"
+
+    # A new recorder picks the extended index up from the store
+    with contextlib.redirect_stdout(io.StringIO()):
+        reloaded = SignRecorder(signs_dir=str(tmp_path), seq_len=20, ann_candidates=8)
+    np.testing.assert_array_equal(reloaded.ann_index.vectors, recorder.ann_index.vectors)
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import random_walk_frames, synthetic_store
+from models.template_library import TemplateLibrary
+from utils.batch_scheduler import MicroBatchScheduler
+from utils.features import FeaturePipeline
+
+
+def test_search_many_matches_one_search_per_query(tmp_path):
+    store = synthetic_store(str(tmp_path), 30, (20, 40), seed=7)
+    library = TemplateLibrary.from_store(store, FeaturePipeline())
+    rng = np.random.default_rng(8)
+    queries = [random_walk_frames(rng, n, hands) for n, hands in
+               [(30, (True, True)), (30, (True, False)), (25, (True, True)), (30, (False, False))]]
+    masks = [np.any(query != 0, axis=(0, 2)) for query in queries]
+
+    for k in (1, 3):
+        batched = library.search_many(queries, masks, window=5, k=k)
+        for query, mask, (distances, stats) in zip(queries, masks, batched):
+            expected, expected_stats = library.search(query, mask, window=5, k=k)
+            np.testing.assert_allclose(distances, expected, rtol=1e-5)
+            assert stats == expected_stats
+
+
+def test_scheduler_batches_concurrent_requests():
+    batches = []
+
+    def process(requests):
+        batches.append(list(requests))
+        return [request * 2 for request in requests]
+
+    scheduler = MicroBatchScheduler(process, max_batch=4, max_wait=0.2)
+    try:
+        futures = [scheduler.submit(i) for i in range(6)]
+        assert [future.result(timeout=2) for future in futures] == [0, 2, 4, 6, 8, 10]
+        assert [len(batch) for batch in batches] == [4, 2]
+
+        # A lone request waits at most max_wait
+        start = time.perf_counter()
+        assert scheduler.submit(5).result(timeout=2) == 10
+        assert time.perf_counter() - start < 1.0
+    finally:
+        scheduler.close()
+
+
+def test_scheduler_routes_errors_to_every_request():
+    def process(requests):
+        raise ValueError("bad batch")
+
+    scheduler = MicroBatchScheduler(process, max_wait=0.01)
+    futures = [scheduler.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=2)
+    scheduler.close()
+    assert not any(t.name == "batch-scheduler" and t.is_alive() for t in threading.enumerate())
@@ -0,0 +1,129 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import random_walk_frames, synthetic_store
+from models.calibration import SignCalibration
+from models.template_library import TemplateLibrary
+from sign_recorder import SignRecorder
+from utils.features import FeaturePipeline
+
+
+def test_top_k_search_keeps_the_k_best_signs_exact(tmp_path):
+    store = synthetic_store(str(tmp_path), 40, (20, 40), seed=1)
+    library = TemplateLibrary.from_store(store, FeaturePipeline())
+    query = random_walk_frames(np.random.default_rng(2), 30)
+
+    # The k best are those of the ranking metric, the normalized distance
+    exact = library.best_per_sign(library.normalize(library.score(query, [True, True]), len(query), [True, True]))
+    distances, _ = library.search(query, [True, True], k=3)
+    searched = library.best_per_sign(library.normalize(distances, len(query), [True, True]))
+    for sign in sorted(exact, key=exact.get)[:3]:
+        assert searched[sign] == pytest.approx(exact[sign], rel=1e-4)
+
+
+def test_calibration_learns_thresholds_and_ranks_confidence(tmp_path):
+    store = synthetic_store(str(tmp_path), 30, 30, seed=3)
+    library = TemplateLibrary.from_store(store, FeaturePipeline())
+    calibration = SignCalibration.fit(library, key="k")
+
+    assert set(calibration.thresholds) == set(library.sign_names)
+    sign = library.sign_names[0]
+    threshold = calibration.threshold(sign)
+    assert calibration.confidence(0.5 * threshold, sign) > calibration.confidence(2 * threshold, sign)
+    assert calibration.confidence(float('inf'), sign) == 0.0
+
+    path = str(tmp_path / "calibration.json")
+    calibration.save(path)
+    assert SignCalibration.load(path, key="k").thresholds == pytest.approx(calibration.thresholds)
+    assert SignCalibration.load(path, key="other") is None
+
+
+def test_recognize_returns_ranked_candidates(tmp_path):
+    store = synthetic_store(str(tmp_path), 30, 30, seed=4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = SignRecorder(signs_dir=str(tmp_path), dtw_threshold=float('inf'), top_k=3)
+    recorder.wait_for_calibration()
+    template = store.templates[0]
+    match = recorder.recognize(store.template_frames(template))
+
+    candidates = match["candidates"]
+    assert len(candidates) == 3
+    assert candidates[0]["sign"] == template["name"]
+    normalized = [candidate["normalized"] for candidate in candidates]
+    assert normalized == sorted(normalized)
+    assert match["margin"] == pytest.approx(normalized[1] - normalized[0])
+    assert candidates[0]["confidence"] >= candidates[-1]["confidence"]
+
+
+def test_default_threshold_rejects_an_unrelated_gesture(tmp_path):
+    store = synthetic_store(str(tmp_path), 30, 50, seed=4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = SignRecorder(signs_dir=str(tmp_path))
+    recorder.wait_for_calibration()
+    rng = np.random.default_rng(5)
+    template = store.templates[4]
+    frames = store.template_frames(template)
+
+    repeat = recorder.recognize(frames + rng.normal(scale=0.005, size=frames.shape) * (frames != 0))
+    assert repeat["sign"] == template["name"] and repeat["accepted"]
+    for _ in range(3):
+        assert not recorder.recognize(random_walk_frames(rng, 50))["accepted"]
+
+
+def test_one_template_per_sign_still_gets_a_finite_threshold(tmp_path):
+    store = synthetic_store(str(tmp_path), 8, 40, seed=6, templates_per_sign=1)
+    library = TemplateLibrary.from_store(store, FeaturePipeline())
+    calibration = SignCalibration.fit(library)
+    assert not calibration.thresholds and np.isfinite(calibration.default_threshold)
+    assert calibration.confidence(10 * calibration.default_threshold, "sign_0") < 0.5
+    assert SignCalibration([], float('inf')).confidence(5.0, "sign_0") < 1.0
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = SignRecorder(signs_dir=str(tmp_path), dtw_threshold=float('inf'))
+    recorder.wait_for_calibration()
+    template = store.templates[2]
+    assert recorder.recognize(store.template_frames(template))["accepted"]
+    rng = np.random.default_rng(7)
+    for _ in range(3):
+        match = recorder.recognize(random_walk_frames(rng, 40))
+        assert not match["accepted"] and match["confidence"] < 0.5
+
+
+def test_saving_a_sign_refits_calibration_in_the_background(tmp_path):
+    store = synthetic_store(str(tmp_path), 12, 30, seed=8)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = SignRecorder(signs_dir=str(tmp_path), seq_len=30)
+    recorder.wait_for_calibration()
+    frames = store.template_frames(store.templates[0])
+    present = frames != 0
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder.save_reference_sign("fresh", frames=frames + 0.001 * present)
+        recorder.save_reference_sign("fresh", frames=frames + 0.002 * present)
+    # Saving keeps a calibration in place instead of forcing an inline refit
+    assert recorder._calibration is not None
+    assert recorder.recognize(frames)["candidates"]
+
+    recorder.wait_for_calibration(timeout=10)
+    assert recorder._calibration_thread is None
+    assert "fresh" in recorder.calibration.thresholds
+    assert recorder.calibration.key.split("-")[1] == str(len(recorder.template_library))
+
+
+def test_calibration_is_fitted_off_the_recognition_path_and_then_loaded(tmp_path):
+    store = synthetic_store(str(tmp_path), 30, 30, seed=9)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = SignRecorder(signs_dir=str(tmp_path), seq_len=30, dtw_threshold=float('inf'))
+    # The first recognition neither waits for nor runs the fit
+    assert recorder._calibration is None and recorder._calibration_thread is not None
+    match = recorder.recognize(store.template_frames(store.templates[0]))
+    assert match["candidates"][0]["threshold"] == float('inf')
+
+    fitted = recorder.wait_for_calibration()
+    assert fitted.key is not None and recorder._calibration_thread is None
+    with contextlib.redirect_stdout(io.StringIO()):
+        reopened = SignRecorder(signs_dir=str(tmp_path), seq_len=30, dtw_threshold=float('inf'))
+    assert reopened._calibration_thread is None and reopened.calibration.thresholds == fitted.thresholds
@@ -0,0 +1,106 @@
+import csv
+import pickle
+
+import cv2
+import numpy as np
+
+import batch_recognize
+from benchmarks.synthetic import fake_results
+from utils import mediapipe_utils
+from utils.dataset_utils import iter_dataset, iter_video_frames, list_dataset, load_landmarks
+from utils.sign_storage import SignStore
+
+
+def test_dataset_files_are_listed_with_folder_labels(tmp_path):
+    (tmp_path / "hello").mkdir()
+    np.save(tmp_path / "hello" / "take1.npy", np.zeros((10, 2, 63), dtype=np.float32))
+    np.save(tmp_path / "loose.npy", np.zeros((5, 126), dtype=np.float32))
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    entries = list_dataset(str(tmp_path))
+    assert [(e["name"], e["label"], e["kind"]) for e in entries] == [
+        ("loose", None, "landmarks"), ("take1", "hello", "landmarks")
+    ]
+    assert [frames.shape for _, frames in iter_dataset(str(tmp_path))] == [(5, 2, 63), (10, 2, 63)]
+
+
+def test_batch_rows_report_prediction_and_correctness(tmp_path):
+    rng = np.random.default_rng(0)
+    store = SignStore(str(tmp_path / "signs"))
+    for name in ["hello", "thanks"]:
+        store.save_frames(name, rng.random((30, 2, 63)).astype(np.float32))
+    (tmp_path / "dataset" / "thanks").mkdir(parents=True)
+    np.save(tmp_path / "dataset" / "thanks" / "take1.npy", store.template_frames(store.templates[1]))
+
+    batch_recognize._init_worker(str(tmp_path / "signs"), 2000, None)
+    entry = list_dataset(str(tmp_path / "dataset"))[0]
+    row = batch_recognize.recognize_file(entry)
+    assert row["prediction"] == "thanks" and row["correct"] is True
+    assert row["frames"] == 30 and row["error"] is None
+
+
+def test_batch_pool_runs_against_a_legacy_pickle_store(tmp_path, monkeypatch):
+    rng = np.random.default_rng(1)
+    (tmp_path / "signs").mkdir()
+    for i in range(12):
+        frames = rng.random((30, 2, 63)).astype(np.float32)
+        with open(tmp_path / "signs" / f"sign_{i:02d}.pkl", "wb") as f:
+            pickle.dump({"left_hand": list(frames[:, 0]), "right_hand": list(frames[:, 1])}, f)
+        (tmp_path / "dataset" / f"sign_{i:02d}").mkdir(parents=True)
+        np.save(tmp_path / "dataset" / f"sign_{i:02d}" / "take1.npy", frames)
+
+    output = tmp_path / "predictions.csv"
+    monkeypatch.setattr("sys.argv", ["batch_recognize.py", str(tmp_path / "dataset"), "--output", str(output),
+                                     "--workers", "4", "--signs-dir", str(tmp_path / "signs")])
+    assert batch_recognize.main() == 0
+
+    store = SignStore(str(tmp_path / "signs"))
+    assert len(store.templates) == 12 and not list((tmp_path / "signs").glob("*.pkl"))
+    # Fitted once by the parent, so the workers only load it
+    assert (tmp_path / "signs" / "calibration.json").exists()
+    with open(output, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 12 and all(row["error"] == "" and row["correct"] == "True" for row in rows)
+
+
+def test_every_video_gets_its_own_landmarker_and_timeline(tmp_path, monkeypatch):
+    services = []
+
+    class FakeLandmarker:
+        def __init__(self, running_mode):
+            self.running_mode, self.timestamps, self.closed = running_mode, [], False
+            services.append(self)
+
+        def detect(self, image, timestamp_ms=None):
+            self.timestamps.append(timestamp_ms)
+            return mediapipe_utils.MockResults()
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(mediapipe_utils, "LandmarkerService", FakeLandmarker)
+    for name in ["a", "b"]:
+        writer = cv2.VideoWriter(str(tmp_path / f"{name}.avi"), cv2.VideoWriter_fourcc(*"MJPG"), 10, (8, 8))
+        for _ in range(3):
+            writer.write(np.zeros((8, 8, 3), dtype=np.uint8))
+        writer.release()
+
+    for entry in list_dataset(str(tmp_path)):
+        assert load_landmarks(entry).shape == (3, 2, 63)
+    assert [(s.running_mode, s.timestamps, s.closed) for s in services] == [("video", [0, 100, 200], True)] * 2
+
+
+def test_video_frames_can_be_kept_after_the_next_one_is_read(tmp_path):
+    rng = np.random.default_rng(2)
+
+    class FakeLandmarker:
+        def detect(self, image, timestamp_ms=None):
+            return fake_results(rng, num_hands=1)
+
+    writer = cv2.VideoWriter(str(tmp_path / "take.avi"), cv2.VideoWriter_fourcc(*"MJPG"), 10, (8, 8))
+    for _ in range(3):
+        writer.write(np.zeros((8, 8, 3), dtype=np.uint8))
+    writer.release()
+
+    frames = list(iter_video_frames(str(tmp_path / "take.avi"), FakeLandmarker()))
+    assert len(frames) == 3 and not np.array_equal(frames[0], frames[2])
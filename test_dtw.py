@@ -0,0 +1,169 @@
+import numpy as np
+
+from models.template_library import TemplateLibrary
+from utils.dtw import (
+    batch_dtw, dtw, dtw_distances, frame_cost_matrix, keogh_envelope, lb_keogh, lb_kim, lb_paa, paa, paa_envelope,
+    sakoe_chiba_band
+)
+
+
+def naive_dtw(x, y, window=None):
+    """Reference O(n*m) Python DTW used to check the vectorized kernel."""
+    cost = frame_cost_matrix(x, y)
+    n, m = cost.shape
+    lo, hi = sakoe_chiba_band(n, m, window)
+    acc = np.full((n + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(lo[i - 1] + 1, hi[i - 1] + 2):
+            acc[i, j] = cost[i - 1, j - 1] + min(acc[i - 1, j], acc[i, j - 1], acc[i - 1, j - 1])
+    return acc[n, m]
+
+
+def test_dtw_matches_naive_implementation():
+    rng = np.random.default_rng(0)
+    for n, m in [(50, 50), (30, 45), (45, 30), (1, 7), (7, 1)]:
+        x = rng.random((n, 2, 63))
+        y = rng.random((m, 2, 63))
+        for window in [None, 0, 3, 10]:
+            assert np.isclose(dtw(x, y, window), naive_dtw(x, y, window))
+
+
+def test_dtw_identical_sequences_is_zero():
+    x = np.random.default_rng(1).random((50, 63))
+    assert dtw(x, x) == 0.0
+    assert dtw(x, x, window=2) == 0.0
+
+
+def test_dtw_distances_keeps_reference_order():
+    rng = np.random.default_rng(2)
+    query = rng.random((20, 63))
+    references = [rng.random((20, 63)) for _ in range(3)] + [query]
+    distances = dtw_distances(query, references, window=4)
+    assert len(distances) == 4
+    assert distances[-1] == 0.0
+    assert all(d > 0 for d in distances[:-1])
+
+
+def test_batch_dtw_matches_pairwise_dtw():
+    rng = np.random.default_rng(3)
+    query = rng.random((40, 2, 63))
+    lengths = np.array([40, 30, 50, 25])
+    templates = np.zeros((4, 50, 2, 63))
+    for b, length in enumerate(lengths):
+        templates[b, :length] = rng.random((length, 2, 63))
+    hand_weights = np.array([[1, 1], [1, 0], [0, 1], [0, 0]], dtype=bool)
+
+    for window in [None, 6]:
+        distances = batch_dtw(query, templates, lengths, hand_weights, window)
+        for b, length in enumerate(lengths):
+            hands = hand_weights[b]
+            expected = dtw(query[:, hands], templates[b, :length][:, hands], window) if hands.any() else np.inf
+            assert np.isclose(distances[b], expected, rtol=1e-4)
+
+
+def test_lower_bounds_never_exceed_dtw():
+    rng = np.random.default_rng(4)
+    query = rng.random((30, 2, 63))
+    lengths = np.array([30, 24, 36, 30])
+    templates = np.zeros((4, 36, 2, 63))
+    for b, length in enumerate(lengths):
+        templates[b, :length] = rng.random((length, 2, 63))
+    hand_weights = np.array([[1, 1], [1, 0], [0, 1], [1, 1]], dtype=bool)
+
+    for window in [None, 2, 5]:
+        distances = batch_dtw(query, templates, lengths, hand_weights, window)
+        lower, upper = keogh_envelope(templates, len(query), lengths, window)
+        assert np.all(lb_kim(query, templates, lengths, hand_weights) <= distances + 1e-3)
+        keogh = lb_keogh(query, lower, upper, hand_weights)
+        assert np.all(keogh <= distances + 1e-3)
+        for segments in [4, 7, 16]:
+            paa_lower, paa_upper = paa_envelope(lower, upper, len(query), segments)
+            assert np.all(lb_paa(query, paa_lower, paa_upper, hand_weights) <= keogh + 1e-3)
+
+
+def test_library_search_finds_brute_force_best():
+    rng = np.random.default_rng(5)
+    sequences = {
+        f"sign_{i}": [(rng.random((20, 63)), rng.random((20, 63)) if i % 3 else np.zeros((20, 63)))]
+        for i in range(40)
+    }
+    library = TemplateLibrary.from_sequences(sequences)
+    left, right = sequences["sign_7"][0]
+    query = np.stack([left, right], axis=1) + rng.normal(0, 0.01, (20, 2, 63))
+
+    for window in [None, 3]:
+        exhaustive = library.score(query, [True, True], window)
+        distances, stats = library.search(query, [True, True], window)
+        best = int(np.argmin(exhaustive))
+        assert int(np.argmin(distances)) == best
+        assert np.isclose(distances[best], exhaustive[best])
+        pruned = stats["pruned_kim"] + stats["pruned_paa"] + stats["pruned_keogh"] + stats["pruned_best_so_far"]
+        assert stats["dtw"] + pruned == len(library)
+        assert stats["dtw"] < len(library)
+
+
+def test_search_ranks_like_an_exhaustive_normalized_scan_for_every_k():
+    rng = np.random.default_rng(8)
+    # One-handed templates have half the hands, short ones shorter paths: raw
+    # and normalized distances rank them differently
+    sequences = {}
+    for i in range(30):
+        length = 15 + 5 * (i % 4)
+        right = rng.random((length, 63)) if i % 2 else np.zeros((length, 63))
+        sequences[f"sign_{i}"] = [(rng.random((length, 63)), right)]
+    library = TemplateLibrary.from_sequences(sequences)
+    left, right = sequences["sign_5"][0]
+    query = np.stack([left, right], axis=1) + rng.normal(0, 0.3, (len(left), 2, 63))
+
+    for window in [None, 4]:
+        exhaustive = library.normalize(library.score(query, [True, True], window), len(query), [True, True])
+        expected = library.sign_names[library.sign_ids[int(np.argmin(exhaustive))]]
+        for k in [1, 2, 3, 5]:
+            distances, _ = library.search(query, [True, True], window, k=k)
+            normalized = library.normalize(distances, len(query), [True, True])
+            assert library.sign_names[library.sign_ids[int(np.argmin(normalized))]] == expected
+            assert np.isclose(normalized.min(), exhaustive.min())
+
+
+def test_paa_cascade_keeps_search_results():
+    rng = np.random.default_rng(7)
+    sequences = {
+        f"sign_{i}": [(rng.random((length, 63)), rng.random((length, 63))) for length in (18, 24, 30)]
+        for i in range(20)
+    }
+    library = TemplateLibrary.from_sequences(sequences)
+    plain = TemplateLibrary.from_sequences(sequences, paa_resolutions=())
+    left, right = sequences["sign_3"][1]
+    query = np.stack([left, right], axis=1) + rng.normal(0, 0.01, (24, 2, 63))
+    extra = rng.random((27, 2, 63))
+    for lib in (library, plain):
+        lib.search(query, [True, True], 4)
+        lib.add("sign_extra", extra, [True, True])
+
+    # The coarse frames of an added template match those computed in bulk
+    np.testing.assert_allclose(library.paa_frames[8][-1], paa(extra[None], [27], 8)[0], rtol=1e-5)
+    for window, k in [(None, 1), (4, 3)]:
+        distances, stats = library.search(query, [True, True], window, k=k)
+        expected, _ = plain.search(query, [True, True], window, k=k)
+        per_sign, expected_per_sign = library.best_per_sign(distances), plain.best_per_sign(expected)
+        top = sorted(expected_per_sign, key=expected_per_sign.get)[:k]
+        assert sorted(per_sign, key=per_sign.get)[:k] == top
+        assert np.allclose([per_sign[sign] for sign in top], [expected_per_sign[sign] for sign in top])
+
+    distances, stats = library.search(query, [True, True], 4, shortlist=4)
+    assert stats["pruned_coarse"] == len(library) - 4
+    assert np.count_nonzero(np.isfinite(distances)) <= 4
+
+
+def test_early_abandon_only_drops_distances_above_bound():
+    rng = np.random.default_rng(6)
+    query = rng.random((25, 2, 63))
+    templates = rng.random((8, 25, 2, 63))
+    exact = batch_dtw(query, templates, window=4)
+    bound = float(np.median(exact))
+
+    abandoned = batch_dtw(query, templates, window=4, max_dist=bound)
+    assert np.allclose(abandoned[exact <= bound], exact[exact <= bound])
+    assert np.all(np.isinf(abandoned[exact > bound]))
+    assert dtw(query[:, 0], templates[0, :, 0], max_dist=0.0) == float('inf')
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from models.template_library import TemplateLibrary
+from utils.features import FeaturePipeline
+from utils.sign_storage import SignStore
+
+
+def random_hands(rng, seq_len=20):
+    frames = rng.random((seq_len, 2, 63)).astype(np.float32)
+    frames[:, 1] = 0.0  # right hand missing
+    return frames
+
+
+def test_normalization_removes_position_and_scale():
+    rng = np.random.default_rng(0)
+    frames = random_hands(rng)
+    moved = frames.copy()
+    moved[:, 0] = (frames[:, 0].reshape(-1, 21, 3) * 2.5 + [0.3, -0.1, 0.05]).reshape(-1, 63)
+
+    pipeline = FeaturePipeline()
+    assert np.allclose(pipeline.transform(frames), pipeline.transform(moved), atol=1e-5)
+    assert not pipeline.transform(frames)[:, 1].any()
+
+
+def test_pipeline_dims_and_unknown_steps():
+    assert FeaturePipeline(()).dims == 63
+    assert FeaturePipeline(("wrist_relative", "velocity", "joint_angles")).dims == 63 + 63 + 15
+    with pytest.raises(ValueError):
+        FeaturePipeline(("mirror",))
+
+
+def test_store_caches_features_row_aligned(tmp_path):
+    rng = np.random.default_rng(1)
+    pipeline = FeaturePipeline(("wrist_relative", "palm_scale", "velocity"))
+    store = SignStore(str(tmp_path))
+    store.save_frames("hello", random_hands(rng))
+    store.save_frames("bye", random_hands(rng, seq_len=30))
+    assert len(store.features(pipeline)) == 50
+
+    entry = store.save_frames("hello", random_hands(rng))
+    features = SignStore(str(tmp_path)).features(pipeline)
+    assert isinstance(features, np.memmap) and len(features) == 70
+    rows = features[entry["offset"]:entry["offset"] + entry["length"]]
+    assert np.allclose(rows, pipeline.transform(store.template_frames(entry)))
+
+    library = TemplateLibrary.from_store(store, pipeline)
+    rebuilt = TemplateLibrary.from_sequences(store.sequences(), pipeline)
+    query = random_hands(rng)
+    assert np.allclose(np.sort(library.score(query, [True, False])),
+                       np.sort(rebuilt.score(query, [True, False])), rtol=1e-4)
@@ -0,0 +1,42 @@
+import time
+
+from utils.frame_pipeline import Capture, DropOldestQueue, LatencyTracker, Stage
+
+
+def test_full_queue_drops_the_oldest_item():
+    queue = DropOldestQueue(2)
+    for item in range(5):
+        queue.put(item)
+    assert queue.dropped == 3
+    assert queue.get() == 3 and queue.get() == 4
+    queue.close()
+    assert queue.get() is None
+
+
+def test_slow_stage_does_not_hold_up_capture():
+    frames = iter(range(60))
+
+    def read():
+        time.sleep(0.002)
+        frame = next(frames, None)
+        return frame is not None, frame
+
+    latency = LatencyTracker()
+    captured, recognized, rendered = DropOldestQueue(2), DropOldestQueue(2), DropOldestQueue(100)
+    capture = Capture(read, captured)
+    stages = [
+        Stage("inference", lambda packet: None, captured, (recognized, rendered), latency),
+        Stage("recognition", lambda packet: time.sleep(0.03), recognized, tracker=latency),
+    ]
+    capture.start()
+    for stage in stages:
+        stage.start()
+    capture.join(timeout=5.0)
+    for stage in stages:
+        stage.join(timeout=5.0)
+
+    assert capture.captured == 60
+    assert len(rendered) + rendered.dropped == stages[0].processed
+    assert stages[1].processed < stages[0].processed and recognized.dropped > 0
+    summary = latency.summary()
+    assert summary["recognition"]["p50"] >= 30 > summary["inference"]["p50"]
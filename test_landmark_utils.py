@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils.landmark_utils import extract_hands, extract_landmarks, extract_landmarks_batch
+
+
+def fake_results(hands):
+    """HandLandmarkerResult stand-in from a {handedness: (21, 3) array} dict."""
+    return SimpleNamespace(
+        hand_landmarks=[[SimpleNamespace(x=x, y=y, z=z) for x, y, z in coords] for coords in hands.values()],
+        handedness=[SimpleNamespace(category_name=name) for name in hands],
+    )
+
+
+def test_extract_hands_places_hands_by_handedness():
+    rng = np.random.default_rng(0)
+    right = rng.random((21, 3))
+    landmarks, mask = extract_hands(fake_results({"Right": right}))
+    assert landmarks.shape == (2, 21, 3) and landmarks.dtype == np.float32
+    assert mask.tolist() == [False, True]
+    assert np.allclose(landmarks[1], right) and not landmarks[0].any()
+
+    _, left_hand, right_hand = extract_landmarks(fake_results({"Right": right}))
+    assert np.allclose(right_hand, right.reshape(-1)) and not left_hand.any()
+
+
+def test_batch_extraction_writes_into_caller_buffer():
+    rng = np.random.default_rng(1)
+    frames = [{"Left": rng.random((21, 3)), "Right": rng.random((21, 3))}, {}, {"Left": rng.random((21, 3))}]
+    out = np.full((3, 2, 21, 3), 7.0, dtype=np.float32)
+
+    landmarks, mask = extract_landmarks_batch([fake_results(f) for f in frames], out=out)
+    assert landmarks is out
+    assert mask.tolist() == [[True, True], [False, False], [True, False]]
+    assert np.allclose(out[0, 1], frames[0]["Right"]) and not out[1].any() and not out[2, 1].any()
+
+
+def test_tasks_api_handedness_lists_are_supported():
+    rng = np.random.default_rng(2)
+    left = rng.random((21, 3))
+    results = fake_results({"Left": left})
+    results.handedness = [[category] for category in results.handedness]
+    landmarks, mask = extract_hands(results)
+    assert mask.tolist() == [True, False] and np.allclose(landmarks[0], left)
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils import mediapipe_utils
+from utils.mediapipe_utils import LandmarkerService, MockResults, get_landmarker, mediapipe_detection
+
+
+def test_missing_model_falls_back_to_empty_results(tmp_path):
+    service = LandmarkerService(model_path=str(tmp_path / "missing.task"))
+    assert not service.available
+    results = service.detect(np.zeros((4, 4, 3), dtype=np.uint8))
+    assert isinstance(results, MockResults) and results.hand_landmarks == []
+
+
+def test_detection_reuses_one_landmarker(monkeypatch):
+    monkeypatch.setattr(mediapipe_utils, "_landmarker", None)
+    created = []
+    monkeypatch.setattr(mediapipe_utils, "LandmarkerService",
+                        lambda: created.append(LandmarkerService(model_path="")) or created[-1])
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    for _ in range(3):
+        processed, _ = mediapipe_detection(image)
+        assert processed is image
+    assert len(created) == 1 and get_landmarker() is created[0]
+
+
+def test_image_mode_detects_each_frame_on_its_own(tmp_path):
+    calls = []
+    service = LandmarkerService(model_path=str(tmp_path / "missing.task"), running_mode="image")
+    service._mp = SimpleNamespace(Image=lambda image_format, data: data, ImageFormat=SimpleNamespace(SRGB=None))
+    service.landmarker = SimpleNamespace(
+        detect=lambda image: calls.append("detect") or "result",
+        detect_for_video=lambda image, timestamp: calls.append("detect_for_video"),
+    )
+    image = np.zeros((4, 4, 3), dtype=np.uint8)
+    assert service.detect(image) == "result" and service.detect(image) == "result"
+    assert calls == ["detect", "detect"]
@@ -0,0 +1,40 @@
+import subprocess
+import sys
+import urllib.request
+
+from utils.metrics import Metrics
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics(enabled=False)
+    double = registry.timed("double")(lambda x: 2 * x)
+    assert double(3) == 6
+    with registry.timer("block"):
+        registry.count("calls")
+    assert registry.snapshot() == {"counters": {}, "timers": {}}
+
+
+def test_prometheus_export_of_counters_and_timers():
+    registry = Metrics(enabled=True)
+    registry.count("templates_dtw", 4)
+    registry.observe("recognition", 0.003)
+    registry.observe("recognition", 0.2)
+
+    text = registry.prometheus_text()
+    assert "sign_templates_dtw_total 4" in text
+    assert 'sign_stage_seconds_bucket{stage="recognition",le="0.005"} 1' in text
+    assert 'sign_stage_seconds_bucket{stage="recognition",le="+Inf"} 2' in text
+    assert registry.snapshot()["timers"]["recognition"]["max"] == 0.2
+
+    server = registry.serve(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        assert urllib.request.urlopen(url).read().decode() == registry.prometheus_text()
+    finally:
+        server.shutdown()
+
+
+def test_importing_metrics_does_not_load_the_http_server():
+    probe = "import sys, utils.metrics; print('http.server' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
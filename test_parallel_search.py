@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from models.parallel_search import ParallelSearch
+from models.template_library import TemplateLibrary
+from utils.features import FeaturePipeline
+from utils.sign_storage import SignStore
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_sharded_search_finds_the_serial_best(tmp_path, backend):
+    rng = np.random.default_rng(0)
+    store = SignStore(str(tmp_path))
+    for i in range(23):
+        store.save_frames(f"sign_{i % 7}", rng.random((30, 2, 63)).astype(np.float32))
+    library = TemplateLibrary.from_store(store, FeaturePipeline())
+    query = rng.random((30, 2, 63)).astype(np.float32)
+
+    serial, _ = library.search(query, [True, True], window=5)
+    parallel = ParallelSearch(library, store, workers=2, shard_size=5, backend=backend)
+    try:
+        distances, stats = parallel.search(query, [True, True], window=5)
+        assert stats["templates"] == 23
+        assert distances.min() == pytest.approx(serial.min())
+        assert np.argmin(distances) == np.argmin(serial)
+
+        # Templates saved later are searched after a refresh
+        entry = store.save_frames("copy", query)
+        library.add("copy", store.template_frames(entry), entry["hand_mask"])
+        parallel.refresh()
+        distances, _ = parallel.search(query, [True, True], window=5)
+        assert len(distances) == 24 and np.argmin(distances) == 23
+    finally:
+        parallel.close()
@@ -0,0 +1,53 @@
+import asyncio
+import contextlib
+import io
+
+import numpy as np
+
+from benchmarks.synthetic import random_walk_frames, synthetic_store
+from recognition_server import RecognitionClient, RecognitionServer
+from sign_recorder import SignRecorder
+
+
+def test_concurrent_clients_get_their_own_predictions(tmp_path):
+    store = synthetic_store(str(tmp_path), 12, 20, seed=5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = SignRecorder(signs_dir=str(tmp_path), seq_len=20, dtw_threshold=float('inf'))
+    templates = store.templates[::3]
+
+    async def run():
+        server = RecognitionServer(recorder, port=0)
+        await server.start()
+        try:
+            clients = [await RecognitionClient.connect(port=server.port) for _ in templates]
+            assert len({client.session_id for client in clients}) == len(clients)
+
+            # Every client performs a different sign at the same time
+            predictions = await asyncio.gather(*[
+                client.recognize_gesture(store.template_frames(template))
+                for client, template in zip(clients, templates)
+            ])
+            for prediction, template in zip(predictions, templates):
+                assert prediction["event"] == "prediction"
+                assert prediction["candidates"][0]["sign"] == template["name"]
+
+            # A sign recorded by one client is recognized for another
+            new_sign = random_walk_frames(np.random.default_rng(6), 20)
+            await clients[0].send("record", sign="wave")
+            await clients[0].receive()
+            for hands in new_sign:
+                await clients[0].send_frame(hands)
+            assert await clients[0].receive() == {"event": "saved", "sign": "wave"}
+            prediction = await clients[1].recognize_gesture(new_sign)
+            assert prediction["candidates"][0]["sign"] == "wave"
+
+            await clients[1].send("jump")
+            assert (await clients[1].receive())["event"] == "error"
+
+            for client in clients:
+                await client.close()
+        finally:
+            await server.close()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(run())
@@ -0,0 +1,101 @@
+import contextlib
+import io
+
+import numpy as np
+
+from benchmarks.synthetic import random_walk_frames, synthetic_store
+from sign_recorder import SignRecorder
+from utils.features import FeaturePipeline
+from utils.result_cache import ResultCache, hamming, simhash
+from utils.sign_storage import SignStore
+
+
+def test_similar_gestures_get_close_fingerprints():
+    rng = np.random.default_rng(0)
+    pipeline = FeaturePipeline()
+    gesture = random_walk_frames(rng, 50)
+    repeat = gesture + rng.normal(scale=0.002, size=gesture.shape).astype(np.float32)
+    other = random_walk_frames(rng, 50)
+
+    fingerprint = simhash(pipeline.transform(gesture), step=0.25)
+    assert fingerprint == simhash(pipeline.transform(gesture), step=0.25)
+    near = hamming(np.array([simhash(pipeline.transform(repeat), step=0.25)], dtype=np.uint64), fingerprint)[0]
+    far = hamming(np.array([simhash(pipeline.transform(other), step=0.25)], dtype=np.uint64), fingerprint)[0]
+    assert near <= 12 < far
+
+
+def test_cache_evicts_least_recently_used_and_expires():
+    now = [0.0]
+    cache = ResultCache(max_entries=2, ttl=10, max_distance=0, clock=lambda: now[0])
+    a, b, c = [(fingerprint, ((True, True), 3)) for fingerprint in (1, 2, 4)]
+    cache.put(a, "a")
+    cache.put(b, "b")
+    assert cache.get(a) == "a"
+    cache.put(c, "c")
+    assert cache.get(b) is None and cache.get(a) == "a" and cache.get(c) == "c"
+    assert cache.evictions == 1
+
+    # A different context never matches
+    assert cache.get((1, ((True, False), 3))) is None
+
+    now[0] = 11
+    assert cache.get(a) is None
+    assert cache.expirations == 1
+    assert cache.stats()["hits"] == 3 and cache.hit_rate == 3 / 6
+
+
+def test_recorder_serves_repeats_from_cache_until_a_sign_is_saved(tmp_path):
+    store = synthetic_store(str(tmp_path), 9, 20, seed=9)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = SignRecorder(signs_dir=str(tmp_path), seq_len=20, dtw_threshold=float('inf'), cache_size=8)
+    gesture = store.template_frames(store.templates[0])
+
+    first = recorder.recognize(gesture)
+    assert recorder.recognize(gesture.copy()) is first
+    assert recorder.recognize_many([gesture])[0] is first
+    assert recorder.result_cache.hits == 2
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder.save_reference_sign("copy", frames=gesture)
+    assert len(recorder.result_cache) == 0
+    assert recorder.recognize(gesture)["candidates"][0]["sign"] in ("copy", first["sign"])
+
+
+def test_one_handed_fingerprints_ignore_the_absent_hand_and_wrist_origin():
+    rng = np.random.default_rng(1)
+    pipeline = FeaturePipeline()
+    fingerprints = np.array([simhash(pipeline.transform(random_walk_frames(rng, 50, (True, False))), step=0.25)
+                             for _ in range(30)], dtype=np.uint64)
+    distances = np.concatenate([hamming(fingerprints[i + 1:], int(fingerprints[i])) for i in range(29)])
+    assert distances.min() > 12 and np.median(distances) > 25
+
+
+def test_cached_predictions_match_exact_recognition(tmp_path):
+    rng = np.random.default_rng(2)
+    store = SignStore(str(tmp_path))
+    for i in range(30):
+        store.save_frames(f"sign_{i}", random_walk_frames(rng, 30, (True, False)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        exact = SignRecorder(signs_dir=str(tmp_path), seq_len=30, dtw_threshold=float('inf'))
+        cached = SignRecorder(signs_dir=str(tmp_path), seq_len=30, dtw_threshold=float('inf'), cache_size=256)
+    exact.wait_for_calibration()
+    cached.wait_for_calibration()
+    queries = []
+    for template in store.templates:
+        frames = np.array(store.template_frames(template))
+        for _ in range(3):
+            repeat = frames.copy()
+            repeat[:, 0] += rng.normal(scale=0.003, size=repeat[:, 0].shape)
+            queries.append(repeat)
+    for query in queries[::-1] + queries:
+        assert cached.recognize(query)["sign"] == exact.recognize(query)["sign"]
+    assert cached.result_cache.hits == len(queries)
+
+
+def test_empty_query_is_not_fingerprinted(tmp_path):
+    synthetic_store(str(tmp_path), 6, 20, seed=3)
+    with contextlib.redirect_stdout(io.StringIO()):
+        recorder = SignRecorder(signs_dir=str(tmp_path), seq_len=20, cache_size=8)
+    for match in [recorder.recognize([]), recorder.recognize_many([np.zeros((0, 2, 63), dtype=np.float32)])[0]]:
+        assert match["candidates"] == [] and not match["accepted"]
+    assert len(recorder.result_cache) == 0
@@ -0,0 +1,121 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from models.template_library import ENVELOPE_CACHE_SIZE, TemplateLibrary
+from utils.sign_storage import SignStore
+
+
+def random_sign(rng, seq_len=50, right_hand=True):
+    left = list(rng.random((seq_len, 63)))
+    right = list(rng.random((seq_len, 63))) if right_hand else list(np.zeros((seq_len, 63)))
+    return left, right
+
+
+def test_saved_signs_round_trip_through_memmap(tmp_path):
+    rng = np.random.default_rng(0)
+    store = SignStore(str(tmp_path))
+    hello = random_sign(rng)
+    thanks = random_sign(rng, right_hand=False)
+    store.save("hello", *hello)
+    store.save("thanks", *thanks)
+
+    reloaded = SignStore(str(tmp_path))
+    assert isinstance(reloaded.frames, np.memmap)
+    assert reloaded.sign_names() == ["hello", "thanks"]
+    left, right = reloaded.sequences()["hello"][0]
+    assert np.allclose(left, hello[0]) and np.allclose(right, hello[1])
+    assert reloaded.templates[1]["hand_mask"] == [True, False]
+
+
+def test_library_is_a_view_of_the_frame_block(tmp_path):
+    rng = np.random.default_rng(1)
+    store = SignStore(str(tmp_path))
+    for i in range(5):
+        store.save(f"sign_{i}", *random_sign(rng))
+
+    library = TemplateLibrary.from_store(store)
+    assert library.frames.shape == (5, 50, 2, 63)
+    assert np.shares_memory(library.frames, store.frames)
+
+
+def test_legacy_pickles_are_migrated(tmp_path):
+    rng = np.random.default_rng(2)
+    left, right = random_sign(rng, seq_len=10)
+    with open(tmp_path / "wave.pkl", "wb") as f:
+        pickle.dump({'left_hand': left, 'right_hand': right}, f)
+
+    store = SignStore(str(tmp_path))
+    assert store.sign_names() == ["wave"]
+    assert not (tmp_path / "wave.pkl").exists()
+    assert np.allclose(store.sequences()["wave"][0][0], left)
+
+
+def _open_store(directory):
+    return len(SignStore(directory).templates)
+
+
+def test_processes_opening_a_legacy_store_at_once_migrate_it_once(tmp_path):
+    for i in range(40):
+        with open(tmp_path / f"sign_{i:02d}.pkl", "wb") as f:
+            pickle.dump({'left_hand': [np.full(63, i, dtype=np.float32)] * (5 + i % 3), 'right_hand': []}, f)
+
+    with ProcessPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(_open_store, [str(tmp_path)] * 16)) == [40] * 16
+
+    store = SignStore(str(tmp_path))
+    assert len(store.templates) == 40 and store.dead_frames() == 0
+    for template in store.templates:
+        assert np.all(store.template_frames(template)[:, 0] == int(template["name"][-2:]))
+
+
+def test_templates_accumulate_and_compact(tmp_path):
+    rng = np.random.default_rng(3)
+    store = SignStore(str(tmp_path))
+    store.save("hello", *random_sign(rng))
+    store.save("bye", *random_sign(rng))
+    store.save("hello", *random_sign(rng))
+    assert [len(v) for v in SignStore(str(tmp_path)).sequences().values()] == [2, 1]
+
+    store.delete("bye")
+    store.compact()
+    reloaded = SignStore(str(tmp_path))
+    assert reloaded.sign_names() == ["hello"]
+    assert reloaded.dead_frames() == 0 and len(reloaded.frames) == 100
+
+
+def test_library_add_matches_rebuild(tmp_path):
+    rng = np.random.default_rng(4)
+    store = SignStore(str(tmp_path))
+    for i in range(3):
+        store.save(f"sign_{i}", *random_sign(rng))
+    library = TemplateLibrary.from_store(store)
+    library.envelope(50, 5)
+
+    for name in ["sign_1", "sign_3"]:
+        entry = store.save(name, *random_sign(rng, seq_len=60))
+        library.add(name, store.template_frames(entry), entry["hand_mask"])
+
+    rebuilt = TemplateLibrary.from_store(store)
+    query = rng.random((50, 2, 63))
+    assert library.names == rebuilt.names
+    assert np.allclose(library.score(query, [True, True], 5), rebuilt.score(query, [True, True], 5))
+    assert np.allclose(library.envelope(50, 5)[0], rebuilt.envelope(50, 5)[0])
+
+
+def test_envelope_cache_is_bounded_and_kept_in_step_with_add(tmp_path):
+    rng = np.random.default_rng(5)
+    store = SignStore(str(tmp_path))
+    for i in range(3):
+        store.save(f"sign_{i}", *random_sign(rng))
+    library = TemplateLibrary.from_store(store)
+    library.paa_envelope(50, 5, 8)
+    for n in range(20, 20 + ENVELOPE_CACHE_SIZE):
+        library.envelope(n, 5)
+    assert len(library._envelopes) == ENVELOPE_CACHE_SIZE and (50, 5) not in library._envelopes
+
+    entry = store.save("sign_3", *random_sign(rng))
+    library.add("sign_3", store.template_frames(entry), entry["hand_mask"])
+    rebuilt = TemplateLibrary.from_store(store)
+    assert np.allclose(library.paa_envelope(50, 5, 8)[0], rebuilt.paa_envelope(50, 5, 8)[0])
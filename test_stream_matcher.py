@@ -0,0 +1,43 @@
+import numpy as np
+
+from models.stream_matcher import StreamMatcher
+from models.template_library import TemplateLibrary
+
+
+def random_walk(rng, length=30):
+    return rng.random(63) + rng.normal(0, 0.05, (length, 63)).cumsum(axis=0)
+
+
+def test_detects_embedded_signs_with_frame_indices():
+    rng = np.random.default_rng(0)
+    sequences = {f"sign_{i}": [(random_walk(rng), np.zeros((30, 63)))] for i in range(10)}
+    matcher = StreamMatcher(TemplateLibrary.from_sequences(sequences), threshold=0.3)
+
+    noise = lambda n: rng.random((n, 63)) * 3
+    hello = sequences["sign_4"][0][0] + rng.normal(0, 0.005, (30, 63))
+    fast = sequences["sign_7"][0][0][::2]
+    stream = np.concatenate([noise(40), hello, noise(20), fast, noise(20)])
+
+    detections = []
+    for frame in stream:
+        detections += matcher.update(np.stack([frame, np.zeros(63)]))
+
+    assert [(d["sign"], d["start"], d["end"]) for d in detections] == [
+        ("sign_4", 40, 69), ("sign_7", 90, 104)
+    ]
+    assert matcher.recent_frames(100, 104).shape == (5, 2, 63)
+
+
+def test_missing_hand_in_stream_is_not_scored_against_zeros():
+    rng = np.random.default_rng(1)
+    sequences = {f"sign_{i}": [(random_walk(rng), random_walk(rng))] for i in range(5)}
+    matcher = StreamMatcher(TemplateLibrary.from_sequences(sequences), threshold=0.3)
+
+    # Only the left hand of sign_2 is tracked; the right hand reads as zeros
+    left = sequences["sign_2"][0][0] + rng.normal(0, 0.005, (30, 63))
+    stream = np.concatenate([left, np.zeros((5, 63))])
+    detections = []
+    for frame in stream:
+        detections += matcher.update(np.stack([frame, np.zeros(63)]))
+
+    assert [(d["sign"], d["start"], d["end"]) for d in detections] == [("sign_2", 0, 29)]
@@ -0,0 +1,150 @@
+import sys
+import threading
+import time
+import wave
+
+from utils import voice_output
+from utils.voice_output import VoiceOutput
+
+
+class FakeEngine:
+    """Speaks one word per 20 ms and honours stop() from its callbacks."""
+
+    def __init__(self):
+        self.spoken, self.pending, self.pending_files, self.callbacks = [], [], [], {}
+        self.properties = {}
+        self.release = threading.Event()
+        self.release.set()
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def getProperty(self, name):
+        return self.properties[name]
+
+    def connect(self, topic, callback):
+        self.callbacks[topic] = callback
+
+    def say(self, text):
+        self.pending.append(text)
+
+    def runAndWait(self):
+        self.release.wait()
+        for text in self.pending:
+            self.stopped = False
+            for i, word in enumerate(text.split()):
+                self.callbacks["started-word"](text, i, len(word))
+                if self.stopped:
+                    break
+                time.sleep(0.02)
+            self.spoken.append(text if not self.stopped else text + " <cut>")
+        self.pending = []
+
+    def stop(self):
+        self.stopped = True
+
+    def save_to_file(self, text, path):
+        self.pending_files.append(path)
+
+
+def voice(policy, engine, **kwargs):
+    return VoiceOutput(policy=policy, cache_dir=None, engine_factory=lambda: engine, **kwargs)
+
+
+def test_speak_sign_returns_without_waiting_for_speech():
+    engine = FakeEngine()
+    engine.release.clear()
+    output = voice("coalesce", engine)
+    start = time.perf_counter()
+    for sign in ["hello", "thanks", "hello", "thanks"]:
+        output.speak_sign(sign)
+    assert time.perf_counter() - start < 0.01
+    engine.release.set()
+    assert output.wait(timeout=2.0)
+    output.cleanup()
+    assert engine.spoken == ["hello", "thanks"]
+
+
+def test_drop_policy_discards_new_utterances_when_full():
+    engine = FakeEngine()
+    engine.release.clear()
+    output = voice("drop", engine, max_queue=2)
+    for sign in ["a", "b", "c", "d", "e"]:
+        output.speak_sign(sign)
+        time.sleep(0.01)
+    engine.release.set()
+    output.wait(timeout=2.0)
+    output.cleanup()
+    assert engine.spoken == ["a", "b", "c"] and output.dropped == 2
+
+
+def test_interrupt_policy_cuts_off_the_current_utterance():
+    engine = FakeEngine()
+    output = voice("interrupt", engine)
+    output.speak_sign("one two three four five six seven eight")
+    time.sleep(0.05)
+    output.speak_sign("stop")
+    assert output.wait(timeout=2.0)
+    output.cleanup()
+    assert engine.spoken[0].endswith("<cut>") and engine.spoken[1] == "stop"
+
+
+def test_dropped_utterance_is_not_remembered_as_spoken():
+    engine = FakeEngine()
+    engine.release.clear()
+    output = voice("drop", engine, max_queue=1)
+    output.speak_sign("a")
+    time.sleep(0.05)
+    output.speak_sign("b")
+    output.speak_sign("c")
+    assert output.last_spoken == "b" and output.dropped == 1
+    engine.release.set()
+    assert output.wait(timeout=2.0)
+    output.speak_sign("c")
+    assert output.wait(timeout=2.0)
+    output.cleanup()
+    assert engine.spoken == ["a", "b", "c"]
+
+
+def test_sign_missing_from_the_cache_is_rendered_and_played_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.setattr(voice_output, "winsound", None)
+    engine = FakeEngine()
+    real_run = engine.runAndWait
+
+    def run_and_write():
+        for path in engine.pending_files:
+            with wave.open(path, "wb") as f:
+                f.setnchannels(1)
+                f.setsampwidth(2)
+                f.setframerate(8000)
+                f.writeframes(b"\0\0" * 80)
+        engine.pending_files = []
+        real_run()
+
+    engine.runAndWait = run_and_write
+    played = tmp_path / "played.txt"
+    player = [sys.executable, "-c", f"import sys; open({str(played)!r}, 'a').write(sys.argv[1] + '\\n')"]
+    output = VoiceOutput(policy="coalesce", cache_dir=str(tmp_path / "cache"), engine_factory=lambda: engine,
+                         player=player)
+    output.speak_sign("hello")
+    assert output.wait(timeout=5.0)
+    output.reset()
+    output.speak_sign("hello")
+    assert output.wait(timeout=5.0)
+    output.cleanup()
+    cached = list((tmp_path / "cache").iterdir())
+    assert len(cached) == 1 and cached[0].name.startswith("hello-") and cached[0].suffix == ".wav"
+    assert played.read_text().split() == [str(cached[0])] * 2
+    assert engine.spoken == []
+
+
+def test_engine_that_fails_to_start_disables_speech_instead_of_queueing_forever():
+    def broken_engine():
+        raise RuntimeError("no voices installed")
+
+    output = VoiceOutput(policy="coalesce", cache_dir=None, engine_factory=broken_engine)
+    output._worker.join(timeout=2.0)
+    assert not output.is_available and "no voices" in str(output.engine_error)
+    output.speak_sign("hello")
+    assert output.wait(timeout=1.0)
+    output.cleanup()
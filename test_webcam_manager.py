@@ -0,0 +1,26 @@
+import numpy as np
+
+from webcam_manager import HEIGHT, WebcamManager
+
+
+def test_overlay_mirrors_and_scales_to_fixed_height():
+    manager = WebcamManager()
+    image = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    image[:, :960] = 200  # left half bright
+
+    frame = manager.add_text_overlay(image, sign_detected="", is_recording=False)
+    assert frame.shape == (HEIGHT, 1066, 3)
+    assert frame[300, 1000, 0] == 200 and frame[300, 60, 0] == 0
+    assert image[0, 0, 0] == 200  # input untouched
+
+
+def test_label_sprites_are_cached_and_blended():
+    manager = WebcamManager()
+    frame = np.zeros((HEIGHT, 800, 3), dtype=np.uint8)
+    sprite = manager.text_sprite("MODE: RECOGNIZE")
+    assert manager.text_sprite("MODE: RECOGNIZE") is sprite
+
+    manager.blend_text(frame, "MODE: RECOGNIZE", (10, 10), (25, 200, 25))
+    region = frame[10:10 + sprite.shape[0], 10:10 + sprite.shape[1]]
+    assert region[sprite == 255].tolist() == [[25, 200, 25]] * int((sprite == 255).sum())
+    assert not frame[:10].any()
@@ -0,0 +1,92 @@
+import collections
+import threading
+import time
+from concurrent.futures import Future
+
+from utils.metrics import metrics
+
+
+class MicroBatchScheduler:
+    def __init__(self, process_batch, max_batch=16, max_wait=0.005):
+        """
+        Collect requests from many callers and process them in batches.
+
+        A worker thread waits for the first request, then keeps collecting
+        until max_batch requests are pending or max_wait seconds have passed
+        since the first one arrived, and hands them all to process_batch at
+        once. max_wait is therefore the most latency batching adds to a
+        request; an idle scheduler processes a lone request after max_wait.
+
+        :param process_batch: Callable mapping a list of requests to a list of
+            results in the same order
+        :param max_batch: Largest batch handed to process_batch
+        :param max_wait: Seconds to wait for a batch to fill up
+        """
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+
+        self._pending = collections.deque()
+        self._closed = False
+        self._ready = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, request):
+        """
+        Queue one request; never blocks.
+
+        :return: concurrent.futures.Future of its result (asyncio.wrap_future
+            turns it into an awaitable)
+        """
+        future = Future()
+        with self._ready:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            self._pending.append((request, future))
+            self._ready.notify()
+        return future
+
+    def close(self):
+        """Process what is pending, then stop the worker."""
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        self._worker.join()
+
+    def _next_batch(self):
+        """Wait for a batch to fill up or time out; an empty list once closed."""
+        with self._ready:
+            self._ready.wait_for(lambda: self._pending or self._closed)
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+            count = min(len(self._pending), self.max_batch)
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        """Worker loop: process batches until closed and drained."""
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            requests = [request for request, _ in batch]
+            futures = [future for _, future in batch]
+            self.batches += 1
+            self.requests += len(batch)
+            metrics.count("batches")
+            metrics.count("batched_requests", len(batch))
+            try:
+                with metrics.timer("batch"):
+                    results = self.process_batch(requests)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
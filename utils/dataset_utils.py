@@ -1,20 +1,151 @@
-import pandas as pd
+import os
 
-def load_dataset():
+import numpy as np
+
+from utils.landmark_utils import extract_hands
+
+DATASET_DIR = "data/dataset"
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+LANDMARK_EXTENSIONS = (".npy",)
+
+# Assumed frame rate of landmark files, for real-time factors
+DEFAULT_FPS = 30.0
+
+
+def list_dataset(directory=DATASET_DIR):
+    """
+    Find the videos and landmark files of a dataset, in sorted order.
+
+    Files may be grouped in one folder per sign (data/dataset/hello/take1.mp4);
+    the folder name is then used as the label.
+
+    :param directory: Root directory to search recursively
+    :return: List of dicts with keys name, path, label (None at the top level) and kind ("video" or "landmarks")
+    """
+    entries = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            name, extension = os.path.splitext(filename)
+            extension = extension.lower()
+            if extension not in VIDEO_EXTENSIONS + LANDMARK_EXTENSIONS:
+                continue
+            relative = os.path.relpath(root, directory)
+            entries.append({
+                "name": name,
+                "path": os.path.join(root, filename),
+                "label": None if relative == "." else relative.split(os.sep)[0],
+                "kind": "video" if extension in VIDEO_EXTENSIONS else "landmarks",
+            })
+    return entries
+
+
+def iter_video_frames(path, landmarker=None):
+    """
+    Stream the hand landmarks of a video one frame at a time.
+
+    A VIDEO-mode landmarker tracks hands from one frame to the next, so by
+    default every file gets a landmarker of its own, fed timestamps from the
+    file's frame rate starting at 0.
+
+    :param path: Video file
+    :param landmarker: VIDEO-mode LandmarkerService that has seen no other
+        file (default: a new one, closed when the video ends)
+    :return: Generator of float32 arrays of shape (2, 63), safe to keep
+    """
+    # Imported on use: only video input needs OpenCV and MediaPipe
+    import cv2
+    from utils.mediapipe_utils import LandmarkerService
+
+    owned = landmarker is None
+    if owned:
+        landmarker = LandmarkerService(running_mode="video")
+    hands = np.zeros((2, 21, 3), dtype=np.float32)
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    fps = fps if fps and fps > 0 else DEFAULT_FPS
+    try:
+        index = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            results = landmarker.detect(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), timestamp_ms=int(index * 1000 / fps))
+            extract_hands(results, out=hands)
+            index += 1
+            # A copy: hands is overwritten by the next frame, and callers may keep what they get
+            yield hands.reshape(2, 63).copy()
+    finally:
+        capture.release()
+        if owned:
+            landmarker.close()
+
+
+def video_fps(path):
+    """Frame rate stored in a video file, DEFAULT_FPS when unknown."""
+    import cv2
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    capture.release()
+    return fps if fps and fps > 0 else DEFAULT_FPS
+
+
+def load_landmarks(entry, landmarker=None):
+    """
+    Landmarks of one dataset file as a (frames, 2, 63) float32 array.
+
+    Landmark files are memory-mapped and may hold (frames, 2, 63),
+    (frames, 126) or (frames, 2, 21, 3) arrays. Videos are decoded and run
+    through the landmarker frame by frame into a growing buffer, so no
+    decoded image is kept.
+
+    :param entry: Item of list_dataset
+    :param landmarker: LandmarkerService for a video, see iter_video_frames
+    """
+    if entry["kind"] == "landmarks":
+        frames = np.load(entry["path"], mmap_mode="r")
+        return np.asarray(frames, dtype=np.float32).reshape(len(frames), 2, 63)
+
+    frames = np.zeros((64, 2, 63), dtype=np.float32)
+    count = 0
+    for hands in iter_video_frames(entry["path"], landmarker):
+        if count == len(frames):
+            frames = np.concatenate([frames, np.zeros_like(frames)])
+        frames[count] = hands
+        count += 1
+    return frames[:count]
+
+
+def iter_dataset(directory=DATASET_DIR):
+    """
+    Stream a dataset: the landmarks of one file at a time, each video through a landmarker of its own.
+
+    :return: Generator of (entry, frames) pairs, see list_dataset and load_landmarks
     """
-    Load dataset (placeholder for now).
-    
-    :return: Empty DataFrame or loaded data
+    for entry in list_dataset(directory):
+        yield entry, load_landmarks(entry)
+
+
+def load_dataset(directory=DATASET_DIR):
     """
-    # Placeholder - in original, this might load from files
-    return pd.DataFrame()
+    Index the dataset's videos and landmark files without loading them.
+
+    :return: DataFrame with columns name, path, label and kind
+    """
+    # pandas is imported on use so recognition never pays for it
+    import pandas as pd
+    return pd.DataFrame(list_dataset(directory), columns=["name", "path", "label", "kind"])
+
 
 def load_reference_signs(videos):
     """
-    Load reference signs from videos (placeholder).
-    
-    :param videos: Video data
-    :return: Reference signs DataFrame
+    Load the landmarks of indexed dataset files.
+
+    :param videos: DataFrame from load_dataset
+    :return: Reference signs DataFrame, videos with an added frames column
     """
-    # Placeholder
-    return pd.DataFrame()
+    import pandas as pd
+    signs = pd.DataFrame(videos, columns=["name", "path", "label", "kind"]).copy()
+    signs["frames"] = [load_landmarks(entry) for entry in signs.to_dict("records")]
+    return signs
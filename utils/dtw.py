@@ -1,16 +1,464 @@
 import numpy as np
-from fastdtw import fastdtw
 
-def dtw_distances(recorded_seq, reference_seqs):
+ENVELOPE_CHUNK = 256
+# Templates per LB_Keogh pass, sized so the temporaries stay in cache
+KEOGH_CHUNK = 32
+
+
+def frame_cost_matrix(x, y):
+    """
+    Compute the frame-to-frame cost matrix between two landmark sequences.
+
+    Sequences may be shaped (frames, dims) or (frames, hands, dims). The cost
+    of a frame pair is the Euclidean distance between the frames, summed over
+    hands when a hand axis is present.
+
+    :param x: Sequence of shape (n, ..., dims)
+    :param y: Sequence of shape (m, ..., dims)
+    :return: Cost matrix of shape (n, m)
+    """
+    x = np.asarray(x, dtype=np.float32)
+    y = np.asarray(y, dtype=np.float32)
+    if x.ndim == 2:
+        x = x[:, None, :]
+    if y.ndim == 2:
+        y = y[:, None, :]
+
+    diff = x[:, None] - y[None, :]
+    cost = np.sqrt(np.einsum("nmhd,nmhd->nmh", diff, diff))
+    return cost.sum(axis=-1)
+
+
+def sakoe_chiba_band(n, m, window=None):
+    """
+    Compute the allowed column range of every row under a Sakoe-Chiba band.
+
+    The band follows the diagonal from (0, 0) to (n - 1, m - 1), so sequences
+    of different lengths are supported. The window is widened when needed so
+    that a warping path always exists.
+
+    :param n: Number of rows (query frames)
+    :param m: Number of columns (reference frames), int or array of lengths
+    :param window: Band half-width in reference frames, None for no constraint
+    :return: Tuple of (lo, hi) integer arrays of shape m.shape + (n,), inclusive
+    """
+    m = np.asarray(m, dtype=np.int64)
+    last = (m - 1)[..., None]
+    if window is None:
+        lo = np.zeros(m.shape + (n,), dtype=np.int64)
+        return lo, np.broadcast_to(last, lo.shape).copy()
+
+    slope = (m - 1) / (n - 1) if n > 1 else np.zeros(m.shape)
+    window = np.maximum(np.maximum(float(window), slope / 2), 0.5)[..., None]
+    center = slope[..., None] * np.arange(n)
+    lo = np.clip(np.ceil(center - window - 1e-9), 0, last).astype(np.int64)
+    hi = np.clip(np.floor(center + window + 1e-9), 0, last).astype(np.int64)
+    return lo, hi
+
+
+def accumulated_cost(cost, window=None, lengths=None, max_dist=None):
+    """
+    Accumulate a cost matrix into a DTW distance.
+
+    Rows are processed one at a time and every row is solved in a single
+    vectorized pass: the horizontal recurrence
+    D[i, j] = c[i, j] + min(M[j], D[i, j - 1]) unrolls to
+    D[i, j] = C[j] + min_k<=j (M[k] - C[k - 1]), where C is the running sum of
+    the row costs, so a cumulative sum and a prefix minimum replace the inner
+    Python loop. Leading batch dimensions are processed together.
+
+    With max_dist set, a batch item is abandoned as soon as the minimum of
+    its current row exceeds the bound: accumulated costs never decrease, so
+    its final distance would exceed the bound too. Abandoned items drop out of
+    the remaining rows, and every item whose distance exceeds the bound
+    returns inf.
+
+    :param cost: Cost matrix of shape (..., n, m)
+    :param window: Sakoe-Chiba band half-width, None for no constraint
+    :param lengths: Valid column count per batch item, for padded references
+    :param max_dist: Upper bound (scalar or per batch item), None to disable
+    :return: DTW distance (float, or array for batched input)
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    batch_shape = cost.shape[:-2]
+    n, m = cost.shape[-2:]
+    cost = cost.reshape((-1, n, m))
+    lengths = np.broadcast_to(m if lengths is None else np.asarray(lengths), batch_shape).reshape(-1)
+    lo, hi = sakoe_chiba_band(n, lengths, window)
+    if max_dist is not None:
+        max_dist = np.broadcast_to(np.asarray(max_dist, dtype=np.float64), batch_shape).reshape(-1)
+    columns = np.arange(m)
+    active = np.arange(len(cost))
+    distances = np.full(len(cost), np.inf)
+
+    # Virtual row above the matrix: a path can only enter at (0, 0)
+    prev = np.full((len(cost), m), np.inf)
+    prev[:, 0] = 0.0
+    diag = prev.copy()
+
+    for i in range(n):
+        outside = (columns < lo[:, i, None]) | (columns > hi[:, i, None])
+        if i > 0:
+            diag[:, 0] = np.inf
+            diag[:, 1:] = prev[:, :-1]
+        step = np.where(outside, np.inf, np.minimum(prev, diag))
+
+        row_cost = cost[active, i] if len(active) < len(cost) else cost[:, i]
+        running = np.cumsum(row_cost, axis=-1)
+        prev = running + np.minimum.accumulate(step - (running - row_cost), axis=-1)
+        prev[outside] = np.inf
+
+        if max_dist is not None:
+            alive = prev.min(axis=-1) <= max_dist
+            if not alive.all():
+                active, prev, diag = active[alive], prev[alive], diag[alive]
+                lo, hi, lengths, max_dist = lo[alive], hi[alive], lengths[alive], max_dist[alive]
+                if len(active) == 0:
+                    break
+
+    final = np.take_along_axis(prev, (lengths - 1)[:, None], axis=-1)[:, 0]
+    if max_dist is not None:
+        final[final > max_dist] = np.inf
+    distances[active] = final
+    return distances.reshape(batch_shape)
+
+
+def batch_frame_cost(query, templates, template_sq_norms=None, hand_weights=None):
+    """
+    Compute the frame cost matrices of one query against a batch of templates.
+
+    Squared distances are expanded as |q|^2 + |t|^2 - 2 q.t so the cross
+    term is a single matrix multiply per hand instead of a broadcast over
+    every frame pair and landmark.
+
+    :param query: Query sequence of shape (n, hands, dims)
+    :param templates: Template tensor of shape (batch, m, hands, dims)
+    :param template_sq_norms: Optional precomputed |t|^2, shape (batch, hands, m)
+    :param hand_weights: Optional (batch, hands) weights, 0 to ignore a hand
+    :return: Cost tensor of shape (batch, n, m)
+    """
+    q = np.asarray(query, dtype=np.float32).transpose(1, 0, 2)
+    t = np.asarray(templates, dtype=np.float32).transpose(0, 2, 3, 1)
+    if template_sq_norms is None:
+        template_sq_norms = np.einsum("bhdm,bhdm->bhm", t, t)
+
+    sq = np.einsum("hnd,hnd->hn", q, q)[None, :, :, None] + template_sq_norms[:, :, None, :]
+    sq -= 2.0 * np.matmul(q[None], t)
+    dist = np.sqrt(np.maximum(sq, 0.0))
+
+    if hand_weights is None:
+        return dist.sum(axis=1)
+    return np.einsum("bhnm,bh->bnm", dist, np.asarray(hand_weights, dtype=np.float32))
+
+
+def batch_dtw(query, templates, lengths=None, hand_weights=None, window=None,
+              template_sq_norms=None, max_dist=None):
+    """
+    Compute DTW distances of one query against a batch of templates at once.
+
+    :param query: Query sequence of shape (n, hands, dims)
+    :param templates: Template tensor of shape (batch, m, hands, dims)
+    :param lengths: Valid frame count per template (default: all m frames)
+    :param hand_weights: Optional (batch, hands) weights, 0 to ignore a hand
+    :param window: Sakoe-Chiba band half-width, None for no constraint
+    :param template_sq_norms: Optional precomputed |t|^2, shape (batch, hands, m)
+    :param max_dist: Early-abandoning upper bound (scalar or per template)
+    :return: Array of distances of shape (batch,); inf where no hand is compared
+        or the template was abandoned
+    """
+    if len(templates) == 0 or len(query) == 0:
+        return np.full(len(templates), np.inf)
+
+    cost = batch_frame_cost(query, templates, template_sq_norms, hand_weights)
+    distances = accumulated_cost(cost, window, lengths, max_dist)
+    if hand_weights is not None:
+        distances[~np.asarray(hand_weights).any(axis=-1)] = np.inf
+    return distances
+
+
+def paired_frame_cost(queries, templates, template_sq_norms=None, hand_weights=None):
+    """
+    Compute the frame cost matrices of many (query, template) pairs at once.
+
+    Like batch_frame_cost, but every pair has its own query, so the queries
+    of several sessions are scored together: the cross terms of all pairs
+    come from one batched matrix multiply.
+
+    :param queries: Query of every pair, shape (pairs, n, hands, dims)
+    :param templates: Template of every pair, shape (pairs, m, hands, dims)
+    :param template_sq_norms: Optional precomputed |t|^2, shape (pairs, hands, m)
+    :param hand_weights: Optional (pairs, hands) weights, 0 to ignore a hand
+    :return: Cost tensor of shape (pairs, n, m)
+    """
+    q = np.asarray(queries, dtype=np.float32).transpose(0, 2, 1, 3)
+    t = np.asarray(templates, dtype=np.float32).transpose(0, 2, 3, 1)
+    if template_sq_norms is None:
+        template_sq_norms = np.einsum("phdm,phdm->phm", t, t)
+
+    sq = np.einsum("phnd,phnd->phn", q, q)[..., None] + template_sq_norms[:, :, None, :]
+    sq -= 2.0 * np.matmul(q, t)
+    dist = np.sqrt(np.maximum(sq, 0.0))
+
+    if hand_weights is None:
+        return dist.sum(axis=1)
+    return np.einsum("phnm,ph->pnm", dist, np.asarray(hand_weights, dtype=np.float32))
+
+
+def paired_dtw(queries, templates, lengths=None, hand_weights=None, window=None,
+               template_sq_norms=None, max_dist=None):
+    """
+    Compute the DTW distance of every (query, template) pair in one pass.
+
+    All pairs share one row loop of accumulated_cost, so a batch of queries
+    costs one pass instead of one per query.
+
+    :param queries: Query of every pair, shape (pairs, n, hands, dims)
+    :param templates: Template of every pair, shape (pairs, m, hands, dims)
+    :param lengths: Valid frame count per template (default: all m frames)
+    :param hand_weights: Optional (pairs, hands) weights, 0 to ignore a hand
+    :param window: Sakoe-Chiba band half-width, None for no constraint
+    :param template_sq_norms: Optional precomputed |t|^2, shape (pairs, hands, m)
+    :param max_dist: Early-abandoning upper bound (scalar or per pair)
+    :return: Array of distances of shape (pairs,)
+    """
+    if len(templates) == 0 or np.shape(queries)[1] == 0:
+        return np.full(len(templates), np.inf)
+
+    cost = paired_frame_cost(queries, templates, template_sq_norms, hand_weights)
+    distances = accumulated_cost(cost, window, lengths, max_dist)
+    if hand_weights is not None:
+        distances[~np.asarray(hand_weights).any(axis=-1)] = np.inf
+    return distances
+
+
+def _hand_distances(a, b):
+    """Euclidean distance per hand between broadcastable (..., hands, dims) arrays."""
+    diff = a - b
+    return np.sqrt(np.einsum("...hd,...hd->...h", diff, diff))
+
+
+def lb_kim(query, templates, lengths=None, hand_weights=None):
+    """
+    LB_Kim lower bound on the DTW distance of a query to every template.
+
+    Every warping path starts at the first and ends at the last frame pair,
+    so the cost of those two cells can never exceed the DTW distance.
+
+    :param query: Query sequence of shape (n, hands, dims)
+    :param templates: Template tensor of shape (batch, m, hands, dims)
+    :param lengths: Valid frame count per template (default: all m frames)
+    :param hand_weights: Optional (batch, hands) weights, 0 to ignore a hand
+    :return: Lower bound per template, shape (batch,)
+    """
+    query = np.asarray(query, dtype=np.float32)
+    templates = np.asarray(templates, dtype=np.float32)
+    if lengths is None:
+        lengths = np.full(len(templates), templates.shape[1])
+    lengths = np.asarray(lengths)
+    last = templates[np.arange(len(templates)), lengths - 1]
+
+    bound = _hand_distances(query[0], templates[:, 0])
+    both_ends = (lengths > 1) | (len(query) > 1)
+    bound += np.where(both_ends[:, None], _hand_distances(query[-1], last), 0.0)
+    if hand_weights is None:
+        return bound.sum(axis=-1)
+    return (bound * hand_weights).sum(axis=-1)
+
+
+def _range_extrema(values, lo, hi):
+    """
+    Minimum and maximum of values[b, lo[b, i]:hi[b, i] + 1] for every row i.
+
+    Uses a sparse table of power-of-two window extrema, so each range is
+    answered by combining two overlapping precomputed windows.
+
+    :param values: Array of shape (batch, m, ...)
+    :param lo: Inclusive range starts, shape (batch, n)
+    :param hi: Inclusive range ends, shape (batch, n)
+    :return: Tuple of (lower, upper) arrays of shape (batch, n, ...)
+    """
+    lows, highs = [values], [values]
+    width = 1
+    while 2 * width <= values.shape[1]:
+        lows.append(np.minimum(lows[-1][:, :-width], lows[-1][:, width:]))
+        highs.append(np.maximum(highs[-1][:, :-width], highs[-1][:, width:]))
+        width *= 2
+
+    span = hi - lo + 1
+    level = np.floor(np.log2(span)).astype(np.int64)
+    rows = np.arange(len(values))[:, None]
+    lower = np.empty(lo.shape + values.shape[2:], dtype=values.dtype)
+    upper = np.empty_like(lower)
+    for k in np.unique(level):
+        sel = level == k
+        start, end = lo[sel], hi[sel] - (1 << k) + 1
+        batch = np.broadcast_to(rows, lo.shape)[sel]
+        lower[sel] = np.minimum(lows[k][batch, start], lows[k][batch, end])
+        upper[sel] = np.maximum(highs[k][batch, start], highs[k][batch, end])
+    return lower, upper
+
+
+def keogh_envelope(templates, n, lengths=None, window=None):
+    """
+    Compute the LB_Keogh envelope of every template for a query of n frames.
+
+    For query frame i the envelope is the per-dimension min/max of the
+    template frames inside the Sakoe-Chiba band of row i. It depends only on
+    the templates, the query length and the window, so it is computed once
+    when the library loads.
+
+    :param templates: Template tensor of shape (batch, m, hands, dims)
+    :param n: Query length in frames
+    :param lengths: Valid frame count per template (default: all m frames)
+    :param window: Sakoe-Chiba band half-width, None for no constraint
+    :return: Tuple of (lower, upper) arrays of shape (batch, n, hands, dims)
+    """
+    templates = np.asarray(templates, dtype=np.float32)
+    if lengths is None:
+        lengths = np.full(len(templates), templates.shape[1])
+    lo, hi = sakoe_chiba_band(n, np.asarray(lengths), window)
+
+    # Bounded chunks keep the sparse table small for large libraries
+    lower = np.empty((len(templates), n) + templates.shape[2:], dtype=np.float32)
+    upper = np.empty_like(lower)
+    for start in range(0, len(templates), ENVELOPE_CHUNK):
+        chunk = slice(start, start + ENVELOPE_CHUNK)
+        lower[chunk], upper[chunk] = _range_extrema(templates[chunk], lo[chunk], hi[chunk])
+    return lower, upper
+
+
+def lb_keogh(query, lower, upper, hand_weights=None):
+    """
+    LB_Keogh lower bound on the DTW distance of a query to every template.
+
+    Every query frame is matched to some template frame inside its band, and
+    that frame lies inside the envelope box, so the distance from the query
+    frame to the box never exceeds the matched frame cost.
+
+    :param query: Query sequence of shape (n, hands, dims)
+    :param lower: Envelope lower bound, shape (batch, n, hands, dims)
+    :param upper: Envelope upper bound, shape (batch, n, hands, dims)
+    :param hand_weights: Optional (batch, hands) weights, 0 to ignore a hand
+    :return: Lower bound per template, shape (batch,)
+    """
+    query = np.asarray(query, dtype=np.float32)[None]
+    bound = np.empty(upper.shape[:1] + upper.shape[2:3], dtype=np.float32)
+
+    # Chunks keep the temporaries in cache; whole envelopes make this memory bound
+    excess = np.empty((min(KEOGH_CHUNK, len(upper)),) + upper.shape[1:], dtype=np.float32)
+    below = np.empty_like(excess)
+    for start in range(0, len(upper), KEOGH_CHUNK):
+        chunk = slice(start, start + KEOGH_CHUNK)
+        size = len(upper[chunk])
+        np.subtract(query, upper[chunk], out=excess[:size])
+        np.subtract(lower[chunk], query, out=below[:size])
+        np.maximum(excess[:size], 0.0, out=excess[:size])
+        np.maximum(below[:size], 0.0, out=below[:size])
+        excess[:size] += below[:size]
+        bound[chunk] = np.sqrt(np.einsum("bnhd,bnhd->bnh", excess[:size], excess[:size])).sum(axis=1)
+    if hand_weights is None:
+        return bound.sum(axis=-1)
+    return (bound * hand_weights).sum(axis=-1)
+
+
+def paa_segments(n, segments):
+    """
+    Split n frames into at most segments contiguous, non-empty, near-equal segments.
+
+    :return: Tuple of (start frame, frame count) arrays, one entry per segment
+    """
+    starts = np.unique(np.arange(segments) * n // segments)
+    return starts, np.diff(np.append(starts, n))
+
+
+def paa(frames, lengths, segments):
+    """
+    Piecewise aggregate approximation: the mean frame of each of segments equal parts.
+
+    :param frames: Tensor of shape (batch, m, hands, dims), zero padded
+    :param lengths: Valid frame count per sequence
+    :param segments: Number of output frames
+    :return: float32 array of shape (batch, segments, hands, dims)
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    running = np.concatenate([np.zeros_like(frames[:, :1]), np.cumsum(frames, axis=1)], axis=1)
+    bounds = np.arange(segments + 1) * lengths[:, None] // segments
+    # Sequences shorter than segments repeat frames instead of leaving segments empty
+    start = np.minimum(bounds[:, :-1], np.maximum(lengths[:, None] - 1, 0))
+    end = np.maximum(bounds[:, 1:], start + 1)
+    rows = np.arange(len(frames))[:, None]
+    sums = running[rows, end] - running[rows, start]
+    return sums / (end - start)[:, :, None, None].astype(np.float32)
+
+
+def paa_envelope(lower, upper, n, segments):
+    """
+    Reduce LB_Keogh envelopes for an n-frame query to a PAA envelope.
+
+    Each segment's box spans the envelope boxes of its frames and is scaled
+    by the segment's frame count, for lb_paa.
+
+    :param lower: Envelope lower bound, shape (batch, n, hands, dims)
+    :param upper: Envelope upper bound, shape (batch, n, hands, dims)
+    :param n: Query length in frames
+    :param segments: Number of PAA segments
+    :return: Tuple of scaled (lower, upper) arrays of shape (batch, segments, hands, dims)
+    """
+    starts, sizes = paa_segments(n, segments)
+    scale = sizes[None, :, None, None].astype(np.float32)
+    return (np.minimum.reduceat(lower, starts, axis=1) * scale,
+            np.maximum.reduceat(upper, starts, axis=1) * scale)
+
+
+def lb_paa(query, lower, upper, hand_weights=None):
+    """
+    LB_PAA lower bound on the DTW distance of a query to every template.
+
+    The distance from a frame to a box is convex in the frame, so the summed
+    distances of a segment's frames to the segment box are at least the
+    segment's frame count times the distance of their mean. Every frame's
+    own envelope box lies inside the segment box, so the bound never exceeds
+    LB_Keogh: pruning with it leaves search results unchanged. It costs
+    segments / n of LB_Keogh.
+
+    :param query: Query sequence of shape (n, hands, dims)
+    :param lower: Scaled PAA envelope lower bound from paa_envelope
+    :param upper: Scaled PAA envelope upper bound from paa_envelope
+    :param hand_weights: Optional (batch, hands) weights, 0 to ignore a hand
+    :return: Lower bound per template, shape (batch,)
+    """
+    query = np.asarray(query, dtype=np.float32)
+    starts, _ = paa_segments(len(query), lower.shape[1])
+    # Segment sums against count-scaled boxes equal count times the mean's distance
+    return lb_keogh(np.add.reduceat(query, starts, axis=0), lower, upper, hand_weights)
+
+
+def dtw(x, y, window=None, max_dist=None):
+    """
+    Compute the DTW distance between two landmark sequences.
+
+    :param x: Sequence of shape (n, dims) or (n, hands, dims)
+    :param y: Sequence of shape (m, dims) or (m, hands, dims)
+    :param window: Sakoe-Chiba band half-width, None for no constraint
+    :param max_dist: Early-abandoning upper bound, None to disable
+    :return: DTW distance, inf if it exceeds max_dist
+    """
+    if len(x) == 0 or len(y) == 0:
+        return float('inf')
+    return float(accumulated_cost(frame_cost_matrix(x, y), window, max_dist=max_dist))
+
+
+def dtw_distances(recorded_seq, reference_seqs, window=None):
     """
     Compute DTW distances between recorded sequence and reference sequences.
-    
+
     :param recorded_seq: Recorded sequence
     :param reference_seqs: List of reference sequences
+    :param window: Sakoe-Chiba band half-width, None for no constraint
     :return: List of distances
     """
     distances = []
     for ref_seq in reference_seqs:
-        distance, _ = fastdtw(recorded_seq, ref_seq)
-        distances.append(distance)
+        distances.append(dtw(recorded_seq, ref_seq, window))
     return distances
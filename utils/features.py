@@ -0,0 +1,127 @@
+import hashlib
+
+import numpy as np
+
+NUM_LANDMARKS = 21
+WRIST = 0
+MIDDLE_MCP = 9
+
+# Landmark chains from the wrist to each fingertip
+FINGERS = np.array([
+    [0, 1, 2, 3, 4],
+    [0, 5, 6, 7, 8],
+    [0, 9, 10, 11, 12],
+    [0, 13, 14, 15, 16],
+    [0, 17, 18, 19, 20],
+])
+
+# Normalization used by SignRecorder unless told otherwise
+DEFAULT_STEPS = ("wrist_relative", "palm_scale")
+
+EPS = 1e-6
+
+
+def _present(points):
+    """Frames in which a hand was detected, shape (frames, hands, 1, 1)."""
+    return np.any(points != 0, axis=(2, 3), keepdims=True)
+
+
+def wrist_relative(points):
+    """Translate every hand so its wrist is at the origin."""
+    return np.where(_present(points), points - points[:, :, WRIST:WRIST + 1], 0.0)
+
+
+def palm_scale(points):
+    """Scale every hand so the wrist to middle-finger knuckle distance is 1."""
+    palm = np.linalg.norm(points[:, :, MIDDLE_MCP] - points[:, :, WRIST], axis=-1)
+    return points / np.maximum(palm, EPS)[:, :, None, None]
+
+
+def rotation_align(points):
+    """Rotate every hand in the image plane so the palm points along +y."""
+    palm = points[:, :, MIDDLE_MCP] - points[:, :, WRIST]
+    angle = np.arctan2(palm[..., 0], palm[..., 1])
+    cos, sin = np.cos(angle)[..., None], np.sin(angle)[..., None]
+    x, y = points[..., 0], points[..., 1]
+    return np.stack([cos * x - sin * y, sin * x + cos * y, points[..., 2]], axis=-1)
+
+
+def velocity(points):
+    """Frame-to-frame landmark displacement, zero on the first frame and where a hand is missing."""
+    delta = np.zeros_like(points)
+    delta[1:] = points[1:] - points[:-1]
+    present = _present(points)
+    delta[1:] *= present[1:] & present[:-1]
+    return delta.reshape(points.shape[:2] + (-1,))
+
+
+def joint_angles(points):
+    """Cosine of the bend at the three joints of every finger (15 values per hand)."""
+    chains = points[:, :, FINGERS]
+    bones = chains[:, :, :, 1:] - chains[:, :, :, :-1]
+    first, second = bones[:, :, :, :-1], bones[:, :, :, 1:]
+    dot = np.einsum("fhcjd,fhcjd->fhcj", first, second)
+    norms = np.linalg.norm(first, axis=-1) * np.linalg.norm(second, axis=-1)
+    cosines = np.where(norms > EPS, dot / np.maximum(norms, EPS), 0.0)
+    return cosines.reshape(points.shape[:2] + (-1,))
+
+
+# Steps that change the landmark coordinates, applied in the given order
+TRANSFORMS = {
+    "wrist_relative": wrist_relative,
+    "palm_scale": palm_scale,
+    "rotation_align": rotation_align,
+}
+
+# Steps that add feature channels next to the (transformed) coordinates
+FEATURES = {
+    "velocity": velocity,
+    "joint_angles": joint_angles,
+}
+
+
+class FeaturePipeline:
+    def __init__(self, steps=DEFAULT_STEPS):
+        """
+        Composable landmark normalization and feature extraction.
+
+        Coordinate transforms run first, in the given order; the resulting
+        coordinates are then concatenated with any derived features. An empty
+        pipeline returns the raw landmarks.
+
+        :param steps: Names from TRANSFORMS and FEATURES
+        """
+        unknown = [step for step in steps if step not in TRANSFORMS and step not in FEATURES]
+        if unknown:
+            raise ValueError(f"Unknown feature steps: {unknown}")
+        self.steps = tuple(steps)
+
+    @property
+    def key(self):
+        """Short stable identifier, used to name cached feature files."""
+        return hashlib.sha1(",".join(self.steps).encode()).hexdigest()[:12]
+
+    @property
+    def dims(self):
+        """Feature values per hand and frame."""
+        return len(self.transform(np.zeros((1, 2, NUM_LANDMARKS * 3), dtype=np.float32))[0, 0])
+
+    def transform(self, frames):
+        """
+        Compute the features of a landmark sequence.
+
+        :param frames: Landmarks of shape (frames, 2, 63), zeros where a hand is missing
+        :return: float32 features of shape (frames, 2, dims), zeros where a hand is missing
+        """
+        frames = np.asarray(frames, dtype=np.float32)
+        points = frames.reshape(frames.shape[:2] + (NUM_LANDMARKS, 3))
+        present = _present(points)
+
+        for step in self.steps:
+            if step in TRANSFORMS:
+                points = TRANSFORMS[step](points)
+        channels = [points.reshape(frames.shape[:2] + (-1,))]
+        channels += [FEATURES[step](points) for step in self.steps if step in FEATURES]
+
+        features = np.concatenate(channels, axis=-1) * present[:, :, :, 0]
+        return features.astype(np.float32)
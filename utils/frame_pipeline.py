@@ -0,0 +1,192 @@
+import collections
+import threading
+import time
+
+import numpy as np
+
+
+class DropOldestQueue:
+    def __init__(self, maxsize):
+        """
+        Bounded FIFO whose put never blocks: when full, the oldest item is dropped.
+
+        A slow consumer therefore always sees the most recent items and never
+        holds up its producer.
+
+        :param maxsize: Maximum number of queued items
+        """
+        self.items = collections.deque(maxlen=maxsize)
+        self.dropped = 0
+        self.closed = False
+        self._ready = threading.Condition()
+
+    def put(self, item):
+        """Append an item, dropping the oldest one if the queue is full."""
+        with self._ready:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        """
+        Remove and return the oldest item.
+
+        :param timeout: Seconds to wait for an item (None = until one arrives or the queue is closed)
+        :return: The item, or None on timeout or once the queue is closed and empty
+        """
+        with self._ready:
+            self._ready.wait_for(lambda: self.items or self.closed, timeout)
+            return self.items.popleft() if self.items else None
+
+    def get_latest(self, timeout=None):
+        """Like get, but discard everything except the newest item."""
+        with self._ready:
+            self._ready.wait_for(lambda: self.items or self.closed, timeout)
+            if not self.items:
+                return None
+            self.dropped += len(self.items) - 1
+            item = self.items.pop()
+            self.items.clear()
+            return item
+
+    def close(self):
+        """Wake up all consumers; get returns None once the queue is drained."""
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class FramePacket:
+    def __init__(self, index, image):
+        """
+        One camera frame on its way through the pipeline.
+
+        :param index: Sequence number assigned at capture
+        :param image: Captured image
+        """
+        self.index = index
+        self.image = image
+        self.results = None
+
+        # time.perf_counter() when each stage finished with this frame
+        self.timestamps = {"capture": time.perf_counter()}
+
+    def stamp(self, stage):
+        """Record that a stage has finished with this frame."""
+        self.timestamps[stage] = time.perf_counter()
+
+    def latency(self, stage):
+        """Seconds from capture until the given stage finished."""
+        return self.timestamps[stage] - self.timestamps["capture"]
+
+
+class Capture(threading.Thread):
+    def __init__(self, read, output):
+        """
+        Thread reading frames as fast as the source delivers them.
+
+        Capture never waits for a later stage: frames are put on a
+        DropOldestQueue, so a slow consumer only loses stale frames.
+
+        :param read: Callable returning (ok, image), e.g. cv2.VideoCapture.read
+        :param output: DropOldestQueue receiving a FramePacket per frame
+        """
+        super().__init__(name="capture", daemon=True)
+        self.read = read
+        self.output = output
+        self.captured = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                ok, image = self.read()
+                if not ok:
+                    print("❌ Failed to read frame from webcam")
+                    break
+                self.output.put(FramePacket(self.captured, image))
+                self.captured += 1
+        finally:
+            self.output.close()
+
+    def stop(self):
+        """Stop after the current frame; downstream stages then drain and stop."""
+        self._stop_event.set()
+
+
+class Stage(threading.Thread):
+    def __init__(self, name, work, source, outputs=(), tracker=None):
+        """
+        Worker thread applying one processing step to every packet of a queue.
+
+        :param name: Stage name, also the timestamp key stamped on each packet
+        :param work: Callable run on each packet; its return value is ignored
+        :param source: DropOldestQueue to read packets from
+        :param outputs: DropOldestQueues that receive every processed packet
+        :param tracker: Optional LatencyTracker recording capture-to-stage latency
+        """
+        super().__init__(name=name, daemon=True)
+        self.work = work
+        self.source = source
+        self.outputs = outputs
+        self.tracker = tracker
+        self.processed = 0
+        self.error = None
+
+    def run(self):
+        try:
+            while True:
+                packet = self.source.get()
+                if packet is None:
+                    break
+                self.work(packet)
+                packet.stamp(self.name)
+                if self.tracker is not None:
+                    self.tracker.record(packet, self.name)
+                self.processed += 1
+                for output in self.outputs:
+                    output.put(packet)
+        except Exception as e:
+            self.error = e
+        finally:
+            for output in self.outputs:
+                output.close()
+
+
+class LatencyTracker:
+    def __init__(self, window=300):
+        """
+        Rolling latency statistics per stage.
+
+        :param window: Number of most recent frames kept per stage
+        """
+        self.window = window
+        self.samples = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, packet, stage):
+        """Record the capture-to-stage latency of a packet."""
+        with self._lock:
+            self.samples[stage].append(packet.latency(stage))
+
+    def summary(self):
+        """
+        Latency percentiles per stage, in milliseconds.
+
+        :return: Dictionary of stage -> {"p50", "p95", "max", "frames"}
+        """
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self.samples.items() if values}
+        return {
+            stage: {
+                "p50": float(np.percentile(values, 50) * 1000),
+                "p95": float(np.percentile(values, 95) * 1000),
+                "max": float(values.max() * 1000),
+                "frames": len(values),
+            }
+            for stage, values in samples.items()
+        }
@@ -1,29 +1,79 @@
+from itertools import chain
+from operator import attrgetter
+
 import numpy as np
 
-def extract_landmarks(results):
+NUM_HANDS = 2
+NUM_LANDMARKS = 21
+
+# Pose is not used in recognition; one shared read-only array instead of a
+# fresh allocation per frame
+_EMPTY_POSE = np.zeros(132)
+_EMPTY_POSE.setflags(write=False)
+
+_XYZ = attrgetter("x", "y", "z")
+
+
+def _hand_index(results, i):
+    """Hand slot (0 = left, 1 = right) of the i-th detected hand; unknown counts as right."""
+    if not results.handedness:
+        return 1
+    # The Tasks API gives a list of categories per hand, best first
+    category = results.handedness[i]
+    if isinstance(category, list):
+        category = category[0]
+    return 0 if category.category_name == "Left" else 1
+
+
+def extract_hands(results, out=None):
     """
-    Extract hand landmarks from MediaPipe HandLandmarkerResult.
+    Extract both hands of one HandLandmarkerResult into a (2, 21, 3) array.
+
+    The landmark coordinates are read with C-level iteration straight into
+    the output, without building intermediate Python lists.
 
     :param results: MediaPipe HandLandmarkerResult
-    :return: Tuple of (pose, left_hand, right_hand) landmarks
+    :param out: Optional float32 array of shape (2, 21, 3) to write into
+    :return: Tuple of (landmarks, mask) where mask is [left, right] presence
     """
-    # Pose not used in recognition, set to zeros
-    pose = np.zeros(132)
+    if out is None:
+        out = np.zeros((NUM_HANDS, NUM_LANDMARKS, 3), dtype=np.float32)
+    else:
+        out[...] = 0.0
+    mask = np.zeros(NUM_HANDS, dtype=bool)
 
-    left_hand = np.zeros(63)
-    right_hand = np.zeros(63)
+    for i, hand_landmarks in enumerate(results.hand_landmarks or ()):
+        hand = _hand_index(results, i)
+        out[hand] = np.fromiter(
+            chain.from_iterable(map(_XYZ, hand_landmarks)), dtype=np.float32, count=NUM_LANDMARKS * 3
+        ).reshape(NUM_LANDMARKS, 3)
+        mask[hand] = True
 
-    if results.hand_landmarks:
-        for i, hand_landmarks in enumerate(results.hand_landmarks):
-            # Get handedness for this hand
-            handedness = results.handedness[i].category_name if results.handedness else "Right"  # Default to Right if not available
+    return out, mask
 
-            # Flatten landmarks: [x, y, z] for each of 21 landmarks
-            landmarks_flat = np.array([[lm.x, lm.y, lm.z] for lm in hand_landmarks]).flatten()
 
-            if handedness == "Left":
-                left_hand = landmarks_flat
-            else:  # Right or unknown
-                right_hand = landmarks_flat
+def extract_landmarks_batch(results_seq, out=None):
+    """
+    Extract the hands of a sequence of HandLandmarkerResults.
+
+    :param results_seq: Sequence of MediaPipe HandLandmarkerResult
+    :param out: Optional float32 array of shape (frames, 2, 21, 3) to write into
+    :return: Tuple of (landmarks of shape (frames, 2, 21, 3), presence mask of shape (frames, 2))
+    """
+    if out is None:
+        out = np.zeros((len(results_seq), NUM_HANDS, NUM_LANDMARKS, 3), dtype=np.float32)
+    mask = np.zeros((len(out), NUM_HANDS), dtype=bool)
+    for i, results in enumerate(results_seq):
+        _, mask[i] = extract_hands(results, out[i])
+    return out, mask
 
-    return pose, left_hand, right_hand
+
+def extract_landmarks(results):
+    """
+    Extract hand landmarks from MediaPipe HandLandmarkerResult.
+
+    :param results: MediaPipe HandLandmarkerResult
+    :return: Tuple of (pose, left_hand, right_hand) landmarks
+    """
+    hands, _ = extract_hands(results)
+    return _EMPTY_POSE, hands[0].reshape(-1), hands[1].reshape(-1)
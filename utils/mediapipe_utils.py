@@ -1,16 +1,136 @@
+import os
+import threading
+import time
+
+from utils.metrics import metrics
+
+# Hand landmarker model bundle, downloadable from the MediaPipe model page
+HAND_MODEL_PATH = os.environ.get("HAND_LANDMARKER_MODEL", "models/hand_landmarker.task")
+
+_landmarker = None
+_landmarker_lock = threading.Lock()
+
+
 class MockResults:
     """Mock MediaPipe results for Streamlit Cloud compatibility."""
     def __init__(self):
         self.hand_landmarks = []
         self.handedness = []
 
-def mediapipe_detection(image):
+
+class LandmarkerService:
+    def __init__(self, model_path=HAND_MODEL_PATH, running_mode="video", num_hands=2,
+                 min_confidence=0.5):
+        """
+        One MediaPipe Tasks HandLandmarker, built once and reused for every frame.
+
+        mediapipe is imported here rather than at module import. When it is
+        not installed or the model file is missing, the service stays usable
+        and returns empty MockResults.
+
+        :param model_path: Path of the hand_landmarker.task bundle
+        :param running_mode: "video" for synchronous tracking across frames,
+            "live_stream" to detect asynchronously and return the latest result,
+            "image" to detect every frame on its own, for callers whose frames
+            do not form one stream (several sessions sharing the service)
+        :param num_hands: Maximum number of hands to detect
+        :param min_confidence: Detection, presence and tracking confidence threshold
+        """
+        self.running_mode = running_mode
+        self.landmarker = None
+        self.latest = MockResults()
+        self._last_timestamp = -1
+        self._lock = threading.Lock()
+
+        try:
+            import mediapipe as mp
+            from mediapipe.tasks.python import BaseOptions, vision
+        except ImportError:
+            print("⚠ mediapipe is not installed; hand detection is disabled")
+            return
+        if not os.path.exists(model_path):
+            print(f"⚠ Hand landmarker model not found at {model_path}; hand detection is disabled")
+            return
+
+        self._mp = mp
+        modes = {
+            "image": vision.RunningMode.IMAGE,
+            "video": vision.RunningMode.VIDEO,
+            "live_stream": vision.RunningMode.LIVE_STREAM,
+        }
+        options = vision.HandLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_path),
+            running_mode=modes[running_mode],
+            num_hands=num_hands,
+            min_hand_detection_confidence=min_confidence,
+            min_hand_presence_confidence=min_confidence,
+            min_tracking_confidence=min_confidence,
+            result_callback=self._on_result if running_mode == "live_stream" else None,
+        )
+        self.landmarker = vision.HandLandmarker.create_from_options(options)
+
+    @property
+    def available(self):
+        """Whether a real landmarker is loaded."""
+        return self.landmarker is not None
+
+    def detect(self, image, timestamp_ms=None):
+        """
+        Detect hands in one RGB frame.
+
+        In live_stream mode the frame is submitted and the most recent
+        finished result is returned without waiting.
+
+        :param image: RGB image (numpy array)
+        :param timestamp_ms: Frame time in video and live_stream mode, the
+            wall clock by default; raised if needed to stay strictly increasing
+        :return: HandLandmarkerResult, or MockResults without a landmarker
+        """
+        if self.landmarker is None:
+            return MockResults()
+
+        mp_image = self._mp.Image(image_format=self._mp.ImageFormat.SRGB, data=image)
+        with self._lock:
+            if self.running_mode == "image":
+                return self.landmarker.detect(mp_image)
+            # Timestamps must increase strictly, also across Streamlit reruns
+            if timestamp_ms is None:
+                timestamp_ms = int(time.monotonic() * 1000)
+            timestamp = max(timestamp_ms, self._last_timestamp + 1)
+            self._last_timestamp = timestamp
+            if self.running_mode == "live_stream":
+                self.landmarker.detect_async(mp_image, timestamp)
+                return self.latest
+            return self.landmarker.detect_for_video(mp_image, timestamp)
+
+    def close(self):
+        """Release the landmarker."""
+        if self.landmarker is not None:
+            self.landmarker.close()
+            self.landmarker = None
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        """live_stream callback, called on MediaPipe's thread."""
+        self.latest = result
+
+
+def get_landmarker():
+    """Process-wide LandmarkerService, created on first use."""
+    global _landmarker
+    with _landmarker_lock:
+        if _landmarker is None:
+            _landmarker = LandmarkerService()
+        return _landmarker
+
+
+@metrics.timed("mediapipe_detection")
+def mediapipe_detection(image, landmarker=None):
     """
     Make hand landmarker prediction on image using MediaPipe Tasks API.
-    Returns safe stub to avoid cv2/mediapipe imports.
 
     :param image: Input image (numpy array, RGB)
+    :param landmarker: LandmarkerService to use (default: the shared one)
     :return: Processed image and results
     """
-    # Return original image and empty results to avoid mediapipe imports
-    return image, MockResults()
+    landmarker = landmarker or get_landmarker()
+    return image, landmarker.detect(image)
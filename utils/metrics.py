@@ -0,0 +1,215 @@
+"""
+Lightweight timers and counters for the recognition hot path.
+
+Disabled unless SIGN_METRICS=1 is set or enable() is called; while
+disabled, an instrumented function costs one attribute check per call.
+Collected values are exported in the Prometheus text format, over HTTP
+(serve) or as a periodic JSON log (JsonLogger).
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+PREFIX = "sign"
+
+
+class _NullTimer:
+    """Timer context that does nothing, shared while metrics are off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        """
+        Registry of named counters and latency histograms.
+
+        :param enabled: Whether observations are recorded
+        """
+        self.enabled = enabled
+        self.counters = {}
+        self.timers = {}
+        self._lock = threading.Lock()
+
+    def timer(self, name):
+        """Context manager timing its block under name; a no-op while disabled."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name):
+        """Decorator timing every call of a function under name."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        """Add value to a counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Record one duration."""
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)}
+            timer["count"] += 1
+            timer["sum"] += seconds
+            timer["max"] = max(timer["max"], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    timer["buckets"][i] += 1
+                    break
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        with self._lock:
+            self.counters = {}
+            self.timers = {}
+
+    def snapshot(self):
+        """
+        Copy of the current values.
+
+        :return: Dictionary with "counters" (name -> value) and "timers"
+            (name -> count, sum, max and mean in seconds)
+        """
+        with self._lock:
+            timers = {
+                name: {"count": t["count"], "sum": t["sum"], "max": t["max"], "mean": t["sum"] / t["count"]}
+                for name, t in self.timers.items()
+            }
+            return {"counters": dict(self.counters), "timers": timers}
+
+    def prometheus_text(self):
+        """Counters and histograms in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+                lines.append(f"{PREFIX}_{name}_total {value}")
+
+            if self.timers:
+                metric = f"{PREFIX}_stage_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for name, timer in sorted(self.timers.items()):
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, timer["buckets"]):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {timer["count"]}')
+                    lines.append(f'{metric}_sum{{stage="{name}"}} {timer["sum"]}')
+                    lines.append(f'{metric}_count{{stage="{name}"}} {timer["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serve prometheus_text at /metrics on a daemon thread.
+
+        :return: The http.server.ThreadingHTTPServer; call shutdown() to stop it
+        """
+        # Imported here: only serving needs it, and it slows every cold start
+        import http.server
+
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+class JsonLogger(threading.Thread):
+    def __init__(self, registry, path, interval=10.0):
+        """
+        Append a JSON snapshot of the registry to a file at a fixed interval.
+
+        :param registry: Metrics to snapshot
+        :param path: File receiving one JSON object per line
+        :param interval: Seconds between snapshots
+        """
+        super().__init__(name="metrics-log", daemon=True)
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.write()
+
+    def write(self):
+        """Append one snapshot now."""
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"time": time.time(), **self.registry.snapshot()}) + "\n")
+
+    def stop(self):
+        """Write a final snapshot and stop."""
+        self._stop_event.set()
+        self.write()
+
+
+# Process-wide registry used by the instrumented modules
+metrics = Metrics(enabled=os.environ.get("SIGN_METRICS") == "1")
+
+
+def enable():
+    """Start recording metrics."""
+    metrics.enabled = True
+
+
+def disable():
+    """Stop recording metrics; what was recorded is kept."""
+    metrics.enabled = False
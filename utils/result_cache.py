@@ -0,0 +1,213 @@
+import collections
+import threading
+import time
+
+import numpy as np
+
+from utils.metrics import metrics
+
+# splitmix64 constants, for hashing quantized feature tokens
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _splitmix64(x):
+    """Well-mixed 64-bit hashes of a uint64 array (wrapping arithmetic)."""
+    with np.errstate(over="ignore"):
+        x = x + _GOLDEN
+        x = (x ^ (x >> np.uint64(30))) * _MIX1
+        x = (x ^ (x >> np.uint64(27))) * _MIX2
+        return x ^ (x >> np.uint64(31))
+
+
+def resample(frames, num_frames):
+    """
+    Linearly resample a sequence along time.
+
+    :param frames: Array of shape (n, ...)
+    :param num_frames: Number of output frames
+    :return: float32 array of shape (num_frames, ...)
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    if len(frames) == 1:
+        return np.repeat(frames, num_frames, axis=0)
+    position = np.linspace(0, len(frames) - 1, num_frames)
+    left = np.floor(position).astype(np.int64)
+    right = np.minimum(left + 1, len(frames) - 1)
+    weight = (position - left).astype(np.float32).reshape((-1,) + (1,) * (frames.ndim - 1))
+    return frames[left] * (1 - weight) + frames[right] * weight
+
+
+def simhash(frames, num_frames=8, step=0.1, bits=64):
+    """
+    Locality-sensitive fingerprint of a feature sequence.
+
+    The sequence is resampled to num_frames, every value is quantized to
+    step, and each (position, quantized value) token votes with its 64-bit
+    hash: the fingerprint keeps the bits most tokens agree on. Sequences
+    differing in a few quantized values get the same or a close
+    fingerprint, so repeated performances of a gesture share a key.
+
+    Features constant over the sequence (absent hands, the wrist origin of
+    wrist-relative features) cast no vote: they are the same for most
+    gestures and would pull unrelated fingerprints together.
+
+    :param frames: Features of shape (n, 2, dims), e.g. TemplateLibrary.prepare output
+    :param num_frames: Frames kept after resampling
+    :param step: Quantization step in feature units
+    :param bits: Fingerprint width, at most 64
+    :return: int fingerprint, 0 for an empty or constant sequence
+    """
+    if len(frames) == 0:
+        return 0
+    resampled = resample(frames, num_frames).reshape(num_frames, -1)
+    varying = np.flatnonzero(np.ptp(resampled, axis=0) > 0)
+    if len(varying) == 0:
+        return 0
+    quantized = np.round(resampled[:, varying] / step).astype(np.int64)
+    positions = np.arange(resampled.size, dtype=np.uint64).reshape(resampled.shape)[:, varying]
+    with np.errstate(over="ignore"):
+        tokens = positions.ravel() * _GOLDEN ^ quantized.ravel().astype(np.uint64)
+    hashes = _splitmix64(tokens)
+    token_bits = np.unpackbits(hashes.view(np.uint8), bitorder="little").reshape(len(hashes), 64)[:, :bits]
+    # A matrix-vector product counts the votes faster than an integer sum
+    votes = np.ones(len(hashes), dtype=np.float32) @ token_bits.astype(np.float32)
+    set_bits = np.flatnonzero(2 * votes > len(hashes))
+    return int(sum(1 << int(bit) for bit in set_bits))
+
+
+def hamming(fingerprints, fingerprint):
+    """
+    Number of differing bits between each of an array of fingerprints and one fingerprint.
+
+    :param fingerprints: uint64 array
+    :param fingerprint: int
+    :return: int64 array
+    """
+    diff = np.ascontiguousarray(fingerprints ^ np.uint64(fingerprint))
+    return np.unpackbits(diff.view(np.uint8)).reshape(len(diff), 64).sum(axis=1, dtype=np.int64)
+
+
+class ResultCache:
+    def __init__(self, max_entries=256, ttl=60.0, max_distance=0, num_frames=8, step=0.25,
+                 clock=time.monotonic):
+        """
+        LRU cache of recognition results keyed by a fingerprint of the query.
+
+        Near-identical performances of a gesture get the same fingerprint or
+        one a few bits apart (see simhash), and a lookup returns the closest
+        entry within max_distance bits, so repeating a sign returns the
+        earlier result without a library scan. A hit is another gesture's
+        result, so the default only accepts equal fingerprints. Entries
+        expire after ttl seconds; clear must be called whenever the template
+        library changes.
+
+        :param max_entries: Entries kept before the least recently used is evicted
+        :param ttl: Seconds an entry stays valid, None for no expiry
+        :param max_distance: Most differing fingerprint bits for a hit, 0 for
+            exact matches only. Unrelated synthetic one-handed gestures differ
+            in about 31 of 64 bits, noisy repeats in 4-17, so any tolerance
+            trades wrong answers for hits
+        :param num_frames: Frames the query is resampled to before hashing
+        :param step: Quantization step of the fingerprint, in feature units
+        :param clock: Time source in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.num_frames = num_frames
+        self.step = step
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # (fingerprint, context) -> (expiry time, result), least recently used first
+        self._entries = collections.OrderedDict()
+        # Keys and their fingerprints as an array, rebuilt after entries are added or removed
+        self._index = None
+        self._lock = threading.Lock()
+
+    def key(self, features, query_mask, *context):
+        """
+        Cache key of a prepared query: its fingerprint and the context it must share with a hit.
+
+        :param features: Query features of shape (n, 2, dims)
+        :param query_mask: [left, right] hands present in the query
+        :param context: Further values the result depends on (e.g. k)
+        """
+        mask = tuple(bool(hand) for hand in query_mask)
+        return simhash(features, self.num_frames, self.step), (mask,) + context
+
+    def get(self, key):
+        """
+        Look up the closest cached result of a key.
+
+        :return: The cached result, or None on a miss
+        """
+        with self._lock:
+            best = key if key in self._entries else self._nearest(key)
+            if best is not None:
+                expires, result = self._entries[best]
+                if expires is not None and self.clock() > expires:
+                    del self._entries[best]
+                    self._index = None
+                    self.expirations += 1
+                    best = None
+            if best is None:
+                self.misses += 1
+                metrics.count("result_cache_misses")
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            metrics.count("result_cache_hits")
+            return result
+
+    def _nearest(self, key):
+        """Closest stored key with the same context within max_distance bits, or None."""
+        fingerprint, context = key
+        if not self._entries or self.max_distance <= 0:
+            return None
+        if self._index is None:
+            keys = list(self._entries)
+            self._index = keys, np.array([k[0] for k in keys], dtype=np.uint64)
+        keys, fingerprints = self._index
+        distances = hamming(fingerprints, fingerprint)
+        for i in np.argsort(distances, kind="stable"):
+            if distances[i] > self.max_distance:
+                return None
+            if keys[i][1] == context:
+                return keys[i]
+        return None
+
+    def put(self, key, result):
+        """Store a result, evicting the least recently used entry when full."""
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._index = None
+
+    def clear(self):
+        """Drop every entry, e.g. after the library changed."""
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Counters for display or export."""
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "expirations": self.expirations, "hit_rate": self.hit_rate}
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,54 +1,360 @@
+import contextlib
+import fnmatch
+import json
 import os
 import pickle
 import numpy as np
 
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
 SIGNS_DIR = "data/signs"
 
+# All landmark frames of all signs, as raw float32 rows of shape (2, 63)
+FRAMES_FILE = "frames.f32"
+# Append-only log of template additions and sign deletions
+LOG_FILE = "index.jsonl"
+# Per-pipeline feature cache, row-aligned with FRAMES_FILE of one compaction generation
+FEATURES_FILE = "features-{key}-{generation}.f32"
+# Held exclusively by the process writing the store
+LOCK_FILE = "store.lock"
+
+FRAME_SHAPE = (2, 63)
+FRAME_BYTES = int(np.prod(FRAME_SHAPE)) * np.dtype(np.float32).itemsize
+
+# Compact on load once unreferenced frames outnumber live ones by this factor
+COMPACT_RATIO = 1.0
+
+
+class SignStore:
+    def __init__(self, directory=SIGNS_DIR):
+        """
+        Columnar on-disk store for sign templates.
+
+        Frames of every template live in one contiguous float32 block that is
+        memory-mapped read-only, so loading is independent of library size and
+        several processes share the same pages. Both the block and the index
+        are append-only: saving a template appends its frames and one log line,
+        and a sign may have any number of templates. Frames of deleted signs
+        are reclaimed by compact().
+
+        Every write (saving, deleting, compacting, migrating legacy pickles
+        and extending a feature cache) holds an exclusive lock on LOCK_FILE,
+        so processes opening the same store at once do not interleave them.
+
+        :param directory: Directory holding the frame block and log
+        """
+        self.directory = directory
+        self.frames_path = os.path.join(directory, FRAMES_FILE)
+        self.log_path = os.path.join(directory, LOG_FILE)
+        self.lock_path = os.path.join(directory, LOCK_FILE)
+        self.templates = []
+        self.frames = np.zeros((0,) + FRAME_SHAPE, dtype=np.float32)
+
+        # Incremented by every compaction, which moves frames to new offsets
+        self.generation = 0
+
+        if not os.path.exists(directory):
+            return
+        with self.locked():
+            # Another process may have migrated or compacted while we waited
+            self._migrate_pickles()
+            self.load()
+            if self.dead_frames() > COMPACT_RATIO * max(self.live_frames(), 1):
+                self._compact()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Hold the store's exclusive inter-process lock; not reentrant."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "a+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after about ten seconds
+                        continue
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def load(self):
+        """Replay the log and memory-map the frame block."""
+        self._map_frames()
+        self.templates = []
+        self.generation = 0
+        if not os.path.exists(self.log_path):
+            return
+
+        with open(self.log_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn last line from an interrupted write
+                    continue
+                if record["op"] == "add":
+                    if record["offset"] + record["length"] <= len(self.frames):
+                        self.templates.append({k: v for k, v in record.items() if k != "op"})
+                elif record["op"] == "delete":
+                    self.templates = [t for t in self.templates if t["name"] != record["name"]]
+                elif record["op"] == "compact":
+                    self.generation = record["generation"]
+
+    def save(self, sign_name, left_hand_list, right_hand_list):
+        """
+        Append a new template of a sign.
+
+        :param sign_name: Name of the sign
+        :param left_hand_list: List of left hand landmarks
+        :param right_hand_list: List of right hand landmarks
+        :return: Index entry of the saved template
+        """
+        return self.save_frames(sign_name, pack_frames(left_hand_list, right_hand_list))
+
+    def save_frames(self, sign_name, frames):
+        """
+        Append a new template of a sign from already packed frames.
+
+        :param sign_name: Name of the sign
+        :param frames: Landmarks of shape (frames, 2, 63)
+        :return: Index entry of the saved template
+        """
+        with self.locked():
+            return self._save_frames(sign_name, frames)
+
+    def _save_frames(self, sign_name, frames):
+        """save_frames with the lock already held."""
+        frames = np.ascontiguousarray(frames, dtype=np.float32)
+        offset = os.path.getsize(self.frames_path) // FRAME_BYTES if os.path.exists(self.frames_path) else 0
+        with open(self.frames_path, "ab") as f:
+            f.write(frames.tobytes())
+
+        entry = {
+            "name": sign_name,
+            "offset": offset,
+            "length": len(frames),
+            "hand_mask": [bool(np.any(frames[:, hand] != 0)) for hand in range(FRAME_SHAPE[0])],
+        }
+        self._append_log({"op": "add", **entry})
+        self.templates.append(entry)
+        self._map_frames()
+        return entry
+
+    def delete(self, sign_name):
+        """
+        Remove every template of a sign. Its frames are reclaimed on compaction.
+
+        :param sign_name: Name of the sign
+        """
+        with self.locked():
+            self._append_log({"op": "delete", "name": sign_name})
+        self.templates = [t for t in self.templates if t["name"] != sign_name]
+
+    def compact(self):
+        """
+        Rewrite the block with only live frames, grouped by sign, and a fresh log.
+
+        Afterwards templates are stored back to back, which lets TemplateLibrary
+        map them without copying. The log is replayed first, so templates
+        other processes appended since this store was loaded are kept.
+        """
+        with self.locked():
+            self.load()
+            self._compact()
+
+    def _compact(self):
+        """compact with the lock already held and the log just replayed."""
+        if not self.templates:
+            return
+        templates = sorted(self.templates, key=lambda t: t["name"])
+        frames_tmp, log_tmp = self.frames_path + ".tmp", self.log_path + ".tmp"
+
+        offset, compacted = 0, []
+        with open(frames_tmp, "wb") as frames_file, open(log_tmp, "w") as log_file:
+            log_file.write(json.dumps({"op": "compact", "generation": self.generation + 1}) + "\n")
+            for template in templates:
+                frames_file.write(np.ascontiguousarray(self.template_frames(template)).tobytes())
+                entry = dict(template, offset=offset)
+                log_file.write(json.dumps({"op": "add", **entry}) + "\n")
+                compacted.append(entry)
+                offset += template["length"]
+
+        try:
+            os.replace(frames_tmp, self.frames_path)
+            os.replace(log_tmp, self.log_path)
+        except PermissionError:
+            # The block is still mapped by another process (Windows); retry later
+            os.remove(frames_tmp)
+            os.remove(log_tmp)
+            return
+        self.templates = compacted
+        self.generation += 1
+        self._map_frames()
+        self._remove_feature_caches()
+        print(f"Compacted sign store to {offset} frames")
+
+    def features(self, pipeline):
+        """
+        Features of every stored frame under a pipeline, cached on disk.
+
+        The cache is a float32 block row-aligned with the frame block, so
+        template offsets index both. Rows for templates appended since the
+        last call are computed and appended; everything else is memory-mapped.
+
+        :param pipeline: FeaturePipeline
+        :return: float32 array of shape (frames, 2, pipeline.dims)
+        """
+        row_shape = (FRAME_SHAPE[0], pipeline.dims)
+        row_bytes = int(np.prod(row_shape)) * np.dtype(np.float32).itemsize
+        path = os.path.join(self.directory, FEATURES_FILE.format(key=pipeline.key, generation=self.generation))
+        cached = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+
+        if cached < len(self.frames):
+            with self.locked():
+                # Rows another process appended meanwhile are not computed twice
+                cached = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+                missing = np.zeros((max(len(self.frames) - cached, 0),) + row_shape, dtype=np.float32)
+                for template in self.templates:
+                    if template["offset"] >= cached:
+                        start = template["offset"] - cached
+                        missing[start:start + template["length"]] = pipeline.transform(
+                            self.template_frames(template))
+                with open(path, "ab") as f:
+                    f.write(missing.tobytes())
+
+        if len(self.frames) == 0:
+            return np.zeros((0,) + row_shape, dtype=np.float32)
+        return np.memmap(path, dtype=np.float32, mode="r", shape=(len(self.frames),) + row_shape)
+
+    def template_frames(self, template):
+        """
+        Frames of one template as a zero-copy view into the block.
+
+        :param template: Index entry
+        :return: float32 array of shape (length, 2, 63)
+        """
+        return self.frames[template["offset"]:template["offset"] + template["length"]]
+
+    def sequences(self):
+        """
+        Sign sequences as zero-copy views into the memory-mapped block.
+
+        :return: Dictionary of sign_name -> list of (left_hand, right_hand) sequences
+        """
+        sequences = {}
+        for template in self.templates:
+            frames = self.template_frames(template)
+            sequences.setdefault(template["name"], []).append((frames[:, 0], frames[:, 1]))
+        return sequences
+
+    def sign_names(self):
+        """Names of the stored signs, in index order."""
+        return list(dict.fromkeys(t["name"] for t in self.templates))
+
+    def live_frames(self):
+        """Number of frames referenced by a template."""
+        return sum(t["length"] for t in self.templates)
+
+    def dead_frames(self):
+        """Number of frames in the block no template refers to."""
+        return len(self.frames) - self.live_frames()
+
+    def _map_frames(self):
+        """Memory-map the current extent of the frame block."""
+        self.frames = np.zeros((0,) + FRAME_SHAPE, dtype=np.float32)
+        if os.path.exists(self.frames_path) and os.path.getsize(self.frames_path) >= FRAME_BYTES:
+            num_frames = os.path.getsize(self.frames_path) // FRAME_BYTES
+            self.frames = np.memmap(self.frames_path, dtype=np.float32, mode="r",
+                                    shape=(num_frames,) + FRAME_SHAPE)
+
+    def _remove_feature_caches(self):
+        """Delete feature caches of earlier generations, whose rows no longer line up."""
+        current = FEATURES_FILE.format(key="*", generation=self.generation)
+        for filename in os.listdir(self.directory):
+            if filename.startswith("features-") and not fnmatch.fnmatch(filename, current):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except PermissionError:
+                    pass
+
+    def _append_log(self, record):
+        """Append one record to the log."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _migrate_pickles(self):
+        """Move legacy per-sign .pkl files into the frame block; the lock must be held."""
+        pickles = sorted(f for f in os.listdir(self.directory) if f.endswith('.pkl'))
+        if not pickles:
+            return
+
+        for filename in pickles:
+            filepath = os.path.join(self.directory, filename)
+            with open(filepath, 'rb') as f:
+                data = pickle.load(f)
+            self._save_frames(filename[:-4], pack_frames(data['left_hand'], data['right_hand']))
+            os.remove(filepath)
+        print(f"Migrated {len(pickles)} pickled signs to {self.frames_path}")
+
+
+def pack_frames(left_hand_list, right_hand_list):
+    """
+    Stack left/right hand landmark lists into one (frames, 2, 63) float32 array.
+
+    :param left_hand_list: List of left hand landmarks (63-element arrays)
+    :param right_hand_list: List of right hand landmarks (63-element arrays)
+    :return: float32 array of shape (frames, 2, 63), zeros where a hand is missing
+    """
+    num_frames = max(len(left_hand_list), len(right_hand_list))
+    frames = np.zeros((num_frames,) + FRAME_SHAPE, dtype=np.float32)
+    for hand, hand_list in enumerate((left_hand_list, right_hand_list)):
+        if len(hand_list) > 0:
+            frames[:len(hand_list), hand] = np.asarray(hand_list, dtype=np.float32).reshape(len(hand_list), -1)
+    return frames
+
+
 def save_sign_sequence(sign_name, left_hand_list, right_hand_list):
     """
     Save a sign sequence to disk.
-    
+
     :param sign_name: Name of the sign
     :param left_hand_list: List of left hand landmarks
     :param right_hand_list: List of right hand landmarks
     """
-    if not os.path.exists(SIGNS_DIR):
-        os.makedirs(SIGNS_DIR)
-    
-    filename = f"{SIGNS_DIR}/{sign_name}.pkl"
-    data = {
-        'left_hand': left_hand_list,
-        'right_hand': right_hand_list
-    }
-    with open(filename, 'wb') as f:
-        pickle.dump(data, f)
-    print(f"Saved sign '{sign_name}' to {filename}")
+    store = SignStore()
+    store.save(sign_name, left_hand_list, right_hand_list)
+    print(f"Saved sign '{sign_name}' to {store.frames_path}")
 
 def load_all_sign_sequences():
     """
     Load all saved sign sequences from disk.
-    
+
     :return: Dictionary of sign_name -> list of (left_hand, right_hand) sequences
     """
-    sequences = {}
-    if not os.path.exists(SIGNS_DIR):
-        return sequences
-    
-    for filename in os.listdir(SIGNS_DIR):
-        if filename.endswith('.pkl'):
-            sign_name = filename[:-4]
-            filepath = os.path.join(SIGNS_DIR, filename)
-            with open(filepath, 'rb') as f:
-                data = pickle.load(f)
-            sequences[sign_name] = [(np.array(data['left_hand']), np.array(data['right_hand']))]
-    return sequences
+    return SignStore().sequences()
 
 def get_available_signs():
     """
     Get list of available sign names.
-    
+
     :return: List of sign names
     """
     if not os.path.exists(SIGNS_DIR):
         return []
-    return [f[:-4] for f in os.listdir(SIGNS_DIR) if f.endswith('.pkl')]
+    return SignStore().sign_names()
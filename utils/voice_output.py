@@ -1,27 +1,254 @@
-import pyttsx3
+import collections
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import wave
+
+from utils.metrics import metrics
+
+try:
+    import winsound
+except ImportError:
+    winsound = None
+
+VOICE_CACHE_DIR = "data/voice_cache"
+
+# What to do with a new utterance while others are queued or playing
+POLICIES = ("drop", "coalesce", "interrupt")
+
+# Command line WAV players tried, in order, where winsound is unavailable
+PLAYERS = (["afplay"], ["paplay"], ["aplay", "-q"])
+
+
+def _find_player():
+    """First WAV player of PLAYERS on the PATH, None if there is none."""
+    for command in PLAYERS:
+        if shutil.which(command[0]):
+            return command
+    return None
+
+
+def _init_engine():
+    """Create the pyttsx3 engine; imported here so the module loads without it."""
+    import pyttsx3
+    return pyttsx3.init()
+
 
 class VoiceOutput:
-    def __init__(self):
-        self.engine = pyttsx3.init()
-        self.engine.setProperty('rate', 150)
-        self.engine.setProperty('volume', 0.9)
+    def __init__(self, policy="coalesce", max_queue=4, known_signs=(), cache_dir=VOICE_CACHE_DIR,
+                 engine_factory=_init_engine, player=None):
+        """
+        Text-to-speech on a dedicated worker thread.
+
+        speak_sign only enqueues and returns at once, so the video loop never
+        waits for an utterance. The engine is created and driven on the worker
+        thread only. Known sign names are rendered to WAV files at startup,
+        other texts (signs saved later) the first time they are spoken, and
+        replayed from the cache with winsound on Windows or a command line
+        player (afplay, paplay, aplay) elsewhere. Without either, caching is
+        off and every utterance is synthesized by the engine. If the engine
+        cannot be started (e.g. pyttsx3 or a system voice is missing), a
+        warning is printed once and speak_sign does nothing (is_available).
+
+        :param policy: "drop" discards new utterances while the queue is full,
+            "coalesce" also skips text already queued or playing and otherwise
+            replaces the oldest queued utterance, "interrupt" cuts the current
+            utterance off and discards the queue
+        :param max_queue: Maximum number of pending utterances
+        :param known_signs: Sign names to pre-render into the audio cache
+        :param cache_dir: Directory of pre-rendered audio, None to disable the cache
+        :param engine_factory: Callable returning a pyttsx3-compatible engine
+        :param player: Command playing a WAV file given as its last argument,
+            used without winsound; None to look one up on the PATH
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown voice policy: {policy}")
+        self.policy = policy
+        self.player = None if winsound is not None else player or _find_player()
+        self.cache_dir = cache_dir if winsound is not None or self.player is not None else None
         self.last_spoken = None
+        self.speaking = None
+        self.dropped = 0
+        # Why the engine could not be started, if it could not
+        self.engine_error = None
+
+        self._queue = collections.deque()
+        self._max_queue = max_queue
+        self._interrupt = threading.Event()
+        self._closed = False
+        self._ready = threading.Condition()
+        self._engine_factory = engine_factory
+        self._prerender = list(dict.fromkeys(known_signs))
 
+        self._worker = threading.Thread(target=self._run, name="voice", daemon=True)
+        self._worker.start()
+
+    @metrics.timed("speak_sign")
     def speak_sign(self, sign_name):
         """
-        Speak the recognized sign name.
-        
+        Queue the recognized sign name to be spoken; never blocks.
+
         :param sign_name: Name of the sign to speak
         """
-        if sign_name != self.last_spoken:
-            self.engine.say(sign_name)
-            self.engine.runAndWait()
+        if sign_name == self.last_spoken:
+            return
+
+        with self._ready:
+            if not self.is_available:
+                return
+            if self.policy == "interrupt":
+                self.dropped += len(self._queue)
+                self._queue.clear()
+                if self.speaking is not None:
+                    self._interrupt.set()
+            elif self.policy == "coalesce" and (sign_name == self.speaking or sign_name in self._queue):
+                # Already on its way out
+                self.last_spoken = sign_name
+                return
+            if len(self._queue) >= self._max_queue:
+                self.dropped += 1
+                metrics.count("utterances_dropped")
+                if self.policy == "drop":
+                    # Not spoken, so the next detection of it may try again
+                    return
+                self._queue.popleft()
+            self._queue.append(sign_name)
             self.last_spoken = sign_name
+            self._ready.notify()
+
+    @property
+    def is_available(self):
+        """False once the speech engine failed to start; speak_sign then does nothing."""
+        return self.engine_error is None
 
     def reset(self):
         """Reset the last spoken sign."""
         self.last_spoken = None
 
+    def wait(self, timeout=None):
+        """
+        Block until everything queued has been spoken.
+
+        :return: False if the timeout expired first
+        """
+        with self._ready:
+            return self._ready.wait_for(lambda: not self._queue and self.speaking is None, timeout)
+
     def cleanup(self):
-        """Cleanup the voice engine."""
+        """Stop the worker, cutting off the current utterance."""
+        with self._ready:
+            self._closed = True
+            self._queue.clear()
+            self._interrupt.set()
+            self._ready.notify_all()
+        self._worker.join(timeout=2.0)
+
+    def _run(self):
+        """Worker loop: own the engine and speak queued utterances in order."""
+        try:
+            self.engine = self._engine_factory()
+            self.engine.setProperty('rate', 150)
+            self.engine.setProperty('volume', 0.9)
+            # pyttsx3 may only be stopped from its own callbacks
+            self.engine.connect('started-word', self._on_word)
+        except Exception as e:
+            # Without an engine nothing is spoken; drop what was queued meanwhile
+            print(f"⚠ Voice output disabled: {e}")
+            with self._ready:
+                self.engine_error = e
+                self.dropped += len(self._queue)
+                self._queue.clear()
+                self._ready.notify_all()
+            return
+        try:
+            self._render_cache(self._prerender)
+        except Exception as e:
+            print(f"⚠ Voice cache not rendered: {e}")
+
+        while True:
+            with self._ready:
+                self.speaking = None
+                self._ready.notify_all()
+                self._ready.wait_for(lambda: self._queue or self._closed)
+                if self._closed:
+                    break
+                self.speaking = self._queue.popleft()
+                self._interrupt.clear()
+            try:
+                with metrics.timer("speech"):
+                    self._speak(self.speaking)
+            except Exception as e:
+                print(f"⚠ Voice output failed: {e}")
+
         self.engine.stop()
+
+    def _on_word(self, name, location, length):
+        """Engine callback between words; cuts the utterance off on interrupt."""
+        if self._interrupt.is_set():
+            self.engine.stop()
+
+    def _speak(self, text):
+        """Play the cached rendering of text, rendering it first if needed, or synthesize it."""
+        path = self._cache_path(text)
+        if path is not None and not os.path.exists(path):
+            self._render_cache([text])
+            if self._interrupt.is_set():
+                return
+        if path is not None and os.path.exists(path):
+            self._play(path)
+        else:
+            self.engine.say(text)
+            self.engine.runAndWait()
+
+    def _play(self, path):
+        """Play a WAV file asynchronously, stopping early on interrupt."""
+        if winsound is None:
+            process = subprocess.Popen(self.player + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            while process.poll() is None:
+                if self._interrupt.wait(0.02):
+                    process.terminate()
+                    break
+            process.wait()
+            return
+        with wave.open(path) as f:
+            duration = f.getnframes() / f.getframerate()
+        winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+        if self._interrupt.wait(duration):
+            winsound.PlaySound(None, winsound.SND_PURGE)
+        else:
+            # Let the device drain before the next utterance
+            time.sleep(0.05)
+
+    def _cache_path(self, text):
+        """Cache file of one utterance, None when caching is off."""
+        if self.cache_dir is None:
+            return None
+        settings = f"{text}|{self.engine.getProperty('rate')}|{self.engine.getProperty('volume')}"
+        digest = hashlib.sha1(settings.encode()).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{re.sub(r'[^A-Za-z0-9_-]', '_', text)}-{digest}.wav")
+
+    def _render_cache(self, texts):
+        """Synthesize missing cache files in one engine run; an interrupted run caches nothing."""
+        if self.cache_dir is None:
+            return
+        missing = [(text, self._cache_path(text)) for text in texts]
+        missing = [(text, path) for text, path in missing if not os.path.exists(path)]
+        if not missing:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Engines pick the file format by extension, so keep .wav on the temporary name
+        temp_paths = [f"{path[:-len('.wav')]}.tmp.wav" for _, path in missing]
+        for (text, _), temp_path in zip(missing, temp_paths):
+            self.engine.save_to_file(text, temp_path)
+        self.engine.runAndWait()
+        for (_, path), temp_path in zip(missing, temp_paths):
+            if not os.path.exists(temp_path):
+                continue
+            if self._interrupt.is_set():
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, path)
@@ -1,6 +1,14 @@
+from collections import OrderedDict
+
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 
+from utils.metrics import metrics
+
+# Optional: a single remap pass for resize + flip; NumPy is used otherwise.
+# Imported on first use (see _load_cv2), as it is slow to import.
+cv2 = False
+
 WHITE_COLOR = (245, 242, 226)
 RED_COLOR = (25, 35, 240)
 GREEN_COLOR = (25, 200, 25)
@@ -9,6 +17,21 @@ CYAN_COLOR = (200, 200, 25)
 
 HEIGHT = 600
 
+# Rasterized text sprites kept per WebcamManager
+SPRITE_CACHE_SIZE = 256
+
+
+def _load_cv2():
+    """The cv2 module, or None when it is not installed."""
+    global cv2
+    if cv2 is False:
+        try:
+            import cv2 as module
+        except ImportError:
+            module = None
+        cv2 = module
+    return cv2
+
 
 def safe_text(text):
     """Convert any text to ASCII-safe string for PIL."""
@@ -18,7 +41,7 @@ def safe_text(text):
 
 
 class WebcamManager(object):
-    """Adds text overlays using PIL (Unicode-safe, Streamlit Cloud safe)."""
+    """Adds text overlays: labels rasterized once with PIL, blended per frame with NumPy (Streamlit Cloud safe)."""
 
     def __init__(self):
         try:
@@ -26,9 +49,15 @@ class WebcamManager(object):
         except Exception:
             self.font = ImageFont.load_default()
 
+        # Resize grids per input shape, label sprites and fixed shapes
+        self._grids = {}
+        self._sprites = OrderedDict()
+        self._shapes = {}
+
     def draw_landmarks_on_image(self, image: np.ndarray, results):
         return image
 
+    @metrics.timed("overlay")
     def add_text_overlay(
         self,
         image: np.ndarray,
@@ -39,45 +68,139 @@ class WebcamManager(object):
         current_sign_name: str = "",
         dtw_distance: float = None,
     ):
-        pil_image = Image.fromarray(image)
+        """
+        Mirror the frame, scale it to HEIGHT rows and draw the status overlay.
 
-        w, h = pil_image.size
-        aspect_ratio = w / h
-        new_w = int(HEIGHT * aspect_ratio)
-        pil_image = pil_image.resize((new_w, HEIGHT), Image.Resampling.LANCZOS)
-        pil_image = pil_image.transpose(Image.FLIP_LEFT_RIGHT)
+        Resize and flip happen in one pass, and every label is a cached
+        sprite alpha-blended into the output in place, so a frame is copied
+        once regardless of its input resolution.
 
-        draw = ImageDraw.Draw(pil_image)
+        :return: New image of HEIGHT rows
+        """
+        frame = self.resize_mirrored(image)
+        new_w = frame.shape[1]
 
         # Mode
-        mode_text = safe_text(f"MODE: {current_mode.upper()}")
         mode_color = RED_COLOR if current_mode == "record" else GREEN_COLOR
-        draw.text((10, 10), mode_text, fill=mode_color, font=self.font)
+        self.blend_text(frame, f"MODE: {current_mode.upper()}", (10, 10), mode_color)
 
         # Recording status
         if is_recording:
-            status_text = safe_text(f"Recording ({sequence_length}/50 frames)")
-            draw.text((10, 40), status_text, fill=RED_COLOR, font=self.font)
+            self.blend_text(frame, f"Recording ({sequence_length}/50 frames)", (10, 40), RED_COLOR)
 
         # Sign name
         if current_sign_name and current_mode == "record":
-            sign_name_text = safe_text(f"Sign: {current_sign_name}")
-            draw.text((10, 70), sign_name_text, fill=YELLOW_COLOR, font=self.font)
+            self.blend_text(frame, f"Sign: {current_sign_name}", (10, 70), YELLOW_COLOR)
 
         # DTW distance
         if dtw_distance is not None:
-            distance_text = safe_text(f"DTW Distance: {dtw_distance:.2f}")
-            draw.text((10, 100), distance_text, fill=CYAN_COLOR, font=self.font)
+            self.blend_text(frame, f"DTW Distance: {dtw_distance:.2f}", (10, 100), CYAN_COLOR)
 
         # Prediction (bottom)
         if sign_detected:
-            self.draw_text(pil_image, safe_text(sign_detected), draw)
+            self.draw_banner(frame, sign_detected)
 
         # Status indicator
         indicator_color = RED_COLOR if is_recording else WHITE_COLOR
-        draw.ellipse([new_w - 45, 15, new_w - 15, 45], fill=indicator_color)
-
-        return np.array(pil_image)
+        self.blend_sprite(frame, self._indicator(), (new_w - 45, 15), indicator_color)
+
+        return frame
+
+    def resize_mirrored(self, image: np.ndarray):
+        """
+        Scale an image to HEIGHT rows, keeping its aspect ratio, and mirror it.
+
+        Uses a cached cv2.remap grid with bilinear sampling, or a cached
+        nearest-neighbour gather without cv2.
+        """
+        cv2 = _load_cv2()
+        h, w = image.shape[:2]
+        new_w = int(HEIGHT * w / h)
+        key = (h, w)
+        if key not in self._grids:
+            # Source column and row of every output pixel; columns run backwards
+            cols = (w - 1) - (np.arange(new_w) + 0.5) * w / new_w + 0.5
+            rows = (np.arange(HEIGHT) + 0.5) * h / HEIGHT - 0.5
+            if cv2 is not None:
+                self._grids[key] = cv2.convertMaps(
+                    np.broadcast_to(cols.astype(np.float32), (HEIGHT, new_w)),
+                    np.broadcast_to(rows.astype(np.float32)[:, None], (HEIGHT, new_w)),
+                    cv2.CV_16SC2
+                )
+            else:
+                self._grids[key] = (np.clip(np.rint(rows), 0, h - 1).astype(np.intp)[:, None],
+                                    np.clip(np.rint(cols), 0, w - 1).astype(np.intp))
+        first, second = self._grids[key]
+        if cv2 is not None:
+            return cv2.remap(image, first, second, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        return image[first, second]
+
+    def text_sprite(self, text):
+        """
+        Coverage mask of a rendered label, cached.
+
+        :return: uint8 array of shape (height, width), 255 where the text is opaque
+        """
+        text = safe_text(text)
+        sprite = self._sprites.get(text)
+        if sprite is not None:
+            self._sprites.move_to_end(text)
+            return sprite
+
+        left, top, right, bottom = self.font.getbbox(text) if text else (0, 0, 0, 0)
+        mask = Image.new("L", (max(right, 1), max(bottom, 1)))
+        ImageDraw.Draw(mask).text((0, 0), text, fill=255, font=self.font)
+        sprite = np.asarray(mask)
+        self._sprites[text] = sprite
+        if len(self._sprites) > SPRITE_CACHE_SIZE:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def blend_text(self, frame, text, origin, color):
+        """Alpha-blend a cached label into frame at origin (x, y)."""
+        self.blend_sprite(frame, self.text_sprite(text), origin, color)
+
+    @staticmethod
+    def blend_sprite(frame, sprite, origin, color):
+        """
+        Blend a solid color through a coverage mask into frame, in place.
+
+        :param sprite: uint8 coverage mask
+        :param origin: (x, y) of the mask's top-left corner; the mask is clipped to the frame
+        """
+        x, y = origin
+        h = min(sprite.shape[0], frame.shape[0] - y)
+        w = min(sprite.shape[1], frame.shape[1] - x)
+        if h <= 0 or w <= 0:
+            return
+        roi = frame[y:y + h, x:x + w]
+        alpha = sprite[:h, :w, None].astype(np.uint16)
+        color = np.array(color[:roi.shape[2]], dtype=np.uint16)
+        roi[...] = (roi * (255 - alpha) + color * alpha + 127) // 255
+
+    def draw_banner(
+        self,
+        frame,
+        text,
+        offset=int(HEIGHT * 0.02),
+        bg_color=(245, 242, 176),
+        text_color=(118, 62, 37),
+    ):
+        """In-place counterpart of draw_text: centered label on a bar at the bottom."""
+        sprite = self.text_sprite(text)
+        h, w = frame.shape[:2]
+        text_x = int((w - sprite.shape[1]) / 2)
+        text_y = h - sprite.shape[0] - offset
+        frame[max(text_y - offset, 0):] = bg_color[:frame.shape[2]]
+        self.blend_sprite(frame, sprite, (max(text_x, 0), text_y), text_color)
+
+    def _indicator(self):
+        """Cached 30 px disc mask of the recording indicator."""
+        if "indicator" not in self._shapes:
+            disc = Image.new("L", (31, 31))
+            ImageDraw.Draw(disc).ellipse([0, 0, 30, 30], fill=255)
+            self._shapes["indicator"] = np.asarray(disc)
+        return self._shapes["indicator"]
 
     def draw_text(
         self,